@@ -0,0 +1,296 @@
+import atexit
+import itertools
+import json
+import os
+import re
+import struct
+import sys
+import threading
+import time
+import zlib
+from array import array
+
+try:
+    import numpy
+except ImportError:  # Optional dependency, only needed to read the archive (backtests)
+    numpy = None
+
+from database import topic_id
+from extract import THREAD_FIELDS
+from helpers import get_error_logger, get_main_logger
+from metrics import ARCHIVED_THREADS
+
+main_logger = get_main_logger()
+error_logger = get_error_logger()
+
+# Segment file: MAGIC, a little-endian uint32 header length, the JSON header, then the column blocks.
+# Each block is zlib-compressed on its own, so a reader only inflates the columns it asks for.
+MAGIC = b"FMARCH1\n"
+SEGMENT_SUFFIX = ".seg"
+FORMAT_VERSION = 1
+DEFAULT_ARCHIVE_DIR = "archive"
+DEFAULT_MAX_AGE = 90 * 24 * 3600       # seconds a segment is kept
+DEFAULT_MAX_BYTES = 1024 * 1024 * 1024  # size of the archive directory
+
+# Every thread record field, plus when it was archived and the topic ID of its URL
+COLUMNS = ("archived_at", "topic_id") + THREAD_FIELDS
+INT_COLUMNS = frozenset({
+    "archived_at", "topic_id", "op_user_posts", "op_user_threads", "op_user_reputation", "op_user_likes",
+})
+
+_unsafe_name_re = re.compile(r"[^A-Za-z0-9_.-]+")
+
+
+def _require_numpy():
+    if numpy is None:
+        raise RuntimeError("Reading the thread archive requires numpy (pip install numpy).")
+
+
+def _int64_bytes(values):
+    packed = array("q", values)
+    if sys.byteorder == "big":
+        packed.byteswap()
+    return packed.tobytes()
+
+
+def _encode_column(name, values):
+    """Blocks of one column: int64 ``values``, or UTF-8 ``data`` with int64 byte ``offsets``; plus ``nulls``."""
+    nulls = bytearray(len(values))
+    if name in INT_COLUMNS:
+        numbers = []
+        for row, value in enumerate(values):
+            try:
+                numbers.append(int(value))
+            except (TypeError, ValueError):
+                nulls[row] = 1
+                numbers.append(0)
+        blocks = {"values": _int64_bytes(numbers)}
+    else:
+        chunks, offsets, size = [], [0], 0
+        for row, value in enumerate(values):
+            if value is None:
+                nulls[row] = 1
+            else:
+                chunk = (value if isinstance(value, str) else str(value)).encode("utf-8", "surrogatepass")
+                chunks.append(chunk)
+                size += len(chunk)
+            offsets.append(size)
+        blocks = {"offsets": _int64_bytes(offsets), "data": b"".join(chunks)}
+    if any(nulls):
+        blocks["nulls"] = bytes(nulls)
+    return blocks
+
+
+def write_segment(path, rows):
+    """Write rows (tuples in COLUMNS order) to a segment file, atomically."""
+    body, layout = [], {}
+    position = 0
+    for index, name in enumerate(COLUMNS):
+        blocks = _encode_column(name, [row[index] for row in rows])
+        layout[name] = {"type": "int" if name in INT_COLUMNS else "str", "blocks": {}}
+        for block, raw in blocks.items():
+            compressed = zlib.compress(raw, 6)
+            layout[name]["blocks"][block] = [position, len(compressed)]
+            body.append(compressed)
+            position += len(compressed)
+    archived_at = [row[0] for row in rows]
+    header = json.dumps({
+        "version": FORMAT_VERSION,
+        "rows": len(rows),
+        "min_archived_at": min(archived_at),
+        "max_archived_at": max(archived_at),
+        "columns": layout,
+    }).encode("utf-8")
+    temp_path = path + ".tmp"
+    with open(temp_path, "wb") as file:
+        file.write(MAGIC)
+        file.write(struct.pack("<I", len(header)))
+        file.write(header)
+        for block in body:
+            file.write(block)
+    os.replace(temp_path, path)
+
+
+class Segment:
+    """One archive segment file; reads the header on open and a column's blocks on demand."""
+
+    def __init__(self, path):
+        self.path = path
+        self.name = os.path.basename(path)
+        with open(path, "rb") as file:
+            if file.read(len(MAGIC)) != MAGIC:
+                raise ValueError(f"{path} is not a thread archive segment.")
+            (length,) = struct.unpack("<I", file.read(4))
+            header = json.loads(file.read(length))
+        if header.get("version") != FORMAT_VERSION:
+            raise ValueError(f"{path} has unsupported archive version {header.get('version')}.")
+        self.rows = header["rows"]
+        self.min_archived_at = header["min_archived_at"]
+        self.max_archived_at = header["max_archived_at"]
+        self.columns = header["columns"]
+        self._data_start = len(MAGIC) + 4 + length
+
+    def _blocks(self, name):
+        if name not in self.columns:
+            raise KeyError(name)
+        blocks = {}
+        with open(self.path, "rb") as file:
+            for block, (offset, length) in self.columns[name]["blocks"].items():
+                file.seek(self._data_start + offset)
+                blocks[block] = zlib.decompress(file.read(length))
+        return blocks
+
+    def ints(self, name):
+        """An int column as (int64 array, bool array of nulls)."""
+        _require_numpy()
+        blocks = self._blocks(name)
+        values = numpy.frombuffer(blocks["values"], dtype="<i8")
+        nulls = blocks.get("nulls")
+        nulls = numpy.frombuffer(nulls, dtype=numpy.bool_) if nulls else numpy.zeros(self.rows, dtype=numpy.bool_)
+        return values, nulls
+
+    def strings(self, name, rows=None):
+        """A text column as a list of str or None, for every row or only the given row numbers."""
+        _require_numpy()
+        blocks = self._blocks(name)
+        offsets = numpy.frombuffer(blocks["offsets"], dtype="<i8").tolist()
+        data = blocks["data"]
+        nulls = blocks.get("nulls")
+        rows = range(self.rows) if rows is None else rows
+        return [None if nulls and nulls[row] else data[offsets[row]:offsets[row + 1]].decode("utf-8", "surrogatepass")
+                for row in rows]
+
+
+def list_segments(directory):
+    """Every complete segment file of an archive directory, oldest first."""
+    try:
+        names = sorted(name for name in os.listdir(directory) if name.endswith(SEGMENT_SUFFIX))
+    except FileNotFoundError:
+        return []
+    return [os.path.join(directory, name) for name in names]
+
+
+class ThreadArchive:
+    """Append-only columnar archive of parsed thread records.
+
+    ``append`` only buffers the record. A segment is written once ``rows_per_segment`` rows or
+    ``max_chars`` characters of text are buffered, or ``flush_interval`` seconds after the oldest
+    buffered row, by a background thread. Segment names start with the time they were written and
+    carry ``owner``, so several monitor workers can share one directory.
+
+    After every write the oldest segments are deleted until none is older than ``max_age``
+    seconds and the segments add up to at most ``max_bytes`` (0 turns either limit off); the
+    newest segment is kept whatever its size.
+    """
+
+    def __init__(self, directory, owner=None, rows_per_segment=10_000, max_chars=32 * 1024 * 1024,
+                 flush_interval=900, max_age=DEFAULT_MAX_AGE, max_bytes=DEFAULT_MAX_BYTES):
+        self.directory = directory
+        self.owner = _unsafe_name_re.sub("_", owner or f"pid{os.getpid()}")
+        self.rows_per_segment = rows_per_segment
+        self.max_chars = max_chars
+        self.flush_interval = flush_interval
+        self.max_age = max_age
+        self.max_bytes = max_bytes
+        self._rows = []
+        self._chars = 0
+        self._oldest = None
+        self._ready = []                # full batches waiting for the writer thread
+        self._sequence = itertools.count()
+        self._thread = None
+        self._cond = threading.Condition()
+
+    def append(self, record):
+        """Buffer one thread record (a ThreadRecord or dict with every THREAD_FIELDS key)."""
+        row = (int(time.time()), topic_id(record["op_thread_url"] or "")) + tuple(record[name] for name in THREAD_FIELDS)
+        chars = sum(len(value) for value in row if isinstance(value, str))
+        with self._cond:
+            if self._thread is None:
+                self._start()
+            if not self._rows:
+                self._oldest = time.monotonic()
+            self._rows.append(row)
+            self._chars += chars
+            if len(self._rows) >= self.rows_per_segment or self._chars >= self.max_chars:
+                self._ready.append(self._take())
+                self._cond.notify()
+
+    def flush(self):
+        """Write every buffered row now, in the calling thread."""
+        with self._cond:
+            batches = self._ready
+            self._ready = []
+            if self._rows:
+                batches.append(self._take())
+        self._write(batches)
+
+    def _take(self):
+        rows = self._rows
+        self._rows = []
+        self._chars = 0
+        self._oldest = None
+        return rows
+
+    def _start(self):
+        self._thread = threading.Thread(target=self._run, name="thread-archive", daemon=True)
+        self._thread.start()
+        atexit.register(self.flush)
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while not self._ready:
+                    if self._oldest is not None and time.monotonic() - self._oldest >= self.flush_interval:
+                        self._ready.append(self._take())
+                        break
+                    self._cond.wait(self.flush_interval if self._oldest is None else
+                                    max(0.0, self.flush_interval - (time.monotonic() - self._oldest)))
+                batches = self._ready
+                self._ready = []
+            self._write(batches)
+
+    def _write(self, batches):
+        for rows in batches:
+            name = f"{time.time_ns() // 1_000_000:014d}-{self.owner}-{next(self._sequence):06d}{SEGMENT_SUFFIX}"
+            try:
+                os.makedirs(self.directory, exist_ok=True)
+                write_segment(os.path.join(self.directory, name), rows)
+            except (OSError, ValueError) as e:
+                ARCHIVED_THREADS.inc("failed", amount=len(rows))
+                error_logger.error("Error writing thread archive segment %s: %s", name, e)
+            else:
+                ARCHIVED_THREADS.inc("written", amount=len(rows))
+        if batches:
+            try:
+                self.prune()
+            except OSError as e:
+                error_logger.error("Error pruning thread archive %s: %s", self.directory, e)
+
+    def prune(self, now=None):
+        """Delete the oldest segments beyond ``max_age`` and ``max_bytes``; returns how many were deleted."""
+        now = time.time() if now is None else now
+        segments = []
+        for path in list_segments(self.directory):
+            try:
+                stat = os.stat(path)
+            except FileNotFoundError:
+                continue  # Pruned by another worker sharing the directory
+            segments.append((path, stat.st_mtime, stat.st_size))
+        total = sum(size for _, _, size in segments)
+        removed = freed = 0
+        for index, (path, written_at, size) in enumerate(segments):
+            expired = self.max_age and written_at < now - self.max_age
+            oversized = self.max_bytes and total > self.max_bytes and index < len(segments) - 1
+            if not (expired or oversized):
+                break  # Oldest first, so every later segment is within both limits too
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            else:
+                removed += 1
+                freed += size
+            total -= size
+        if removed:
+            main_logger.info("Thread archive: deleted %d old segments (%.1f MB).", removed, freed / 2 ** 20)
+        return removed
@@ -0,0 +1,271 @@
+import asyncio
+import time
+
+try:
+    import aiohttp
+except ImportError:  # Optional dependency, only needed for engine="async"
+    aiohttp = None
+
+from nulled import (
+    FORUM_SECTIONS, base_url, header, build_url, get_cookies, get_mod_cookies,
+    parse_threads_section, parse_internal_thread_info, find_violation, load_match_context,
+    select_threads_to_fetch, submit_ban, ban_dispatcher, listing_cache, seen_threads, user_profiles,
+    record_response, new_thread_page_reader, limiters, FETCH_CHUNK_BYTES, THROTTLE_RETRIES, main_logger, error_logger,
+)
+from metrics import STAGE_SECONDS, THREAD_PAGES, THROTTLE_SIGNALS, cycle_tracker
+from throttle import THROTTLE_STATUSES, overloaded
+from schedule import CrawlScheduler
+from leases import LocalSections
+
+
+class AsyncForumClient:
+    """Persistent keep-alive aiohttp sessions for the user and moderator cookie roles.
+
+    Requests of each role wait for that role's adaptive limiter (nulled.limiters), so at most
+    ``concurrency`` of them are in flight and fewer while the forum pushes back.
+    """
+
+    def __init__(self, concurrency=50, timeout=30):
+        if aiohttp is None:
+            raise RuntimeError("The async monitor engine requires aiohttp (pip install aiohttp).")
+        self.concurrency = concurrency
+        self.timeout = aiohttp.ClientTimeout(total=timeout)
+        self.sessions = {}
+
+    async def __aenter__(self):
+        for role, cookies in (("user", get_cookies()), ("mod", get_mod_cookies())):
+            connector = aiohttp.TCPConnector(limit=self.concurrency, keepalive_timeout=60)
+            self.sessions[role] = aiohttp.ClientSession(
+                connector=connector, cookies=cookies, headers=header, timeout=self.timeout
+            )
+        return self
+
+    async def __aexit__(self, *exc_info):
+        for session in self.sessions.values():
+            await session.close()
+        self.sessions.clear()
+
+    async def request(self, role, url, kind, read, headers=None):
+        """GET a page with the given role's session once its limiter lets the request out.
+
+        ``read(response)`` consumes the body while the request still holds its slot. Throttled
+        responses are retried like nulled.forum_request does. Returns (response, result of read).
+        """
+        limiter = limiters[role]
+        attempt = 0
+        while True:
+            await limiter.acquire_async()
+            started = time.monotonic()
+            retry = False
+            try:
+                async with self.sessions[role].get(url, headers=headers) as response:
+                    latency = time.monotonic() - started
+                    retry_after = response.headers.get("Retry-After")
+                    retry = (response.status in THROTTLE_STATUSES and attempt < THROTTLE_RETRIES
+                             and limiter.retryable(retry_after))
+                    result = None if retry else await read(response)
+            except (aiohttp.ClientError, asyncio.TimeoutError):
+                limiter.release(failed=True)
+                record_response(kind, "error")
+                raise
+            except BaseException:
+                limiter.release()
+                raise
+            limiter.release(response.status, latency, retry_after, failed=overloaded(response.status))
+            if not retry:
+                return response, result
+            record_response(kind, response.status)
+            THROTTLE_SIGNALS.inc(role, "retried")
+            attempt += 1
+
+    async def fetch(self, role, url, kind, headers=None, allowed=()):
+        """GET a page with the given role's session and count it under ``kind``.
+
+        Returns (status, response headers, text); statuses >= 400 raise aiohttp.ClientResponseError
+        unless listed in ``allowed``.
+        """
+        with STAGE_SECONDS.time(f"{kind}_fetch"):
+            response, body = await self.request(role, url, kind, _read_body, headers)
+        record_response(kind, response.status, len(body))
+        if response.status not in allowed:
+            response.raise_for_status()
+        return response.status, response.headers, body.decode(response.get_encoding(), errors="replace")
+
+    async def get_conditional(self, role, url, kind, headers):
+        """GET a page with extra request headers; returns (status, response headers, text), allowing 304."""
+        return await self.fetch(role, url, kind, headers, allowed=(304,))
+
+    async def get_thread_page(self, url):
+        """GET a thread page with the moderator session into a ThreadPageReader, reading only what it needs.
+
+        Raises aiohttp.ClientError on failure.
+        """
+        with STAGE_SECONDS.time("thread_fetch"):
+            response, page = await self.request("mod", url, "thread", _read_thread_page)
+        record_response("thread", response.status, page.size)
+        response.raise_for_status()
+        THREAD_PAGES.inc(page.outcome)
+        return page
+
+
+async def _read_body(response):
+    return await response.read()
+
+
+async def _read_thread_page(response):
+    page = new_thread_page_reader(response.charset)
+    if response.ok:
+        async for chunk in response.content.iter_chunked(FETCH_CHUNK_BYTES):
+            if page.add(chunk):
+                break
+    return page
+
+
+class AsyncCycle:
+    """One crawl cycle: sections are paged concurrently and every thread fetch is an independent task.
+
+    Violations are handed to nulled.ban_dispatcher, so moderator requests never hold up the crawl.
+    """
+
+    def __init__(self, client, page_range=3, rules_config_path="config/rules.yaml", sections=None, scheduler=None):
+        self.client = client
+        self.page_range = page_range
+        self.rules_config_path = rules_config_path
+        self.sections = FORUM_SECTIONS if sections is None else sections
+        self.scheduler = scheduler
+        self.threads_evaluated = 0
+
+    async def run(self):
+        section_tasks = [self.process_section(section) for section in self.sections]
+        for result in await asyncio.gather(*section_tasks, return_exceptions=True):
+            if isinstance(result, Exception):
+                error_logger.error(f"Error in async section task: {result}")
+
+    async def process_section(self, section):
+        """Walk a section's pages in order, stopping at its crawl cursor, and evaluate the new threads."""
+        poll = self.scheduler.begin_poll(section) if self.scheduler else None
+        thread_tasks = []
+        try:
+            for page in range(1, self.page_range + 1):
+                entries = await self.process_listing(build_url(base_url + section, page, sorted_page=True), thread_tasks)
+                if entries is None:
+                    if poll:
+                        poll.fail()
+                    break
+                if poll and not poll.add_page(entries):
+                    break
+        except BaseException:
+            if poll:
+                poll.fail()
+            raise
+        finally:
+            if poll:
+                self.scheduler.record_poll(section, poll.finish(), failed=poll.failed)
+            # Every thread task is awaited, even if paging failed, so none runs on into the next cycle
+            for result in await asyncio.gather(*thread_tasks, return_exceptions=True):
+                if isinstance(result, Exception):
+                    error_logger.error("Error in async thread task of section %s: %s", section, result)
+
+    async def process_listing(self, url, thread_tasks):
+        main_logger.debug("Fetching threads from URL: %s", url)
+        try:
+            status, headers, html = await self.client.get_conditional("user", url, "listing",
+                                                                      listing_cache.request_headers(url))
+        except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+            error_logger.error("Error fetching threads from URL %s: %s", url, e)
+            return None
+
+        # Parsing a changed listing is CPU-bound, so it runs in a worker thread like the other blocking steps
+        entries = await asyncio.to_thread(listing_cache.entries_for, url, status, headers, html,
+                                          parse_threads_section)
+        # Reading the blacklist may hit the database, so it runs in a worker thread like every other database call
+        rule_set, blacklist, matchers = await asyncio.to_thread(load_match_context, self.rules_config_path)
+        links = await asyncio.to_thread(select_threads_to_fetch, entries, rule_set, blacklist)
+        thread_tasks.extend(
+            asyncio.create_task(self.process_thread(link, rule_set, blacklist, matchers)) for link in links
+        )
+        return entries
+
+    async def process_thread(self, link, rule_set, blacklist, matchers):
+        """Fetch, parse and match one thread; errors are logged here so they never reach the section's other tasks."""
+        main_logger.info("Processing thread link: %s", link)
+        try:
+            page = await self.client.get_thread_page(link)
+        except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+            error_logger.error("Error fetching internal thread info from URL %s: %s", link, e)
+            return
+
+        try:
+            # Parsing, archiving and matching are CPU work and the database calls block: none of it runs on the loop
+            thread_info = await asyncio.to_thread(parse_internal_thread_info, page, link)
+            if not thread_info:
+                error_logger.warning("Thread info not available for link: %s", link)
+                return
+            self.threads_evaluated += 1
+            user_profiles.update_from_thread(thread_info)
+
+            violation = await asyncio.to_thread(find_violation, thread_info, rule_set, matchers)
+            if violation:
+                await asyncio.to_thread(submit_ban, thread_info, link, violation, rule_set, blacklist)
+            else:
+                await asyncio.to_thread(seen_threads.record, link, "clean", blacklist.fingerprint, rule_set.fingerprint)
+        except Exception as e:
+            error_logger.error("Error processing thread %s: %s", link, e)
+
+
+async def run_async_cycle(client, page_range=3, rules_config_path="config/rules.yaml", sections=None, scheduler=None):
+    """Run a single cycle and return the number of threads evaluated."""
+    cycle = AsyncCycle(client, page_range, rules_config_path, sections, scheduler)
+    await cycle.run()
+    return cycle.threads_evaluated
+
+
+async def wait_for_next_poll(seconds, stop_signal=None):
+    deadline = time.monotonic() + seconds
+    while stop_signal is None or stop_signal():
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            return
+        await asyncio.sleep(min(remaining, 1.0))
+
+
+async def monitor_forum_loop(concurrency=50, page_range=3, scheduler=None, stop_signal=None,
+                             rules_config_path="config/rules.yaml", assignment=None):
+    scheduler = scheduler or CrawlScheduler(FORUM_SECTIONS)
+    assignment = assignment or LocalSections(FORUM_SECTIONS)
+    async with AsyncForumClient(concurrency=concurrency) as client:
+        main_logger.info("Async checker started.")
+        while stop_signal is None or stop_signal():
+            owned = assignment.current()
+            sections = scheduler.due_sections(sections=owned)
+            if sections:
+                started = time.monotonic()
+                cycle_tracker.begin("async", sections)
+                evaluated = await run_async_cycle(client, page_range, rules_config_path, sections, scheduler)
+
+                try:
+                    await asyncio.to_thread(seen_threads.prune)
+                except Exception as e:
+                    error_logger.error(f"Error pruning seen threads: {e}")
+
+                profile_stats = user_profiles.take_stats()
+                ban_stats = ban_dispatcher.take_stats()
+                listing_stats = listing_cache.take_stats()
+                cycle_tracker.end(threads=evaluated, listings_parsed=listing_stats["parsed"],
+                                  listings_reused=listing_stats["not_modified"] + listing_stats["unchanged"],
+                                  profile_hit_rate=round(profile_stats["hit_rate"], 3), bans_sent=ban_stats["banned"],
+                                  bans_queued=ban_stats["queued"])
+                main_logger.info(f"Async checker polled {len(sections)} sections ({listing_stats['parsed']} listing "
+                                 f"pages parsed, {listing_stats['not_modified'] + listing_stats['unchanged']} reused): "
+                                 f"{evaluated} threads in "
+                                 f"{time.monotonic() - started:.1f}s, profile cache hit rate "
+                                 f"{profile_stats['hit_rate']:.0%}, bans sent {ban_stats['banned']}, "
+                                 f"still queued {ban_stats['queued']}.")
+            wait = min(scheduler.seconds_until_due(sections=owned), assignment.seconds_until_refresh())
+            await wait_for_next_poll(wait, stop_signal)
+
+
+def monitor_forum_async(concurrency=50, page_range=3, scheduler=None, stop_signal=None,
+                        rules_config_path="config/rules.yaml", assignment=None):
+    """Blocking entry point used by nulled.monitor_forum(engine="async")."""
+    asyncio.run(monitor_forum_loop(concurrency, page_range, scheduler, stop_signal, rules_config_path, assignment))
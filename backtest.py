@@ -0,0 +1,469 @@
+import argparse
+import json
+import os
+import sys
+import threading
+import time
+from datetime import datetime, timezone
+
+import yaml
+from dotenv import load_dotenv
+
+try:
+    import numpy
+except ImportError:  # Optional dependency, only needed for backtests
+    numpy = None
+
+from archive import DEFAULT_ARCHIVE_DIR, Segment, list_segments
+from database import get_blacklist_snapshot
+from matcher import FIELD_MATCHERS, FIELD_SOURCES, KeywordMatcher
+from rules import RuleError, compile_rules, get_rule_loader
+
+# Columns kept in memory for every archived record; text columns are only read to match blacklists
+INT_CONDITION_FIELDS = ("op_user_posts", "op_user_threads", "op_user_reputation", "op_user_likes")
+# Characters of searched text kept across backtests, shared by every blacklist field (BACKTEST_TEXT_CACHE_CHARS)
+DEFAULT_TEXT_CACHE_CHARS = 64 * 1024 * 1024
+
+
+class SegmentColumns:
+    """The small columns of one archive segment, loaded once and kept for later backtests."""
+
+    def __init__(self, segment, groups):
+        self.segment = segment
+        self.rows = segment.rows
+        self.archived_at, _ = segment.ints("archived_at")
+        topics, topic_nulls = segment.ints("topic_id")
+        self.topic_id = numpy.where(topic_nulls, -1, topics)
+        self.numbers = {field: segment.ints(field) for field in INT_CONDITION_FIELDS}
+        self.userids = segment.strings("op_userid")
+        # op_userid is scraped as text; conditions compare it as a number, like rules.Condition does
+        userid_numbers = [int(value) if value and value.isdigit() else None for value in self.userids]
+        self.numbers["op_userid"] = (
+            numpy.array([value or 0 for value in userid_numbers], dtype=numpy.int64),
+            numpy.array([value is None for value in userid_numbers], dtype=numpy.bool_),
+        )
+        self.group_codes = numpy.array(
+            [groups.setdefault(group, len(groups)) for group in segment.strings("op_user_group")], dtype=numpy.int32
+        )
+
+
+class FieldHits:
+    """Every blacklist entry a field's text has matched, per archived record, over all backtests so far.
+
+    ``keywords`` only grows: a keyword added by a candidate blacklist is searched for once, in the
+    records that have not been searched for it yet, and dropping a keyword just ignores its hits.
+    The searched texts are kept, up to ``text_cache_chars`` characters, so searching them for an
+    added keyword does not inflate their segment again.
+    """
+
+    def __init__(self, field, text_cache_chars=0):
+        self.field = field
+        self.keywords = []
+        self.index = {}
+        self.scanned = {}       # segment name -> int32 array: how many of ``keywords`` each row was searched for
+        self.hits = {}          # segment name -> {row: [keyword index]}
+        self.texts = {}         # segment name -> {row: text}, the searched texts while they fit text_cache_chars
+        self.text_cache_chars = text_cache_chars
+        self._cached_chars = 0
+        self._matchers = {}
+
+    def extend(self, keywords):
+        for keyword in keywords:
+            if keyword not in self.index:
+                self.index[keyword] = len(self.keywords)
+                self.keywords.append(keyword)
+
+    def matcher(self, start):
+        """Matcher for ``keywords[start:]``."""
+        key = (start, len(self.keywords))
+        matcher = self._matchers.get(key)
+        if matcher is None:
+            matcher = FIELD_MATCHERS.get(self.field, KeywordMatcher)(self.keywords[start:])
+            self._matchers = {cached: value for cached, value in self._matchers.items() if cached[1] == key[1]}
+            self._matchers[key] = matcher
+        return matcher
+
+    def first_matches(self, columns, rows, positions):
+        """(row, position) for each of ``rows`` whose text matches a keyword of ``positions`` (keyword -> position).
+
+        The keyword with the lowest position wins, as in the blacklist order the monitor checks.
+        """
+        name = columns.segment.name
+        scanned = self.scanned.get(name)
+        if scanned is None:
+            scanned = self.scanned[name] = numpy.zeros(columns.rows, dtype=numpy.int32)
+        hits = self.hits.setdefault(name, {})
+        total = len(self.keywords)
+        pending = rows[scanned[rows] < total]
+        if pending.size:
+            texts = self._texts(columns, pending.tolist())
+            for start in numpy.unique(scanned[pending]).tolist():
+                batch = pending[scanned[pending] == start].tolist()
+                for row, found in zip(batch, self.matcher(start).find_all_many([texts[row] for row in batch])):
+                    if found:
+                        hits.setdefault(row, []).extend(start + index for index in found)
+            scanned[pending] = total
+
+        keywords = self.keywords
+        matches = []
+        for row in rows.tolist():
+            found = hits.get(row)
+            if found:
+                best = min((positions[keywords[index]] for index in found if keywords[index] in positions),
+                           default=None)
+                if best is not None:
+                    matches.append((row, best))
+        return matches
+
+    def _texts(self, columns, rows):
+        """{row: text} of the field's source column, from the cache where possible."""
+        name = columns.segment.name
+        cached = self.texts.setdefault(name, {})
+        missing = [row for row in rows if row not in cached]
+        if not missing:
+            return cached
+        texts = dict(zip(missing, columns.segment.strings(FIELD_SOURCES[self.field], missing)))
+        size = sum(len(text) for text in texts.values() if text)
+        if self._cached_chars + size <= self.text_cache_chars:
+            cached.update(texts)
+            self._cached_chars += size
+            return cached
+        texts.update((row, cached[row]) for row in rows if row in cached)
+        return texts
+
+    def forget(self, name):
+        """Drop everything kept for a deleted segment."""
+        self.scanned.pop(name, None)
+        self.hits.pop(name, None)
+        for text in self.texts.pop(name, {}).values():
+            self._cached_chars -= len(text) if text else 0
+
+
+class Verdicts:
+    """The bans one rule set and blacklist would have issued over the archive."""
+
+    def __init__(self, rule_set, blacklist):
+        self.rule_set = rule_set
+        self.blacklist = blacklist
+        self.matches = {}       # segment name -> [(row, rule, field, keyword)]
+        self.users = {}         # userid -> (segment name, row, rule, field, keyword) of its first banned thread
+
+    def add(self, columns, row, rule, field, keyword):
+        name = columns.segment.name
+        self.matches.setdefault(name, []).append((row, rule, field, keyword))
+        userid = columns.userids[row]
+        if userid is not None and userid not in self.users:
+            self.users[userid] = (name, row, rule, field, keyword)
+
+    def summary(self):
+        by_rule = {rule.name: {"threads": 0, "users": set()} for rule in self.rule_set.rules}
+        threads = 0
+        for matches in self.matches.values():
+            threads += len(matches)
+            for _, rule, _, _ in matches:
+                by_rule[rule.name]["threads"] += 1
+        for userid, (_, _, rule, _, _) in self.users.items():
+            by_rule[rule.name]["users"].add(userid)
+        return {
+            "threads": threads,
+            "users": len(self.users),
+            "by_rule": {name: {"threads": counts["threads"], "users": len(counts["users"])}
+                        for name, counts in by_rule.items()},
+        }
+
+
+class Backtester:
+    """Replay rule sets and blacklists against the thread archive.
+
+    Records are deduplicated to the latest archived copy of each topic. Rule groups and numeric
+    conditions are evaluated as numpy masks over whole segments; only the records they leave are
+    searched for blacklist keywords, and the search results are kept (see FieldHits), so re-running
+    with a tweaked threshold or a few more keywords only searches what is new.
+    """
+
+    def __init__(self, directory, text_cache_chars=DEFAULT_TEXT_CACHE_CHARS):
+        if numpy is None:
+            raise RuntimeError("Backtesting requires numpy (pip install numpy).")
+        self.directory = directory
+        self._columns = {}      # segment name -> SegmentColumns
+        self._groups = {}
+        self._fields = {field: FieldHits(field, text_cache_chars // len(FIELD_SOURCES)) for field in FIELD_SOURCES}
+        self._lock = threading.Lock()
+
+    def refresh(self):
+        """Load the small columns of new segments and forget deleted ones; returns the current segments in order."""
+        paths = list_segments(self.directory)
+        names = {os.path.basename(path) for path in paths}
+        for name in list(self._columns):
+            if name not in names:
+                del self._columns[name]
+                for hits in self._fields.values():
+                    hits.forget(name)
+        segments = []
+        for path in paths:
+            name = os.path.basename(path)
+            columns = self._columns.get(name)
+            if columns is None:
+                columns = self._columns[name] = SegmentColumns(Segment(path), self._groups)
+            segments.append(columns)
+        return segments
+
+    def latest(self, segments, since=None, until=None):
+        """Per segment, a mask of the records that are the latest archived copy of their topic in [since, until)."""
+        if not segments:
+            return []
+        archived_at = numpy.concatenate([columns.archived_at for columns in segments])
+        topics = numpy.concatenate([columns.topic_id for columns in segments])
+        in_window = numpy.ones(len(archived_at), dtype=numpy.bool_)
+        if since is not None:
+            in_window &= archived_at >= since
+        if until is not None:
+            in_window &= archived_at < until
+        # Records without a topic ID are their own topic
+        missing = topics < 0
+        topics = topics.copy()
+        topics[missing] = -1 - numpy.flatnonzero(missing)
+        candidates = numpy.flatnonzero(in_window)
+        order = candidates[numpy.lexsort((archived_at[candidates], topics[candidates]))]
+        last = numpy.ones(len(order), dtype=numpy.bool_)
+        last[:-1] = topics[order[:-1]] != topics[order[1:]]
+        live = numpy.zeros(len(archived_at), dtype=numpy.bool_)
+        live[order[last]] = True
+        masks, start = [], 0
+        for columns in segments:
+            masks.append(live[start:start + columns.rows])
+            start += columns.rows
+        return masks
+
+    def evaluate(self, segments, masks, rule_set, blacklist):
+        """Find the first rule, field and keyword each live record violates, as the monitor would."""
+        verdicts = Verdicts(rule_set, blacklist)
+        positions = {field: {keyword: position for position, keyword in reversed(list(enumerate(keywords)))}
+                     for field, keywords in blacklist.items()}
+        for field, keywords in blacklist.items():
+            if field in self._fields:
+                self._fields[field].extend(keywords)
+        for columns, live in zip(segments, masks):
+            undecided = live.copy()
+            for rule in rule_set.rules:
+                group = self._groups.get(rule.op_user_group)
+                if group is None:
+                    continue
+                eligible = undecided & (columns.group_codes == group)
+                for condition in rule.conditions:
+                    values, nulls = columns.numbers[condition.field]
+                    eligible &= ~nulls & condition.compare(values, condition.value)
+                for field in rule.blacklist_fields:
+                    if not positions.get(field) or field not in self._fields:
+                        continue
+                    rows = numpy.flatnonzero(eligible)
+                    if not rows.size:
+                        break
+                    keywords = blacklist[field]
+                    for row, position in self._fields[field].first_matches(columns, rows, positions[field]):
+                        verdicts.add(columns, row, rule, field, keywords[position])
+                        eligible[row] = False
+                        undecided[row] = False
+        return verdicts
+
+    def run(self, current, candidate, since=None, until=None, examples=10):
+        """Backtest a candidate (rule set, blacklist) against the current one; returns a JSON-ready report."""
+        try:
+            return self._run(current, candidate, since, until, examples)
+        except FileNotFoundError:
+            # A monitor pruned a segment mid-run; the next refresh forgets it
+            return self._run(current, candidate, since, until, examples)
+
+    def _run(self, current, candidate, since, until, examples):
+        started = time.perf_counter()
+        with self._lock:
+            segments = self.refresh()
+            loaded = time.perf_counter()
+            masks = self.latest(segments, since, until)
+            baseline = self.evaluate(segments, masks, *current)
+            proposed = self.evaluate(segments, masks, *candidate)
+        by_name = {columns.segment.name: columns for columns in segments}
+        newly_banned = [userid for userid in proposed.users if userid not in baseline.users]
+        no_longer_banned = [userid for userid in baseline.users if userid not in proposed.users]
+        return {
+            "archive": {
+                "directory": self.directory,
+                "segments": len(segments),
+                "records": int(sum(columns.rows for columns in segments)),
+                "threads": int(sum(int(mask.sum()) for mask in masks)),
+            },
+            "current": baseline.summary(),
+            "candidate": dict(proposed.summary(), examples=_examples(by_name, proposed, list(proposed.users), examples)),
+            "diff": {
+                "newly_banned": len(newly_banned),
+                "no_longer_banned": len(no_longer_banned),
+                "newly_banned_examples": _examples(by_name, proposed, newly_banned, examples),
+                "no_longer_banned_examples": _examples(by_name, baseline, no_longer_banned, examples),
+            },
+            "seconds": round(time.perf_counter() - started, 3),
+            "load_seconds": round(loaded - started, 3),
+        }
+
+
+def _examples(by_name, verdicts, userids, limit):
+    """The first banned thread of up to ``limit`` of the users, with the rule, field and keyword that hit it."""
+    examples = []
+    for userid in userids[:limit]:
+        name, row, rule, field, keyword = verdicts.users[userid]
+        columns = by_name[name]
+        url, title = (columns.segment.strings(column, [row])[0] for column in ("op_thread_url", "op_thread_title"))
+        examples.append({
+            "userid": userid,
+            "thread_url": url,
+            "title": title,
+            "rule": rule.name,
+            "field": field,
+            "keyword": keyword,
+            "archived_at": datetime.fromtimestamp(int(columns.archived_at[row]), timezone.utc).isoformat(),
+        })
+    return examples
+
+
+def apply_blacklist_changes(blacklist, add=None, remove=None):
+    """A copy of blacklist data with keywords removed and appended per field; raises ValueError on unknown fields."""
+    for changes in (add or {}, remove or {}):
+        for field in changes:
+            if field not in FIELD_SOURCES:
+                raise ValueError(f"Unknown blacklist field '{field}', expected one of {tuple(FIELD_SOURCES)}.")
+    result = {}
+    for field in FIELD_SOURCES:
+        removed = set((remove or {}).get(field, ()))
+        keywords = [keyword for keyword in blacklist.get(field, ()) if keyword not in removed]
+        present = set(keywords)
+        for keyword in (add or {}).get(field, ()):
+            if keyword and keyword not in present:
+                keywords.append(keyword)
+                present.add(keyword)
+        result[field] = keywords
+    return result
+
+
+def parse_rules(text):
+    """Compile rules.yaml text into a RuleSet; raises RuleError."""
+    try:
+        document = yaml.safe_load(text)
+    except yaml.YAMLError as e:
+        raise RuleError(f"Invalid YAML: {e}") from None
+    return compile_rules(document)
+
+
+_backtesters = {}
+_backtesters_lock = threading.Lock()
+
+
+def get_backtester(directory=None):
+    """Return the process-wide Backtester of an archive directory, so its caches outlive one backtest."""
+    directory = directory or os.getenv("THREAD_ARCHIVE_DIR") or DEFAULT_ARCHIVE_DIR
+    with _backtesters_lock:
+        backtester = _backtesters.get(directory)
+        if backtester is None:
+            text_cache_chars = int(os.getenv("BACKTEST_TEXT_CACHE_CHARS", str(DEFAULT_TEXT_CACHE_CHARS)))
+            backtester = _backtesters[directory] = Backtester(directory, text_cache_chars)
+        return backtester
+
+
+def run_backtest(rules_text=None, add=None, remove=None, since=None, until=None, examples=10, directory=None,
+                 rules_config_path="config/rules.yaml"):
+    """Backtest candidate rules (rules.yaml text; the current rules if None) and blacklist changes.
+
+    Raises RuleError or ValueError on invalid input.
+    """
+    rule_set = get_rule_loader(rules_config_path).get()
+    blacklist = get_blacklist_snapshot().data
+    candidate_rules = parse_rules(rules_text) if rules_text is not None else rule_set
+    candidate_blacklist = apply_blacklist_changes(blacklist, add, remove)
+    return get_backtester(directory).run((rule_set, blacklist), (candidate_rules, candidate_blacklist),
+                                         since, until, examples)
+
+
+def _parse_time(value):
+    """Unix time of an ISO 8601 datetime (naive means UTC) or of a Unix timestamp."""
+    try:
+        return int(float(value))
+    except ValueError:
+        pass
+    try:
+        parsed = datetime.fromisoformat(value)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"invalid time '{value}'") from None
+    if parsed.tzinfo is None:
+        parsed = parsed.replace(tzinfo=timezone.utc)
+    return int(parsed.timestamp())
+
+
+def _keyword_change(value):
+    field, separator, keyword = value.partition("=")
+    if not separator or field not in FIELD_SOURCES or not keyword:
+        raise argparse.ArgumentTypeError(f"expected FIELD=KEYWORD with FIELD one of {', '.join(FIELD_SOURCES)}")
+    return field, keyword
+
+
+def print_report(report):
+    archive = report["archive"]
+    print(f"Archive {archive['directory']}: {archive['segments']} segments, {archive['records']} records, "
+          f"{archive['threads']} distinct threads.")
+    print(f"{'':<32} {'threads':>8} {'users':>8}")
+    for label in ("current", "candidate"):
+        summary = report[label]
+        print(f"{label:<32} {summary['threads']:>8} {summary['users']:>8}")
+        for name, counts in summary["by_rule"].items():
+            print(f"  {name:<30} {counts['threads']:>8} {counts['users']:>8}")
+    diff = report["diff"]
+    for label, key in (("Newly banned", "newly_banned"), ("No longer banned", "no_longer_banned")):
+        print(f"\n{label}: {diff[key]} users")
+        for example in diff[f"{key}_examples"]:
+            print(f"  {example['userid']:<10} {example['rule']} / {example['field']} '{example['keyword']}'  "
+                  f"{example['thread_url']}")
+    if report["candidate"]["examples"]:
+        print("\nCandidate bans, for example:")
+        for example in report["candidate"]["examples"]:
+            print(f"  {example['userid']:<10} {example['rule']} / {example['field']} '{example['keyword']}'  "
+                  f"{example['thread_url']}")
+    print(f"\nBacktest took {report['seconds']:.2f}s ({report['load_seconds']:.2f}s loading the archive).")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Replay candidate ban rules and blacklist changes against the thread archive."
+    )
+    parser.add_argument("--rules", help="candidate rules.yaml (default: the current rules)")
+    parser.add_argument("--current-rules", default="config/rules.yaml", help="rules.yaml the candidate is compared with")
+    parser.add_argument("--add", type=_keyword_change, action="append", default=[], metavar="FIELD=KEYWORD",
+                        help="blacklist keyword to add (repeatable)")
+    parser.add_argument("--remove", type=_keyword_change, action="append", default=[], metavar="FIELD=KEYWORD",
+                        help="blacklist keyword to remove (repeatable)")
+    parser.add_argument("--since", type=_parse_time, help="only threads archived at or after this time")
+    parser.add_argument("--until", type=_parse_time, help="only threads archived before this time")
+    parser.add_argument("--examples", type=int, default=10, help="example users listed per change")
+    parser.add_argument("--archive", help="archive directory (default: THREAD_ARCHIVE_DIR or 'archive')")
+    parser.add_argument("--json", action="store_true", help="print the report as JSON")
+    args = parser.parse_args(argv)
+
+    load_dotenv(dotenv_path=os.path.join("config", ".env"))
+
+    add, remove = {}, {}
+    for changes, pairs in ((add, args.add), (remove, args.remove)):
+        for field, keyword in pairs:
+            changes.setdefault(field, []).append(keyword)
+    try:
+        rules_text = None
+        if args.rules:
+            with open(args.rules, encoding="utf-8") as file:
+                rules_text = file.read()
+        report = run_backtest(rules_text, add, remove, args.since, args.until, args.examples, args.archive,
+                              args.current_rules)
+    except (OSError, ValueError, RuntimeError) as e:
+        sys.exit(f"Backtest failed: {e}")
+    if args.json:
+        print(json.dumps(report, indent=2))
+    else:
+        print_report(report)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,315 @@
+import heapq
+import itertools
+import os
+import socket
+import threading
+import time
+from collections import OrderedDict
+
+from database import PendingBanStore
+from helpers import get_error_logger, get_main_logger
+from metrics import BANS, BANS_QUEUED
+
+main_logger = get_main_logger()
+error_logger = get_error_logger()
+
+
+class BanRequest:
+    """A queued moderator ban and every thread link it settles."""
+    __slots__ = ("userid", "reason", "links", "blacklist_fingerprint", "rules_fingerprint", "rule", "field", "keyword",
+                 "attempts", "due", "banned")
+
+    def __init__(self, userid, reason, links, blacklist_fingerprint, rules_fingerprint, rule=None, field=None,
+                 keyword=None, attempts=0):
+        self.userid = userid
+        self.reason = reason
+        self.links = links
+        self.blacklist_fingerprint = blacklist_fingerprint
+        self.rules_fingerprint = rules_fingerprint
+        self.rule = rule
+        self.field = field
+        self.keyword = keyword
+        self.attempts = attempts
+        self.due = 0.0
+        self.banned = False  # The ban went through but is not recorded in the store yet
+
+
+class BanDispatcher:
+    """Single queue for moderator bans, drained by its own thread.
+
+    Crawl workers only ``submit``. Each user has at most one queued or in-flight ban, and users
+    banned within ``recent_ttl`` seconds are not banned again. Bans are sent at most ``rate`` per
+    second. Failures are retried with exponential backoff up to ``max_attempts``. Every pending
+    ban is persisted, so a restart picks up where the last run stopped. Every ban that goes through
+    is recorded in the ban audit with the rule, field and keyword that triggered it. A ban that
+    went through but could not be recorded stays queued, and only the recording is retried.
+
+    The pending bans are shared by every monitor worker through the database. A ban is sent only
+    by the worker that queued it (``owner``), and bans of workers silent for ``orphan_after``
+    seconds are adopted by the others.
+
+    The lock guards only the in-memory queue; store calls are made outside it, so a slow
+    database write never holds up other crawl workers' submits.
+
+    ``ban_func(userid, reason)`` returns True on success. ``on_banned(userid, links,
+    blacklist_fingerprint, rules_fingerprint)`` is called once a user's ban has gone through.
+    """
+
+    def __init__(self, ban_func, on_banned=None, store=None, owner=None, rate=1.0, max_attempts=6,
+                 retry_delay=5, max_retry_delay=900, recent_ttl=3600, max_recent=100_000, orphan_after=180):
+        self.ban_func = ban_func
+        self.owner = owner or f"{socket.gethostname()}-{os.getpid()}"
+        self.on_banned = on_banned
+        self.store = store or PendingBanStore()
+        self.interval = 1.0 / rate if rate else 0.0
+        self.max_attempts = max_attempts
+        self.retry_delay = retry_delay
+        self.max_retry_delay = max_retry_delay
+        self.recent_ttl = recent_ttl
+        self.max_recent = max_recent
+        self.orphan_after = orphan_after
+        self.stats = {"submitted": 0, "deduplicated": 0, "banned": 0, "retried": 0, "failed": 0}
+        self._pending = {}              # userid -> BanRequest, queued or in flight
+        self._schedule = []             # heap of (due, seq, userid)
+        self._recent = OrderedDict()    # userid -> monotonic time of the completed ban
+        self._sequence = itertools.count()
+        self._next_slot = 0.0
+        self._next_adopt = 0.0
+        self._generation = 0
+        self._running = False
+        self._thread = None
+        self._cond = threading.Condition()
+
+    def start(self):
+        """Start the dispatch thread and requeue bans persisted by a previous run."""
+        with self._cond:
+            if self._running:
+                return
+            self._running = True
+            self._generation += 1
+            generation = self._generation
+        self._adopt()
+        with self._cond:
+            self._thread = threading.Thread(target=self._run, args=(generation,), name="ban-dispatcher", daemon=True)
+            self._thread.start()
+
+    def stop(self, timeout=5):
+        """Stop dispatching; queued bans stay persisted for the next start."""
+        with self._cond:
+            self._running = False
+            self._cond.notify_all()
+            thread, self._thread = self._thread, None
+        if thread:
+            thread.join(timeout)
+
+    def submit(self, userid, reason, link, blacklist_fingerprint, rules_fingerprint, rule=None, field=None,
+               keyword=None):
+        """Queue a ban for a thread's author; returns False if it was folded into an existing ban."""
+        with self._cond:
+            self._count("submitted")
+            request = self._pending.get(userid)
+            attach = request is not None and link not in request.links
+            if request is not None:
+                self._count("deduplicated")
+                if attach:
+                    request.links.append(link)
+            recently_banned = request is None and self._recently_banned(userid)
+        if request is not None:
+            if attach:
+                self.store.attach(userid, link)
+            return False
+
+        # The store settles races between submits, in this worker or another one, for the same user
+        outcome = "banned" if recently_banned else self.store.claim(
+            userid, reason, link, blacklist_fingerprint, rules_fingerprint, self.owner,
+            int(time.time() - self.recent_ttl), rule, field, keyword,
+        )
+        with self._cond:
+            if outcome == "queued":
+                request = self._pending.get(userid)
+                if request is not None:  # Loaded by an adoption pass while the claim was being written
+                    if link not in request.links:
+                        request.links.append(link)
+                    return True
+                request = BanRequest(userid, reason, [link], blacklist_fingerprint, rules_fingerprint,
+                                     rule, field, keyword)
+                self._pending[userid] = request
+                self._push(request, time.monotonic())
+                BANS_QUEUED.set(len(self._pending))
+                return True
+            self._count("deduplicated")
+        if outcome == "attached":
+            return False  # Another pending ban now settles this thread too
+        # Already banned: the thread is settled without another moderator request
+        if self.on_banned:
+            self.on_banned(userid, [link], blacklist_fingerprint, rules_fingerprint)
+        return False
+
+    def drain(self, timeout=None):
+        """Block until no ban is queued or in flight; returns False on timeout."""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._cond:
+            while self._pending:
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    return False
+                self._cond.wait(remaining)
+            return True
+
+    def clear_recent(self):
+        """Forget recently completed bans, so those users can be banned again right away."""
+        with self._cond:
+            self._recent.clear()
+
+    def take_stats(self):
+        """Return and reset the counters accumulated since the last call, plus the queue length."""
+        with self._cond:
+            stats = dict(self.stats, queued=len(self._pending))
+            for key in self.stats:
+                self.stats[key] = 0
+        return stats
+
+    def _count(self, key):
+        self.stats[key] += 1
+        BANS.inc(key)
+
+    def _push(self, request, due):
+        request.due = due
+        heapq.heappush(self._schedule, (due, next(self._sequence), request.userid))
+        self._cond.notify_all()
+
+    def _adopt(self):
+        """Load this worker's persisted bans, taking over those of workers that stopped heartbeating."""
+        self._next_adopt = time.monotonic() + self.orphan_after / 3
+        rows = self.store.adopt(self.owner, int(time.time() - self.orphan_after))
+        adopted = 0
+        with self._cond:
+            for row in rows:
+                if row.userid not in self._pending:
+                    links = row.links.split("\n") if row.links else []
+                    request = BanRequest(row.userid, row.reason, links, row.blacklist_fingerprint,
+                                         row.rules_fingerprint, row.rule, row.field, row.keyword, row.attempts)
+                    self._pending[row.userid] = request
+                    self._push(request, time.monotonic())
+                    adopted += 1
+            BANS_QUEUED.set(len(self._pending))
+        if adopted:
+            main_logger.info(f"Ban dispatcher resumed {adopted} pending bans.")
+
+    def _recently_banned(self, userid):
+        banned_at = self._recent.get(userid)
+        return banned_at is not None and time.monotonic() - banned_at < self.recent_ttl
+
+    def _remember(self, userid):
+        now = time.monotonic()
+        self._recent[userid] = now
+        self._recent.move_to_end(userid)
+        while self._recent and (len(self._recent) > self.max_recent
+                                or now - next(iter(self._recent.values())) >= self.recent_ttl):
+            self._recent.popitem(last=False)
+
+    def _next_due(self, generation):
+        """Wait for the next ban that is due and allowed by the rate limit (called with the lock held).
+
+        Returns None when the dispatcher stops, or when it is time for an adoption pass.
+        """
+        while self._running and self._generation == generation:
+            now = time.monotonic()
+            if now >= self._next_adopt:
+                return None
+            if not self._schedule:
+                self._cond.wait(self._next_adopt - now)
+                continue
+            due, _, userid = self._schedule[0]
+            wake = min(max(due, self._next_slot), self._next_adopt)
+            if wake > now:
+                self._cond.wait(wake - now)
+                continue
+            if due > now or self._next_slot > now:
+                continue
+            heapq.heappop(self._schedule)
+            request = self._pending.get(userid)
+            if request is None or request.due != due:
+                continue  # superseded by a later schedule entry
+            self._next_slot = now + self.interval
+            return request
+        return None
+
+    def _run(self, generation):
+        while True:
+            with self._cond:
+                request = self._next_due(generation)
+                if request is None and not (self._running and self._generation == generation):
+                    return
+            if request is None:
+                try:
+                    self._adopt()
+                except Exception as e:
+                    error_logger.error(f"Error adopting pending bans: {e}")
+                continue
+            try:
+                self._attempt(request)
+            except Exception as e:
+                error_logger.error(f"Error dispatching ban for user {request.userid}: {e}")
+
+    def _attempt(self, request):
+        if request.banned:
+            self._settle(request)
+            return
+        try:
+            banned = self.ban_func(request.userid, request.reason)
+            error = None if banned else "ban request failed"
+        except Exception as e:
+            banned, error = False, str(e)
+
+        if banned:
+            # From here on only the recording is retried, never the ban itself
+            request.banned = True
+            request.attempts = 0
+            with self._cond:
+                self._remember(request.userid)
+                self._count("banned")
+            self._settle(request)
+            return
+
+        # Only the dispatch thread touches a queued request's attempts
+        request.attempts += 1
+        if request.attempts >= self.max_attempts:
+            # Give up and keep the row as "failed". The threads stay unseen, but the cursor only re-reads
+            # the first listing page, so the ban is queued again only if one of them shows up there again.
+            self.store.record_attempt(request.userid, request.attempts, "failed", error)
+            with self._cond:
+                self._pending.pop(request.userid, None)
+                BANS_QUEUED.set(len(self._pending))
+                self._count("failed")
+                self._cond.notify_all()
+            error_logger.error(f"Giving up on banning user {request.userid} after {request.attempts} attempts.")
+            return
+        delay = min(self.max_retry_delay, self.retry_delay * 2 ** (request.attempts - 1))
+        self.store.record_attempt(request.userid, request.attempts, "pending", error)
+        with self._cond:
+            self._count("retried")
+            self._push(request, time.monotonic() + delay)
+        main_logger.info(f"Retrying ban for user {request.userid} in {delay:.0f}s (attempt {request.attempts}).")
+
+    def _settle(self, request):
+        """Record a ban that went through; if the store fails, the request stays queued for another try."""
+        try:
+            completed = self.store.complete(request.userid, request.links[0] if request.links else None,
+                                            request.rule, request.field, request.keyword)
+        except Exception as e:
+            # The row is still pending and the user is still in _pending, so adoption does not resend the ban
+            request.attempts += 1
+            delay = min(self.max_retry_delay, self.retry_delay * 2 ** (request.attempts - 1))
+            error_logger.error(f"Error recording ban of user {request.userid}, retrying in {delay:.0f}s: {e}")
+            with self._cond:
+                self._push(request, time.monotonic() + delay)
+            return
+        # Links submitted until now are on the request; later submits see the user as recently banned
+        with self._cond:
+            self._pending.pop(request.userid, None)
+            BANS_QUEUED.set(len(self._pending))
+            links = list(dict.fromkeys(request.links + completed))
+            self._cond.notify_all()
+        if self.on_banned:
+            self.on_banned(request.userid, links, request.blacklist_fingerprint, request.rules_fingerprint)
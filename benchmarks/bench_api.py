@@ -0,0 +1,264 @@
+"""Admin API latency under load while the monitor crawls the stand-in forum.
+
+Usage: python benchmarks/bench_api.py [--duration 30] [--rate 100] [--clients 16] [--engine threaded|async]
+                                      [--seed-rows 50000] [--import-every 5] [--monitor-process]
+                                      [--output results.json]
+
+The API runs under uvicorn in a subprocess. The monitor crawls the stand-in forum
+(benchmarks/fake_forum.py, another subprocess) inside the API process, started through
+/start-monitor. With --monitor-process it runs as a separate worker.py process instead. While it crawls,
+--clients keep-alive connections send --rate requests per second in total, a mix of:
+- /health, /check-jobs and /metrics;
+- /entries pages and prefix searches;
+- /add writes.
+Every --import-every seconds a 20k-row /import lands on top. Latency is measured from when each
+request was due, so a stalled server is not hidden by clients that stop sending while they wait.
+
+Reported: per-endpoint request count, p50/p99/max latency in ms, errors (5xx or failed
+connections), and the thread pages the monitor fetched during the run. The results, the parameters and
+the git revision are written as JSON to --output (default benchmarks/results/api-<timestamp>.json).
+"""
+import argparse
+import http.client
+import json
+import os
+import random
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import urllib.request
+import uuid
+from urllib.parse import urlencode
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+BENCHMARKS = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, BENCHMARKS)
+
+from bench_e2e import git_revision, start_forum  # noqa: E402
+from fake_forum import SPAM_KEYWORD, monitor_env  # noqa: E402
+
+# (name, weight) of the requests each client picks from; --write-weight sets the weight of "add"
+REQUEST_MIX = (("health", 30), ("check-jobs", 15), ("metrics", 5), ("entries", 20), ("search", 15), ("add", 2))
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def multipart(filename, content):
+    boundary = uuid.uuid4().hex
+    body = (f"--{boundary}\r\nContent-Disposition: form-data; name=\"file\"; filename=\"{filename}\"\r\n"
+            f"Content-Type: text/plain\r\n\r\n").encode("utf-8") + content + f"\r\n--{boundary}--\r\n".encode("utf-8")
+    return body, f"multipart/form-data; boundary={boundary}"
+
+
+def request(connection, method, path, body=None, content_type=None):
+    headers = {"Content-Type": content_type} if content_type else {}
+    connection.request(method, path, body=body, headers=headers)
+    response = connection.getresponse()
+    payload = response.read()
+    return response.status, payload
+
+
+def start_api(env, port, log_path):
+    with open(log_path, "w", encoding="utf-8") as log:
+        api = subprocess.Popen(
+            [sys.executable, "-m", "uvicorn", "main:app", "--host", "127.0.0.1", "--port", str(port),
+             "--log-level", "warning"],
+            cwd=ROOT, env=env, stdout=log, stderr=subprocess.STDOUT,
+        )
+    deadline = time.monotonic() + 30
+    while time.monotonic() < deadline:
+        try:
+            connection = http.client.HTTPConnection("127.0.0.1", port, timeout=5)
+            if request(connection, "GET", "/health")[0] == 200:
+                return api
+        except OSError:
+            time.sleep(0.2)
+    api.terminate()
+    raise RuntimeError("The API did not start listening.")
+
+
+def percentile(values, fraction):
+    return values[min(len(values) - 1, int(len(values) * fraction))] if values else None
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--duration", type=float, default=30, help="seconds of measured load")
+    parser.add_argument("--rate", type=float, default=100, help="API requests per second, 0 = as fast as possible")
+    parser.add_argument("--clients", type=int, default=16, help="concurrent keep-alive API clients")
+    parser.add_argument("--engine", choices=("threaded", "async"), default="threaded")
+    parser.add_argument("--max-threads", type=int, default=5)
+    parser.add_argument("--concurrency", type=int, default=100)
+    parser.add_argument("--seed-rows", type=int, default=50000, help="links imported before the run")
+    parser.add_argument("--write-weight", type=int, default=2, help="share of /add requests in the mix (of ~87)")
+    parser.add_argument("--import-every", type=float, default=5, help="seconds between 20k-row imports, 0 = none")
+    parser.add_argument("--latency", type=float, default=0.05, help="stand-in forum seconds added to every response")
+    parser.add_argument("--post-rate", type=float, default=2.0, help="new threads per second per section")
+    parser.add_argument("--monitor-process", action="store_true", help="run the monitor as worker.py, not in the API")
+    parser.add_argument("--output", help="JSON results file")
+    args = parser.parse_args()
+    forum_args = argparse.Namespace(latency=args.latency, threads_per_page=30, post_rate=args.post_rate,
+                                    error_rate=0.0, reset_rate=0.0, rate_limit=0, retry_after=1, seed=0, replay=None)
+
+    forum, forum_url = start_forum(forum_args)
+    workdir = tempfile.mkdtemp(prefix="bench-api-")
+    env = dict(os.environ, **monitor_env(forum_url, workdir))
+    port = free_port()
+    api = start_api(env, port, os.path.join(workdir, "api.log"))
+    worker = None
+
+    try:
+        def setup(method, path, body=None, content_type=None):
+            # A fresh connection each time; uvicorn drops keep-alive connections idle for 5 s
+            return request(http.client.HTTPConnection("127.0.0.1", port, timeout=60), method, path, body, content_type)
+
+        seed = "\n".join(f"seed{i}.spam.example" for i in range(args.seed_rows)).encode("utf-8")
+        setup("POST", "/import/links", *multipart("seed.txt", seed))
+        setup("POST", "/import/description", *multipart("seed.txt", f"{SPAM_KEYWORD}\n".encode("utf-8")))
+        monitor_args = {"engine": args.engine, "max_threads": args.max_threads, "concurrency": args.concurrency,
+                        "cycle_delay": 0, "min_interval": 0, "max_interval": 5}
+        if args.monitor_process:
+            command = [sys.executable, "worker.py"]
+            for name, value in monitor_args.items():
+                command += [f"--{name.replace('_', '-')}", str(value)]
+            with open(os.path.join(workdir, "worker.log"), "w", encoding="utf-8") as log:
+                worker = subprocess.Popen(command, cwd=ROOT, env=env, stdout=log, stderr=subprocess.STDOUT)
+        else:
+            status, payload = setup("POST", f"/start-monitor?{urlencode(monitor_args)}")
+            if status != 200:
+                raise RuntimeError(f"Could not start the monitor: {payload!r}")
+        time.sleep(2)  # Let the first cycle get going
+
+        latencies = {name: [] for name, _ in REQUEST_MIX}
+        latencies["import"] = []
+        errors = {name: 0 for name in latencies}
+        lock = threading.Lock()
+        deadline = time.monotonic() + args.duration
+
+        def record(name, started, status):
+            elapsed = time.perf_counter() - started
+            with lock:
+                latencies[name].append(elapsed)
+                if status >= 500:
+                    errors[name] += 1
+
+        def client(number):
+            rng = random.Random(number)
+            names = [name for name, _ in REQUEST_MIX]
+            weights = [args.write_weight if name == "add" else weight for name, weight in REQUEST_MIX]
+            connection = http.client.HTTPConnection("127.0.0.1", port, timeout=60)
+            interval = args.clients / args.rate if args.rate else 0
+            due = time.perf_counter() + rng.random() * interval
+            sequence = 0
+            while time.monotonic() < deadline:
+                name = rng.choices(names, weights)[0]
+                if name == "health":
+                    method, path, body, content_type = "GET", "/health", None, None
+                elif name == "check-jobs":
+                    method, path, body, content_type = "GET", "/check-jobs", None, None
+                elif name == "metrics":
+                    method, path, body, content_type = "GET", "/metrics", None, None
+                elif name == "entries":
+                    after = rng.randrange(args.seed_rows)
+                    method, path, body, content_type = "GET", f"/entries/links?after={after}", None, None
+                elif name == "search":
+                    method, path, body, content_type = "GET", f"/entries/links?q=seed{rng.randrange(1000)}", None, None
+                else:
+                    sequence += 1
+                    body = urlencode({"value": f"client{number}-{sequence}.example"})
+                    method, path, content_type = "POST", "/add/links", "application/x-www-form-urlencoded"
+                now = time.perf_counter()
+                if due > now:
+                    time.sleep(due - now)
+                started = due if interval else time.perf_counter()
+                due += interval
+                try:
+                    status, _ = request(connection, method, path, body, content_type)
+                except (OSError, http.client.HTTPException):
+                    status = 599
+                    connection = http.client.HTTPConnection("127.0.0.1", port, timeout=60)
+                record(name, started, status)
+
+        def importer():
+            batch = 0
+            while time.monotonic() + args.import_every < deadline:
+                time.sleep(args.import_every)
+                batch += 1
+                content = "\n".join(f"import{batch}-{i}.spam.example" for i in range(20000)).encode("utf-8")
+                started = time.perf_counter()
+                try:
+                    status, _ = setup("POST", "/import/links", *multipart("batch.txt", content))
+                except (OSError, http.client.HTTPException):
+                    status = 599
+                record("import", started, status)
+
+        def threads_fetched():
+            with urllib.request.urlopen(f"{forum_url}/__stats") as response:
+                return json.load(response)["counts"]["thread"]
+
+        threads_before = threads_fetched()
+        threads = [threading.Thread(target=client, args=(number,)) for number in range(args.clients)]
+        if args.import_every > 0:
+            threads.append(threading.Thread(target=importer))
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        monitor_threads = threads_fetched() - threads_before
+        if not args.monitor_process:
+            setup("POST", "/stop-monitor")
+    finally:
+        if worker:
+            worker.terminate()
+            worker.wait()
+        api.terminate()
+        api.wait()
+        forum.terminate()
+        forum.wait()
+
+    endpoints = {}
+    for name, values in latencies.items():
+        values.sort()
+        endpoints[name] = {
+            "requests": len(values),
+            "errors": errors[name],
+            "p50_ms": round(percentile(values, 0.50) * 1000, 1) if values else None,
+            "p99_ms": round(percentile(values, 0.99) * 1000, 1) if values else None,
+            "max_ms": round(values[-1] * 1000, 1) if values else None,
+        }
+    total = sum(endpoint["requests"] for endpoint in endpoints.values())
+    metrics = {
+        "requests_per_second": round(total / args.duration, 1),
+        "monitor_threads": monitor_threads,
+        "endpoints": endpoints,
+    }
+    result = {
+        "benchmark": "api",
+        "revision": git_revision(),
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "parameters": vars(args),
+        "metrics": metrics,
+    }
+
+    output = args.output or os.path.join(BENCHMARKS, "results", f"api-{time.strftime('%Y%m%d-%H%M%S')}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, "w", encoding="utf-8") as file:
+        json.dump(result, file, indent=2)
+
+    print(f"{'endpoint':<12} {'requests':>9} {'errors':>7} {'p50 ms':>8} {'p99 ms':>8} {'max ms':>8}")
+    for name, endpoint in endpoints.items():
+        print(f"{name:<12} {endpoint['requests']:>9} {endpoint['errors']:>7} {endpoint['p50_ms']!s:>8} "
+              f"{endpoint['p99_ms']!s:>8} {endpoint['max_ms']!s:>8}")
+    print(f"{metrics['requests_per_second']} requests/s; the monitor fetched {monitor_threads} threads during the run")
+    print(f"Results written to {output}")
+
+
+if __name__ == "__main__":
+    main()
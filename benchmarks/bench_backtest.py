@@ -0,0 +1,178 @@
+"""Backtest benchmark: a synthetic thread archive of N records replayed against current and candidate rules.
+
+Usage: python benchmarks/bench_backtest.py [--records 1000000] [--check 2000] [--keep DIR] [--text-cache-chars N]
+
+The archive gets --records thread records, a tenth of them re-archived copies of an earlier topic,
+with descriptions of about --description-words random words and a few hidden links. The
+blacklist has --keywords description keywords, --domains link domains and 200 title keywords.
+Timed, each on the same Backtester so later runs reuse the search results of earlier ones:
+- cold: current rules against themselves, loading the archive and searching every eligible record;
+- threshold: the first rule's op_user_posts limit raised, so more records become eligible;
+- add: three description keywords and a link domain added;
+- remove: a hundred description keywords removed.
+Also reported: archive size on disk and write time. --check records of the last run are replayed
+through the monitor's own matching (nulled._find_violation) to check the verdicts.
+"""
+import argparse
+import os
+import random
+import shutil
+import string
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from archive import COLUMNS, INT_COLUMNS, list_segments, write_segment  # noqa: E402
+from backtest import DEFAULT_TEXT_CACHE_CHARS, Backtester, apply_blacklist_changes  # noqa: E402
+from rules import compile_rules  # noqa: E402
+
+GROUPS = ("member", "member", "member", "vip", "moderator")
+TLDS = ("com", "net", "org", "io", "nz", "ru")
+RULES = {"rules": [
+    {"name": "Low Engagement Ban", "op_user_group": "member",
+     "conditions": {"op_user_posts": "< 20", "op_user_threads": "< 10", "op_user_likes": "< 10"},
+     "blacklist_fields": ["descriptions", "links"]},
+    {"name": "Suspicious Title Ban", "op_user_group": "member",
+     "conditions": {"op_user_posts": "< 5", "op_user_threads": "< 5"},
+     "blacklist_fields": ["titles"]},
+]}
+
+
+def word(rng, low=3, high=9):
+    return "".join(rng.choice(string.ascii_lowercase) for _ in range(rng.randint(low, high)))
+
+
+def build_blacklist(rng, args, vocabulary, domains):
+    return {
+        "descriptions": [f"{rng.choice(vocabulary)} {word(rng)}" for _ in range(args.keywords)],
+        "links": rng.sample(domains, args.domains),
+        "titles": [word(rng, 6, 10) for _ in range(200)],
+    }
+
+
+def build_archive(rng, args, directory, blacklist, vocabulary, domains):
+    """Write the synthetic archive in segments of --segment-rows; returns seconds spent writing."""
+    now = int(time.time())
+    rows, writing, topic = [], 0.0, 0
+    descriptions, titles = blacklist["descriptions"], blacklist["titles"]
+    for number in range(args.records):
+        if topic and rng.random() < 0.1:
+            thread = rng.randint(1, topic)
+        else:
+            topic += 1
+            thread = topic
+        words = rng.choices(vocabulary, k=args.description_words)
+        if rng.random() < 0.03:
+            words.insert(rng.randrange(len(words)), rng.choice(descriptions))
+        links = [f"https://{rng.choice(domains)}/{word(rng)}" for _ in range(rng.randint(0, 3))]
+        title = " ".join(rng.choices(vocabulary, k=5))
+        if rng.random() < 0.01:
+            title += " " + rng.choice(titles)
+        description = " ".join(words)
+        userid = str(rng.randint(1, args.records // 4))
+        rows.append((
+            now - args.records + number, thread,
+            f"https://www.nulled.to/topic/{thread}-thread/", userid, rng.randint(0, 60), rng.randint(0, 20),
+            title, description[:200], description, ", ".join(links), "", "", rng.randint(-5, 50), rng.randint(0, 40),
+            rng.choice(GROUPS),
+        ))
+        if len(rows) == args.segment_rows:
+            started = time.perf_counter()
+            write_segment(os.path.join(directory, f"{number:014d}-bench-000000.seg"), rows)
+            writing += time.perf_counter() - started
+            rows = []
+    if rows:
+        started = time.perf_counter()
+        write_segment(os.path.join(directory, f"{args.records:014d}-bench-000000.seg"), rows)
+        writing += time.perf_counter() - started
+    return writing
+
+
+def check(backtester, rule_set, blacklist, sample):
+    """Replay sampled live records through nulled._find_violation; returns how many verdicts differ."""
+    from matcher import compile_blacklist
+    from nulled import _find_violation
+
+    segments = backtester.refresh()
+    masks = backtester.latest(segments)
+    verdicts = backtester.evaluate(segments, masks, rule_set, blacklist)
+    expected = {}
+    for name, matches in verdicts.matches.items():
+        for row, rule, field, keyword in matches:
+            expected[(name, row)] = (rule.name, field, keyword)
+    matchers = compile_blacklist(blacklist)
+    rng = random.Random(0)
+    live = [(index, row) for index, mask in enumerate(masks) for row in mask.nonzero()[0].tolist()]
+    sampled = {}
+    for index, row in rng.sample(live, min(sample, len(live))):
+        sampled.setdefault(index, []).append(row)
+    differences = 0
+    for index, rows in sampled.items():
+        segment = segments[index].segment
+        values = {column: segment.ints(column)[0][rows].tolist() if column in INT_COLUMNS
+                  else segment.strings(column, rows) for column in COLUMNS}
+        for position, row in enumerate(rows):
+            violation = _find_violation({column: values[column][position] for column in COLUMNS}, rule_set, matchers)
+            got = (violation[0].name, violation[1], violation[2]) if violation else None
+            if got != expected.get((segment.name, row)):
+                differences += 1
+    return differences
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--records", type=int, default=1_000_000)
+    parser.add_argument("--segment-rows", type=int, default=10_000)
+    parser.add_argument("--description-words", type=int, default=60)
+    parser.add_argument("--keywords", type=int, default=2000, help="description keywords in the blacklist")
+    parser.add_argument("--domains", type=int, default=5000, help="link domains in the blacklist")
+    parser.add_argument("--check", type=int, default=2000, help="records checked against nulled._find_violation")
+    parser.add_argument("--keep", help="write the archive to this directory and keep it")
+    parser.add_argument("--text-cache-chars", type=int, default=DEFAULT_TEXT_CACHE_CHARS,
+                        help="searched text the Backtester keeps between runs")
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    vocabulary = [word(rng) for _ in range(20_000)]
+    domains = [f"{word(rng)}.{rng.choice(TLDS)}" for _ in range(50_000)]
+    blacklist = build_blacklist(rng, args, vocabulary, domains)
+    directory = args.keep or tempfile.mkdtemp(prefix="bench-archive-")
+    os.makedirs(directory, exist_ok=True)
+    try:
+        started = time.perf_counter()
+        writing = build_archive(rng, args, directory, blacklist, vocabulary, domains)
+        size = sum(os.path.getsize(path) for path in list_segments(directory))
+        print(f"{args.records} records in {len(list_segments(directory))} segments: {size / 2 ** 20:.0f} MB on disk, "
+              f"{writing:.1f}s writing ({time.perf_counter() - started:.1f}s with generation)")
+
+        rule_set = compile_rules(RULES)
+        looser = compile_rules({"rules": [dict(RULES["rules"][0], conditions=dict(
+            RULES["rules"][0]["conditions"], op_user_posts="< 40"))] + RULES["rules"][1:]})
+        added = apply_blacklist_changes(blacklist, add={
+            "descriptions": [f"{vocabulary[1]} {vocabulary[2]}", vocabulary[3], "free download"],
+            "links": ["example.com"],
+        })
+        removed = apply_blacklist_changes(blacklist, remove={"descriptions": blacklist["descriptions"][:100]})
+        current = (rule_set, blacklist)
+        backtester = Backtester(directory, args.text_cache_chars)
+        print(f"{'run':<10} {'seconds':>8} {'load s':>7} {'users':>7} {'new':>6} {'dropped':>8}")
+        for label, candidate in (("cold", current), ("threshold", (looser, blacklist)),
+                                 ("add", (rule_set, added)), ("remove", (rule_set, removed))):
+            report = backtester.run(current, candidate, examples=5)
+            print(f"{label:<10} {report['seconds']:>8.2f} {report['load_seconds']:>7.2f} "
+                  f"{report['candidate']['users']:>7} {report['diff']['newly_banned']:>6} "
+                  f"{report['diff']['no_longer_banned']:>8}")
+        if args.check:
+            print(f"Verdicts differing from nulled._find_violation: "
+                  f"{check(backtester, looser, added, args.check)} of {args.check} sampled records")
+    finally:
+        if not args.keep:
+            shutil.rmtree(directory, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,182 @@
+"""End-to-end monitor benchmark: runs monitor_forum against the stand-in forum for N cycles.
+
+Usage: python benchmarks/bench_e2e.py [--engine threaded|async] [--cycles 5] [--latency 0.05]
+                                      [--post-rate 0.5] [--error-rate 0.01] [--reset-rate 0.0]
+                                      [--rate-limit 20] [--user-rate 0] [--mod-rate 0]
+                                      [--replay benchmarks/recordings] [--output results.json]
+
+The stand-in forum (benchmarks/fake_forum.py) runs in a subprocess, so the peak RSS reported is
+the monitor's own. A cycle is one pass of the monitor over the sections due at that moment.
+After the last cycle the ban dispatcher is drained, so queued bans count towards the latency.
+
+Reported: threads/sec, p50/p99 post-to-ban latency of spam threads, requests per cycle, requests
+the forum answered with 429 (with --rate-limit) and peak RSS. The results, the parameters and the
+git revision are written as JSON to --output (default benchmarks/results/e2e-<engine>-<timestamp>.json)
+for comparison across versions.
+"""
+import argparse
+import json
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.request
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+BENCHMARKS = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, BENCHMARKS)
+
+from fake_forum import monitor_env, seed_blacklist  # noqa: E402
+
+
+def start_forum(args):
+    command = [
+        sys.executable, os.path.join(BENCHMARKS, "fake_forum.py"), "--port", "0",
+        "--latency", str(args.latency), "--threads-per-page", str(args.threads_per_page),
+        "--post-rate", str(args.post_rate), "--error-rate", str(args.error_rate),
+        "--reset-rate", str(args.reset_rate), "--seed", str(args.seed),
+        "--rate-limit", str(args.rate_limit), "--retry-after", str(args.retry_after),
+    ]
+    if args.replay:
+        command += ["--replay", args.replay]
+    forum = subprocess.Popen(command, stdout=subprocess.PIPE, text=True)
+    line = forum.stdout.readline()
+    if not line:
+        raise RuntimeError("The stand-in forum exited before it started listening.")
+    return forum, line.rsplit(" ", 1)[-1].strip()
+
+
+def git_revision():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--engine", choices=("threaded", "async"), default="threaded")
+    parser.add_argument("--cycles", type=int, default=5)
+    parser.add_argument("--max-seconds", type=float, default=600, help="stop early after this long")
+    parser.add_argument("--latency", type=float, default=0.05, help="seconds added to every response")
+    parser.add_argument("--threads-per-page", type=int, default=30)
+    parser.add_argument("--post-rate", type=float, default=0.5, help="new threads per second per section")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="fraction of requests answered with 503")
+    parser.add_argument("--reset-rate", type=float, default=0.0, help="fraction of connections dropped")
+    parser.add_argument("--rate-limit", type=int, default=0,
+                        help="requests per second the forum allows each cookie role before answering 429")
+    parser.add_argument("--retry-after", type=int, default=1, help="Retry-After seconds of the forum's 429s")
+    parser.add_argument("--user-rate", type=float, default=0, help="USER_RATE: listing requests per second")
+    parser.add_argument("--mod-rate", type=float, default=0, help="MOD_RATE: thread and ban requests per second")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--replay", metavar="DIR", help="serve pages recorded by fake_forum.py --record")
+    parser.add_argument("--page-range", type=int, default=3)
+    parser.add_argument("--max-threads", type=int, default=5)
+    parser.add_argument("--concurrency", type=int, default=100)
+    parser.add_argument("--cycle-delay", type=int, default=0, help="starting per-section poll interval")
+    parser.add_argument("--ban-rate", type=float, default=0, help="moderator bans per second, 0 = unlimited")
+    parser.add_argument("--output", help="JSON results file")
+    args = parser.parse_args()
+
+    forum, url = start_forum(args)
+    os.environ.update(monitor_env(url, tempfile.mkdtemp(prefix="bench-e2e-"), BAN_RATE=args.ban_rate,
+                                  USER_RATE=args.user_rate, MOD_RATE=args.mod_rate))
+    os.chdir(ROOT)
+
+    import logging
+    import nulled
+    logging.getLogger().setLevel(logging.WARNING)
+    seed_blacklist()
+
+    # Count cycles by wrapping the per-poll entry point the chosen engine calls
+    cycles = {"completed": 0, "section_polls": 0}
+    if args.engine == "async":
+        import async_engine
+        run_cycle = async_engine.run_async_cycle
+
+        async def counted_cycle(client, page_range, rules_config_path, sections, scheduler):
+            result = await run_cycle(client, page_range, rules_config_path, sections, scheduler)
+            cycles["completed"] += 1
+            cycles["section_polls"] += len(sections)
+            return result
+        async_engine.run_async_cycle = counted_cycle
+    else:
+        run_cycle = nulled.run_threaded_cycle
+
+        def counted_cycle(*cycle_args, **cycle_kwargs):
+            result = run_cycle(*cycle_args, **cycle_kwargs)
+            cycles["completed"] += 1
+            cycles["section_polls"] += len(cycle_kwargs["sections"])
+            return result
+        nulled.run_threaded_cycle = counted_cycle
+
+    started = time.monotonic()
+    deadline = started + args.max_seconds
+
+    def stop_signal():
+        return cycles["completed"] < args.cycles and time.monotonic() < deadline
+
+    nulled.monitor_forum(max_threads=args.max_threads, page_range=args.page_range, cycle_delay=args.cycle_delay,
+                         stop_signal=stop_signal, engine=args.engine, concurrency=args.concurrency,
+                         min_interval=0, max_interval=max(args.cycle_delay, 60))
+    crawl_seconds = time.monotonic() - started
+    nulled.ban_dispatcher.start()
+    drained = nulled.ban_dispatcher.drain(timeout=60)
+    nulled.ban_dispatcher.stop()
+
+    section_ids = [section.strip("/").split("/")[-1].split("-")[0] for section in nulled.FORUM_SECTIONS]
+    query = "&".join(f"section={section_id}" for section_id in section_ids)
+    with urllib.request.urlopen(f"{url}/__stats?{query}") as response:
+        forum_stats = json.load(response)
+    forum.terminate()
+    forum.wait()
+
+    counts = forum_stats["counts"]
+    requests_total = sum(counts.values())
+    completed = max(cycles["completed"], 1)
+    metrics = {
+        "cycles": cycles["completed"],
+        "section_polls": cycles["section_polls"],
+        "crawl_seconds": round(crawl_seconds, 3),
+        "threads_fetched": counts["thread"],
+        "threads_per_second": round(counts["thread"] / crawl_seconds, 2) if crawl_seconds else None,
+        "requests_total": requests_total,
+        "requests_per_cycle": round(requests_total / completed, 1),
+        "requests": counts,
+        "throttled": counts.get("throttled", 0),
+        "bans": forum_stats["banned"],
+        "spam_banned": forum_stats["spam_banned"],
+        "spam_missed": forum_stats["spam_missed"],
+        "false_bans": forum_stats["false_bans"],
+        "bans_drained": drained,
+        "ban_latency_p50": forum_stats["ban_latency_p50"],
+        "ban_latency_p99": forum_stats["ban_latency_p99"],
+        "peak_rss_mb": round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1),
+    }
+    result = {
+        "benchmark": "e2e",
+        "revision": git_revision(),
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "parameters": vars(args),
+        "metrics": metrics,
+    }
+
+    output = args.output or os.path.join(
+        BENCHMARKS, "results", f"e2e-{args.engine}-{time.strftime('%Y%m%d-%H%M%S')}.json"
+    )
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, "w", encoding="utf-8") as file:
+        json.dump(result, file, indent=2)
+
+    for name, value in metrics.items():
+        if name != "requests":
+            print(f"{name:<20} {value}")
+    print(f"Results written to {output}")
+
+
+if __name__ == "__main__":
+    main()
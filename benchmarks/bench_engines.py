@@ -0,0 +1,85 @@
+"""Throughput of the threaded vs async monitor engines against the local stand-in forum.
+
+Usage: python benchmarks/bench_engines.py [--latency 0.05] [--max-threads 5] [--concurrency 100]
+"""
+import argparse
+import asyncio
+import os
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--latency", type=float, default=0.05, help="seconds added to every response")
+    parser.add_argument("--threads-per-page", type=int, default=30)
+    parser.add_argument("--page-range", type=int, default=3)
+    parser.add_argument("--max-threads", type=int, default=5)
+    parser.add_argument("--concurrency", type=int, default=100)
+    args = parser.parse_args()
+
+    from fake_forum import monitor_env, seed_blacklist, start_server
+    server, state, url = start_server(latency=args.latency, threads_per_page=args.threads_per_page)
+
+    os.environ.update(monitor_env(url, tempfile.mkdtemp(prefix="bench-engines-")))
+    os.chdir(ROOT)
+
+    import logging
+    import nulled
+    from database import SessionLocal, SeenThread, BannedUser, PendingBan
+    logging.getLogger().setLevel(logging.WARNING)
+    seed_blacklist()
+
+    def reset():
+        db = SessionLocal()
+        db.query(SeenThread).delete()
+        db.query(BannedUser).delete()
+        db.query(PendingBan).delete()
+        db.commit()
+        db.close()
+        nulled.user_profiles.clear()
+        nulled.ban_dispatcher.clear_recent()
+        state.counts["thread"] = state.counts["ban"] = 0
+
+    results = {}
+    nulled.ban_dispatcher.start()
+
+    reset()
+    start = time.perf_counter()
+    nulled.run_threaded_cycle(args.max_threads, args.page_range)
+    nulled.ban_dispatcher.drain()
+    results[f"threaded (max_threads={args.max_threads})"] = (time.perf_counter() - start, state.counts["thread"],
+                                                          state.counts["ban"])
+
+    try:
+        from async_engine import AsyncForumClient, run_async_cycle
+    except ImportError as e:
+        print(f"Skipping async engine: {e}")
+    else:
+        async def run_once():
+            async with AsyncForumClient(concurrency=args.concurrency) as client:
+                return await run_async_cycle(client, args.page_range)
+
+        reset()
+        start = time.perf_counter()
+        asyncio.run(run_once())
+        nulled.ban_dispatcher.drain()
+        results[f"async (concurrency={args.concurrency})"] = (time.perf_counter() - start, state.counts["thread"],
+                                                             state.counts["ban"])
+
+    nulled.ban_dispatcher.stop()
+    server.shutdown()
+    print(f"latency={args.latency}s, {len(nulled.FORUM_SECTIONS)} sections x {args.page_range} pages "
+          f"x {args.threads_per_page} threads")
+    print(f"{'engine':<32} {'threads':>8} {'bans':>6} {'seconds':>8} {'threads/s':>10}")
+    for name, (elapsed, threads, bans) in results.items():
+        print(f"{name:<32} {threads:>8} {bans:>6} {elapsed:>8.2f} {threads / elapsed:>10.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,115 @@
+"""Micro-benchmark: LinkMatcher host index vs KeywordMatcher substring scan on thread links.
+
+Usage: python benchmarks/bench_links.py [--sizes 1000 10000 100000] [--threads 2000] [--links 5]
+
+Each blacklist size gets that many random domains, a tenth of them with a path prefix. Threads
+carry --links hidden links, some on subdomains or paths of blacklisted domains. Every LinkMatcher
+verdict is checked against a plain suffix-and-prefix scan of the whole blacklist. Reported: build
+time, per-thread lookup time of both matchers, and how many threads the substring scan flags
+that the host index does not (lookalike hosts and blacklisted names in query strings).
+"""
+import argparse
+import os
+import random
+import string
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from matcher import KeywordMatcher, LinkMatcher, split_link  # noqa: E402
+
+TLDS = ("com", "net", "org", "io", "nz", "co.uk", "ru")
+
+
+def random_label(rng, low=4, high=12):
+    return "".join(rng.choice(string.ascii_lowercase) for _ in range(rng.randint(low, high)))
+
+
+def build_blacklist(rng, size):
+    entries = []
+    for _ in range(size):
+        domain = f"{random_label(rng)}.{rng.choice(TLDS)}"
+        entries.append(f"{domain}/{random_label(rng, 3, 6)}/" if rng.random() < 0.1 else domain)
+    return entries
+
+
+def build_threads(rng, blacklist, count, links):
+    """Comma-joined op_thread_links values: random hosts, blacklisted hosts and lookalikes."""
+    threads = []
+    for _ in range(count):
+        urls = []
+        for _ in range(links):
+            roll = rng.random()
+            entry = rng.choice(blacklist)
+            if roll < 0.05:
+                separator = "" if entry.endswith("/") else "/"
+                urls.append(f"https://{random_label(rng, 2, 5)}.{entry}{separator}{random_label(rng, 0, 4)}")
+            elif roll < 0.10:
+                urls.append(f"https://{random_label(rng, 2, 5)}{entry.split('/')[0]}/x")
+            elif roll < 0.15:
+                urls.append(f"https://example.com/out?to={entry.split('/')[0]}")
+            else:
+                urls.append(f"https://{random_label(rng)}.{rng.choice(TLDS)}/{random_label(rng)}")
+        threads.append(", ".join(urls))
+    return threads
+
+
+def reference_match(parsed_entries, text):
+    """Every entry whose host is a link's host or a parent domain of it, and whose path prefixes the link's."""
+    hits = set()
+    for link in text.split(","):
+        host, path = split_link(link)
+        if host is None:
+            continue
+        for index, (entry_host, entry_path) in enumerate(parsed_entries):
+            if (host == entry_host or host.endswith("." + entry_host)) and path.startswith(entry_path):
+                hits.add(index)
+    return sorted(hits)
+
+
+def time_it(func, repeat):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        func()
+    return (time.perf_counter() - start) / repeat
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1_000, 10_000, 100_000])
+    parser.add_argument("--threads", type=int, default=2000, help="threads matched per size")
+    parser.add_argument("--links", type=int, default=5, help="hidden links per thread")
+    parser.add_argument("--check", type=int, default=20, help="threads checked against the reference scan")
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    print(f"{'domains':>8} {'index build (s)':>16} {'substring build (s)':>20} {'index/thread (µs)':>18} "
+          f"{'substring/thread (µs)':>22} {'index hits':>11} {'substring-only hits':>20}")
+    for size in args.sizes:
+        blacklist = build_blacklist(rng, size)
+        threads = build_threads(rng, blacklist, args.threads, args.links)
+
+        start = time.perf_counter()
+        links = LinkMatcher(blacklist)
+        link_build = time.perf_counter() - start
+        start = time.perf_counter()
+        keywords = KeywordMatcher(blacklist)
+        keyword_build = time.perf_counter() - start
+
+        parsed = [split_link(entry) for entry in blacklist]
+        for text in threads[:args.check]:
+            assert links.find_all(text) == reference_match(parsed, text), text
+
+        link_time = time_it(lambda: [links.first_match(text) for text in threads], 3) / len(threads)
+        keyword_time = time_it(lambda: [keywords.first_match(text) for text in threads], 1) / len(threads)
+        link_hits = sum(1 for text in threads if links.first_match(text) is not None)
+        substring_only = sum(1 for text in threads
+                             if keywords.first_match(text) is not None and links.first_match(text) is None)
+        print(f"{size:>8} {link_build:>16.3f} {keyword_build:>20.3f} {link_time * 1e6:>18.1f} "
+              f"{keyword_time * 1e6:>22.1f} {link_hits:>11} {substring_only:>20}")
+
+
+if __name__ == "__main__":
+    main()
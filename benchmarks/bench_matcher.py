@@ -0,0 +1,80 @@
+"""Micro-benchmark: compiled KeywordMatcher vs the per-keyword field_match loop.
+
+Usage: python benchmarks/bench_matcher.py [--sizes 100 10000 100000] [--threads 20]
+"""
+import argparse
+import os
+import random
+import string
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from matcher import KeywordMatcher  # noqa: E402
+
+
+def field_match_loop(keywords, text):
+    """The original monitor_forum_page loop: one lowercase + substring scan per keyword."""
+    for keyword in keywords:
+        if keyword.lower() in text.lower():
+            return keyword
+    return None
+
+
+def random_word(rng, low=5, high=14):
+    return "".join(rng.choice(string.ascii_lowercase) for _ in range(rng.randint(low, high)))
+
+
+def build_corpus(rng, count, length=20000):
+    """Thread bodies roughly the size of a long op_thread_descriptions_full."""
+    words = [random_word(rng, 2, 9) for _ in range(5000)]
+    bodies = []
+    for _ in range(count):
+        body = []
+        size = 0
+        while size < length:
+            word = rng.choice(words)
+            body.append(word)
+            size += len(word) + 1
+        bodies.append(" ".join(body))
+    return bodies
+
+
+def time_it(func, repeat):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        func()
+    return (time.perf_counter() - start) / repeat
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[100, 10_000, 100_000])
+    parser.add_argument("--threads", type=int, default=20, help="thread bodies matched per size")
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    bodies = build_corpus(rng, args.threads)
+
+    print(f"{'keywords':>10} {'build (s)':>10} {'loop/thread (ms)':>17} {'matcher/thread (ms)':>20} {'speedup':>8}")
+    for size in args.sizes:
+        # Keywords are long enough that they almost never hit, i.e. the worst case for the loop
+        keywords = [random_word(rng, 10, 16) for _ in range(size)]
+
+        start = time.perf_counter()
+        matcher = KeywordMatcher(keywords)
+        build = time.perf_counter() - start
+
+        for body in bodies:
+            assert matcher.first_match(body) == field_match_loop(keywords, body)
+
+        loop_time = time_it(lambda: [field_match_loop(keywords, body) for body in bodies], 1) / len(bodies)
+        matcher_time = time_it(lambda: [matcher.first_match(body) for body in bodies], 3) / len(bodies)
+        print(f"{size:>10} {build:>10.3f} {loop_time * 1000:>17.2f} {matcher_time * 1000:>20.2f} "
+              f"{loop_time / matcher_time:>7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,89 @@
+"""Parse time and peak memory per page for each HTML extraction backend.
+
+Usage: python benchmarks/bench_parsers.py [--repeat 20] [--backends fast lxml bs4-lxml bs4]
+
+Fixtures are the saved pages in benchmarks/fixtures: files named listing*.html are parsed
+with extract_thread_links, thread*.html with extract_thread_info. Every backend's output is
+checked against the original BeautifulSoup/html.parser result before it is timed. Listing
+fixtures also time listing_fingerprint, the check that lets an unchanged page skip parsing.
+Peak memory is measured with tracemalloc, which does not see libxml2's own allocations, so the
+lxml figures understate its real footprint.
+"""
+import argparse
+import os
+import statistics
+import sys
+import time
+import tracemalloc
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+FIXTURES = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures")
+sys.path.insert(0, ROOT)
+
+from extract import BACKENDS, extract_thread_info, extract_thread_links  # noqa: E402
+from listing_cache import listing_fingerprint  # noqa: E402
+
+
+def load_fixtures():
+    fixtures = []
+    for name in sorted(os.listdir(FIXTURES)):
+        if not name.endswith(".html"):
+            continue
+        with open(os.path.join(FIXTURES, name), encoding="utf-8") as file:
+            html = file.read()
+        if name.startswith("listing"):
+            fixtures.append((name, html, lambda html, backend: extract_thread_links(html, backend)))
+        elif name.startswith("thread"):
+            fixtures.append((name, html, lambda html, backend: extract_thread_info(html, name, backend)))
+    return fixtures
+
+
+def measure(parse, html, backend, repeat):
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        parse(html, backend)
+        timings.append(time.perf_counter() - start)
+
+    tracemalloc.start()
+    parse(html, backend)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return statistics.median(timings), peak
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--repeat", type=int, default=20)
+    parser.add_argument("--backends", nargs="+", default=list(BACKENDS))
+    args = parser.parse_args()
+
+    print(f"{'fixture':<20} {'KB':>6} {'backend':<11} {'ms/page':>8} {'peak KB':>8} {'vs bs4':>7}")
+    for name, html, parse in load_fixtures():
+        expected = parse(html, "bs4")
+        baseline = None
+        results = []
+        for backend in args.backends:
+            try:
+                output = parse(html, backend)
+            except RuntimeError as e:
+                print(f"{name:<20} {'':>6} {backend:<11} skipped: {e}")
+                continue
+            if output != expected:
+                print(f"{name:<20} {'':>6} {backend:<11} MISMATCH with the bs4 output")
+                continue
+            elapsed, peak = measure(parse, html, backend, args.repeat)
+            if backend == "bs4":
+                baseline = elapsed
+            results.append((backend, elapsed, peak))
+        if name.startswith("listing"):
+            elapsed, peak = measure(lambda html, backend: listing_fingerprint(html), html, None, args.repeat)
+            results.append(("fingerprint", elapsed, peak))
+        for backend, elapsed, peak in results:
+            speedup = f"{baseline / elapsed:.1f}x" if baseline else "-"
+            print(f"{name:<20} {len(html) / 1024:>6.0f} {backend:<11} {elapsed * 1000:>8.2f} "
+                  f"{peak / 1024:>8.0f} {speedup:>7}")
+
+
+if __name__ == "__main__":
+    main()
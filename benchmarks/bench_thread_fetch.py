@@ -0,0 +1,159 @@
+"""Thread page fetch: peak memory and bytes read per page, whole-body reads vs capped and streaming reads.
+
+Usage: python benchmarks/bench_thread_fetch.py [--sizes 0.06 1 10 50] [--backend lxml]
+
+A local HTTP server serves thread pages padded to each size (in MB) two ways:
+- "post": a combolist pasted inline in the opening post;
+- "replies": a short opening post followed by a long tail of replies.
+Every fetch runs in a fresh subprocess, so its peak RSS is its own. The modes are:
+- "old": response.text parsed whole, as the monitor did before;
+- "full": ThreadPageReader capped at --max-bytes, then parsed with --backend;
+- "stream": the capped reader feeding the single-pass parser as it downloads.
+Reported per page and mode: bytes read, fetch+parse time, peak RSS above the process baseline, the
+length of the stored description and whether the hidden link was found.
+"""
+import argparse
+import json
+import os
+import resource
+import subprocess
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+BENCHMARKS = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, BENCHMARKS)
+
+MODES = ("old", "full", "stream")
+COMBO_LINE = "someone{0}@example.com:hunter{0}\n"
+REPLY = ("<div class=\"post_block\"><div class=\"author_info\"><a hovercard-ref=\"member\" hovercard-id=\"{0}\" "
+         "href=\"/user/{0}-user/\">user{0}</a></div><section class=\"post\">thanks for sharing {0}</section></div>\n")
+
+
+def build_page(kind, size):
+    """A fake_forum thread page padded to about ``size`` bytes."""
+    from fake_forum import render_thread
+
+    page = render_thread(42, description_size=200)
+    padding = []
+    length, number = len(page), 0
+    template = COMBO_LINE if kind == "post" else REPLY
+    while length < size:
+        line = template.format(number)
+        padding.append(line)
+        length += len(line)
+        number += 1
+    padding = "".join(padding)
+    if kind == "post":
+        return page.replace("<section id=\"nulledPost\">", "<section id=\"nulledPost\">" + padding, 1).encode("utf-8")
+    return page.replace("</body>", padding + "</body>", 1).encode("utf-8")
+
+
+class PageHandler(BaseHTTPRequestHandler):
+    pages = {}
+
+    def do_GET(self):
+        body = self.pages.get(self.path)
+        if body is None:
+            self.send_error(404)
+            return
+        self.send_response(200)
+        self.send_header("Content-Type", "text/html; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        try:
+            for start in range(0, len(body), 1 << 16):
+                self.wfile.write(body[start:start + (1 << 16)])
+        except (BrokenPipeError, ConnectionResetError):
+            pass  # The streaming reader hung up early
+
+    def log_message(self, *args):
+        pass
+
+
+def peak_rss_kb():
+    # ru_maxrss carries over the parent's peak across fork and exec; VmHWM starts afresh with the exec
+    try:
+        with open("/proc/self/status") as status:
+            for line in status:
+                if line.startswith("VmHWM:"):
+                    return int(line.split()[1])
+    except OSError:
+        pass
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+
+def child(mode, url, backend, max_bytes, text_limit):
+    """Fetch and parse one page; prints a JSON line of measurements."""
+    import requests
+    from extract import ThreadPageReader, extract_thread_info
+
+    session = requests.Session()
+    session.get(url.rsplit("/", 2)[0] + "/warmup")  # Import and connection set-up count towards the baseline
+    baseline = peak_rss_kb()
+    started = time.perf_counter()
+    if mode == "old":
+        response = session.get(url)
+        size = len(response.content)
+        record = extract_thread_info(response.text, url, backend)
+    else:
+        page = ThreadPageReader("utf-8", max_bytes=max_bytes, stream=mode == "stream", text_limit=text_limit)
+        with session.get(url, stream=True) as response:
+            for chunk in response.iter_content(16 * 1024):
+                if page.add(chunk):
+                    break
+        size = page.size
+        record = page.record(url, backend)
+    elapsed = time.perf_counter() - started
+    print(json.dumps({
+        "bytes": size,
+        "ms": round(elapsed * 1000, 1),
+        "peak_mb": round((peak_rss_kb() - baseline) / 1024, 1),
+        "description_chars": len(record["op_thread_descriptions_full"] or ""),
+        "link_found": "mega.nz" in record["op_thread_links"],
+    }))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", type=float, nargs="+", default=[0.06, 1, 10, 50], help="page sizes in MB")
+    parser.add_argument("--backend", default="lxml", help="parser backend of the old and full modes")
+    parser.add_argument("--max-bytes", type=int, default=2 * 1024 * 1024)
+    parser.add_argument("--text-limit", type=int, default=65536)
+    parser.add_argument("--child", nargs=2, metavar=("MODE", "URL"), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.child:
+        child(args.child[0], args.child[1], args.backend, args.max_bytes, args.text_limit)
+        return
+
+    for kind in ("post", "replies"):
+        for size in args.sizes:
+            PageHandler.pages[f"/thread/{kind}/{size}"] = build_page(kind, int(size * 1024 * 1024))
+    PageHandler.pages["/warmup"] = b"ok"
+    server = ThreadingHTTPServer(("127.0.0.1", 0), PageHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    base = f"http://127.0.0.1:{server.server_address[1]}"
+
+    print(f"{'page':<8} {'MB':>6} {'mode':<7} {'KB read':>9} {'ms':>8} {'peak MB':>8} {'desc chars':>11} {'link':>5}")
+    try:
+        for kind in ("post", "replies"):
+            for size in args.sizes:
+                for mode in MODES:
+                    output = subprocess.run(
+                        [sys.executable, __file__, "--child", mode, f"{base}/thread/{kind}/{size}",
+                         "--backend", args.backend, "--max-bytes", str(args.max_bytes),
+                         "--text-limit", str(args.text_limit)],
+                        capture_output=True, text=True, check=True,
+                    ).stdout
+                    result = json.loads(output.strip().splitlines()[-1])
+                    print(f"{kind:<8} {size:>6} {mode:<7} {result['bytes'] // 1024:>9} {result['ms']:>8} "
+                          f"{result['peak_mb']:>8} {result['description_chars']:>11} {result['link_found']!s:>5}")
+    finally:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,419 @@
+"""Local stand-in for the forum, serving synthetic or recorded listing, thread and ban pages.
+
+Usage:
+  python benchmarks/fake_forum.py [--port 8800] [--latency 0.05] [--threads-per-page 30] [--no-etags]
+                                  [--post-rate 0.5] [--error-rate 0.01] [--reset-rate 0.01]
+                                  [--rate-limit 20] [--retry-after 1]
+  python benchmarks/fake_forum.py --record https://www.nulled.to --recordings benchmarks/recordings
+  python benchmarks/fake_forum.py --replay benchmarks/recordings
+
+Synthetic mode generates every section on the fly. Each section starts with ``initial_threads``
+topics and gains ``post_rate`` new ones per second, newest first on page 1. Every
+``spam_every``-th topic carries the blacklisted keyword "cheap-followers-here" and is posted by
+its own one-off account, so post-to-ban latency can be measured per spam thread.
+
+Listing pages end with a footer that changes on every request, like a real forum's render time
+and online-user count. With etags enabled, listings carry an ETag over their thread rows and
+answer a matching If-None-Match with 304.
+
+Record mode proxies listing and thread pages to the live forum. It forwards the client's cookies
+and User-Agent and saves every page under --recordings. Replay mode serves those saved pages.
+Neither mode forwards misc.php: bans are always answered locally, so recording never bans anyone.
+
+``error_rate`` answers that fraction of requests with a 503 and ``reset_rate`` drops the
+connection without a response. ``rate_limit`` allows each client (each Cookie header, so the
+user and moderator sessions separately) that many requests per second; the rest get a 429 with
+``Retry-After: retry_after``. GET /__stats returns request counts and ban latencies as JSON.
+"""
+import argparse
+import hashlib
+import html
+import json
+import os
+import random
+import socket
+import threading
+import time
+import urllib.request
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, parse_qs, quote
+import re
+
+LISTING_RE = re.compile(r"^/forum/(\d+)-[^/]*/page-(\d+)$")
+TOPIC_RE = re.compile(r"^/topic/(\d+)-")
+SPAM_KEYWORD = "cheap-followers-here"
+SPAM_UID_BASE = 900_000_000
+BASE_PLACEHOLDER = "{{FORUM_BASE}}"
+
+
+def author_of(topic_id, spam):
+    return SPAM_UID_BASE + topic_id if spam else 10_000 + topic_id % 5_000
+
+
+def render_listing(base, topic_ids, is_spam):
+    rows = []
+    for topic_id in topic_ids:
+        uid = author_of(topic_id, is_spam(topic_id))
+        rows.append(
+            "<tr><td class=\"col_f_content\">"
+            f"<h4><a class=\"topic_title highlight_unread\" href=\"{base}/topic/{topic_id}-thread-{topic_id}/\">"
+            f"Thread {topic_id}</a></h4>"
+            f"<span class=\"desc\">Started by <a hovercard-ref=\"member\" hovercard-id=\"{uid}\" "
+            f"href=\"{base}/user/{uid}-user/\">user{uid}</a></span>"
+            "</td></tr>"
+        )
+    return "<table class=\"ipb_table\">" + "".join(rows) + "</table>"
+
+
+def wrap_listing(table, footer):
+    return (
+        "<html><head><title>Section</title></head><body>" + table
+        + f"<div id=\"footer\">{html.escape(footer)}</div></body></html>"
+    )
+
+
+def render_thread(topic_id, description_size=4000, spam=False):
+    uid = author_of(topic_id, spam)
+    body = ("lorem ipsum dolor sit amet " * (description_size // 27 + 1))[:description_size]
+    if spam:
+        body += " " + SPAM_KEYWORD
+    return f"""<html><head>
+<title>Thread {topic_id} - Nulled</title>
+<meta name="description" content="{html.escape(body[:150])}">
+<meta name="keywords" content="thread, {topic_id}">
+</head><body>
+<div class="post_wrap">
+<div class="author_info">
+<a hovercard-ref="member" hovercard-id="{uid}" href="/user/{uid}-user/">user{uid}</a>
+<ul class="basic_info"><li class="group_icon"><img src="/public/style_extra/team_icons/member.png"></li></ul>
+<div class="pu-content">Posts: {topic_id % 15}</div>
+<div class="pu-content">Threads: {topic_id % 7}</div>
+<div><strong>{topic_id % 3}</strong><span class="x-smalltext">Rep</span></div>
+<div><strong>{topic_id % 4}</strong><span class="x-smalltext">Likes</span></div>
+</div>
+<section id="nulledPost">{html.escape(body)}
+<div class="hiddencontent"><a href="https://mega.nz/file/{topic_id}">link</a></div>
+</section>
+<div class="signature">sig of user{uid}</div>
+</div>
+</body></html>"""
+
+
+def percentile(values, fraction):
+    if not values:
+        return None
+    ordered = sorted(values)
+    return round(ordered[min(len(ordered) - 1, int(round(fraction * (len(ordered) - 1))))], 3)
+
+
+class RecordingStore:
+    """Pages saved by record mode, one file per request path, with the forum's origin abstracted out."""
+
+    def __init__(self, directory):
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+
+    def _path(self, request_path):
+        return os.path.join(self.directory, quote(request_path.strip("/"), safe="") + ".html")
+
+    def load(self, request_path, base):
+        try:
+            with open(self._path(request_path), encoding="utf-8") as file:
+                return file.read().replace(BASE_PLACEHOLDER, base)
+        except FileNotFoundError:
+            return None
+
+    def save(self, request_path, body, upstream):
+        with open(self._path(request_path), "w", encoding="utf-8") as file:
+            file.write(body.replace(upstream, BASE_PLACEHOLDER))
+
+
+class ForumState:
+    def __init__(self, latency=0.0, threads_per_page=30, spam_every=10, etags=True, initial_threads=100,
+                 post_rate=0.0, error_rate=0.0, reset_rate=0.0, seed=0, record=None, replay=None,
+                 recordings=None, rate_limit=0, retry_after=1):
+        self.latency = latency
+        self.threads_per_page = threads_per_page
+        self.spam_every = spam_every
+        self.etags = etags
+        self.initial_threads = initial_threads
+        self.post_rate = post_rate
+        self.error_rate = error_rate
+        self.reset_rate = reset_rate
+        self.rate_limit = rate_limit
+        self.retry_after = retry_after
+        self.window = None
+        self.window_counts = {}
+        self.random = random.Random(seed)
+        self.upstream = record.rstrip("/") if record else None
+        self.recordings = RecordingStore(replay or recordings) if (record or replay) else None
+        self.started = time.time()
+        self.lock = threading.Lock()
+        self.counts = {"listing": 0, "thread": 0, "ban": 0, "not_modified": 0, "error": 0, "reset": 0, "throttled": 0,
+                       "other": 0}
+        self.banned = set()
+        self.banned_at = {}
+
+    def count(self, kind):
+        with self.lock:
+            self.counts[kind] += 1
+
+    def inject_fault(self):
+        """None, "error" or "reset", drawn with the configured rates."""
+        with self.lock:
+            roll = self.random.random()
+        if roll < self.reset_rate:
+            return "reset"
+        if roll < self.reset_rate + self.error_rate:
+            return "error"
+        return None
+
+    def over_rate_limit(self, client):
+        """Count a request of a client; True if it is over rate_limit requests in the current second."""
+        if not self.rate_limit:
+            return False
+        window = int(time.time())
+        with self.lock:
+            if window != self.window:
+                self.window = window
+                self.window_counts = {}
+            count = self.window_counts[client] = self.window_counts.get(client, 0) + 1
+        return count > self.rate_limit
+
+    def is_spam(self, topic_id):
+        return bool(self.spam_every) and topic_id % self.spam_every == 0
+
+    def topic_count(self, now):
+        return self.initial_threads + int(self.post_rate * max(0.0, now - self.started))
+
+    def posted_at(self, topic_id):
+        number = topic_id % 1_000_000
+        if number < self.initial_threads or not self.post_rate:
+            return self.started
+        return self.started + (number - self.initial_threads + 1) / self.post_rate
+
+    def listing_topics(self, section_id, page, now):
+        newest = self.topic_count(now) - 1 - (page - 1) * self.threads_per_page
+        oldest = max(0, newest - self.threads_per_page + 1)
+        return [section_id * 1_000_000 + number for number in range(newest, oldest - 1, -1)]
+
+    def record_ban(self, uid):
+        with self.lock:
+            self.banned.add(uid)
+            self.banned_at.setdefault(uid, time.time())
+
+    def stats(self, sections=None):
+        """Request counts plus post-to-ban latencies of spam threads posted so far."""
+        now = time.time()
+        with self.lock:
+            counts = dict(self.counts)
+            banned_at = dict(self.banned_at)
+        latencies, missed, false_bans = [], 0, 0
+        spam_uids = set()
+        for section_id in sections or ():
+            for number in range(self.topic_count(now)):
+                topic_id = section_id * 1_000_000 + number
+                if not self.is_spam(topic_id):
+                    continue
+                uid = str(author_of(topic_id, True))
+                spam_uids.add(uid)
+                if uid in banned_at:
+                    latencies.append(banned_at[uid] - self.posted_at(topic_id))
+                else:
+                    missed += 1
+        if sections:
+            false_bans = sum(1 for uid in banned_at if uid not in spam_uids)
+        return {
+            "counts": counts,
+            "banned": len(banned_at),
+            "spam_banned": len(latencies),
+            "spam_missed": missed,
+            "false_bans": false_bans,
+            "ban_latency_p50": percentile(latencies, 0.5),
+            "ban_latency_p99": percentile(latencies, 0.99),
+        }
+
+
+def make_handler(state):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def log_message(self, *args):
+            pass
+
+        def send_body(self, status, body, content_type="text/html; charset=utf-8", extra_headers=None):
+            payload = body.encode("utf-8")
+            self.send_response(status)
+            self.send_header("Content-Type", content_type)
+            self.send_header("Content-Length", str(len(payload)))
+            for name, value in (extra_headers or {}).items():
+                self.send_header(name, value)
+            self.end_headers()
+            self.wfile.write(payload)
+
+        def do_GET(self):
+            parsed = urlparse(self.path)
+            if parsed.path == "/__stats":
+                sections = [int(value) for value in parse_qs(parsed.query).get("section", [])]
+                self.send_body(200, json.dumps(state.stats(sections)), "application/json")
+                return
+
+            if state.latency:
+                time.sleep(state.latency)
+            if state.over_rate_limit(self.headers.get("Cookie", "")):
+                state.count("throttled")
+                self.send_body(429, "Too Many Requests", extra_headers={"Retry-After": str(state.retry_after)})
+                return
+            fault = state.inject_fault()
+            if fault == "reset":
+                state.count("reset")
+                self.close_connection = True
+                self.connection.shutdown(socket.SHUT_RDWR)
+                return
+            if fault == "error":
+                state.count("error")
+                self.send_body(503, "Service Unavailable")
+                return
+
+            base = f"http://{self.headers.get('Host')}"
+            if parsed.path == "/misc.php":
+                state.count("ban")
+                state.record_ban(parse_qs(parsed.query).get("id", [""])[0])
+                self.send_body(200, "ok")
+                return
+            if state.recordings is not None:
+                self.serve_recorded(parsed, base)
+                return
+
+            listing = LISTING_RE.match(parsed.path.rstrip("/"))
+            topic = TOPIC_RE.match(parsed.path)
+            if listing:
+                state.count("listing")
+                topic_ids = state.listing_topics(int(listing.group(1)), int(listing.group(2)), time.time())
+                self.serve_listing(render_listing(base, topic_ids, state.is_spam))
+            elif topic:
+                state.count("thread")
+                topic_id = int(topic.group(1))
+                self.send_body(200, render_thread(topic_id, spam=state.is_spam(topic_id)))
+            else:
+                state.count("other")
+                self.send_error(404)
+
+        def serve_listing(self, table, body=None):
+            extra_headers = {}
+            if state.etags:
+                etag = '"' + hashlib.sha1(table.encode("utf-8")).hexdigest() + '"'
+                if self.headers.get("If-None-Match") == etag:
+                    state.count("not_modified")
+                    self.send_response(304)
+                    self.send_header("ETag", etag)
+                    self.end_headers()
+                    return
+                extra_headers["ETag"] = etag
+            if body is None:
+                body = wrap_listing(table, f"Rendered in {time.perf_counter_ns() % 100_000} ns, "
+                                           f"{state.counts['listing']} online")
+            self.send_body(200, body, extra_headers=extra_headers)
+
+        def serve_recorded(self, parsed, base):
+            kind = "listing" if LISTING_RE.match(parsed.path.rstrip("/")) else "thread"
+            request_path = parsed.path + (f"?{parsed.query}" if parsed.query else "")
+            if state.upstream:
+                upstream_request = urllib.request.Request(state.upstream + request_path, headers={
+                    name: self.headers[name] for name in ("Cookie", "User-Agent") if self.headers.get(name)
+                })
+                try:
+                    with urllib.request.urlopen(upstream_request, timeout=30) as response:
+                        body = response.read().decode("utf-8", errors="replace")
+                except OSError as e:
+                    self.send_body(502, f"Upstream error: {e}")
+                    return
+                state.recordings.save(request_path, body, state.upstream)
+                body = body.replace(state.upstream, base)
+            else:
+                body = state.recordings.load(request_path, base)
+                if body is None:
+                    state.count("other")
+                    self.send_error(404)
+                    return
+            state.count(kind)
+            if kind == "listing":
+                self.serve_listing(body, body)
+            else:
+                self.send_body(200, body)
+
+    return Handler
+
+
+def start_server(port=0, **state_options):
+    """Start the stand-in forum in a background thread; returns (server, state, base_url)."""
+    state = ForumState(**state_options)
+    server = ThreadingHTTPServer(("127.0.0.1", port), make_handler(state))
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, state, f"http://127.0.0.1:{server.server_address[1]}"
+
+
+def monitor_env(base_url, workdir, **settings):
+    """Environment of a monitor crawling the stand-in forum at ``base_url``, with a scratch database in ``workdir``.
+
+    ``settings`` add or override variables.
+    """
+    env = {
+        "BASE_URL": base_url,
+        "USER_COOKIE_STR": "session=user",
+        "MOD_COOKIE_STR": "session=mod",
+        "USER_AGENT": "bench",
+        "BAN_RATE": "0",
+        "DATABASE_URL": f"sqlite:///{os.path.join(workdir, 'bench.sql')}",
+    }
+    env.update((name, str(value)) for name, value in settings.items())
+    return env
+
+
+def seed_blacklist():
+    """Blacklist SPAM_KEYWORD in the monitor's database (DATABASE_URL must be set before the first import)."""
+    from database import SessionLocal, BlacklistDescription, bump_blacklist_version
+
+    db = SessionLocal()
+    try:
+        db.add(BlacklistDescription(description=SPAM_KEYWORD))
+        bump_blacklist_version(db)
+        db.commit()
+    finally:
+        db.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--port", type=int, default=8800)
+    parser.add_argument("--latency", type=float, default=0.05)
+    parser.add_argument("--threads-per-page", type=int, default=30)
+    parser.add_argument("--no-etags", dest="etags", action="store_false")
+    parser.add_argument("--initial-threads", type=int, default=100)
+    parser.add_argument("--post-rate", type=float, default=0.0, help="new threads per second per section")
+    parser.add_argument("--spam-every", type=int, default=10)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--reset-rate", type=float, default=0.0)
+    parser.add_argument("--rate-limit", type=int, default=0, help="requests per second per client, 0 = unlimited")
+    parser.add_argument("--retry-after", type=int, default=1, help="Retry-After seconds of a 429")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--record", metavar="FORUM_URL", help="proxy to the live forum and save every page")
+    parser.add_argument("--replay", metavar="DIR", help="serve pages saved by --record")
+    parser.add_argument("--recordings", metavar="DIR", default="benchmarks/recordings")
+    args = parser.parse_args()
+    server, _, url = start_server(
+        args.port, latency=args.latency, threads_per_page=args.threads_per_page, etags=args.etags,
+        initial_threads=args.initial_threads, post_rate=args.post_rate, spam_every=args.spam_every,
+        error_rate=args.error_rate, reset_rate=args.reset_rate, seed=args.seed,
+        rate_limit=args.rate_limit, retry_after=args.retry_after, record=args.record, replay=args.replay, recordings=args.recordings,
+    )
+    print(f"Stand-in forum listening on {url}", flush=True)
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
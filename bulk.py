@@ -0,0 +1,116 @@
+import csv
+import io
+import json
+
+BULK_FORMATS = ("newline", "csv", "jsonl")
+
+MEDIA_TYPES = {
+    "newline": "text/plain; charset=utf-8",
+    "csv": "text/csv; charset=utf-8",
+    "jsonl": "application/x-ndjson",
+}
+EXTENSIONS = {"newline": "txt", "csv": "csv", "jsonl": "jsonl"}
+
+
+class BulkFormatError(ValueError):
+    """An uploaded line that cannot be read in the requested format."""
+
+
+def detect_format(filename):
+    """Guess the upload format from a file name, defaulting to one value per line."""
+    name = (filename or "").lower()
+    if name.endswith(".csv"):
+        return "csv"
+    if name.endswith((".jsonl", ".ndjson", ".json")):
+        return "jsonl"
+    return "newline"
+
+
+def read_values(stream, fmt, column):
+    """Yield stripped, non-empty values from a binary upload stream without loading it whole.
+
+    newline: one value per line.
+    csv: the ``column`` (or ``value``) column if the header names one, else the first column.
+    jsonl: a JSON string per line, or an object with a ``column`` or ``value`` key.
+    """
+    if fmt not in BULK_FORMATS:
+        raise BulkFormatError(f"Unknown format '{fmt}', expected one of {BULK_FORMATS}.")
+    text = io.TextIOWrapper(stream, encoding="utf-8-sig", errors="strict", newline="")
+    try:
+        if fmt == "csv":
+            yield from _read_csv(text, column)
+        elif fmt == "jsonl":
+            yield from _read_jsonl(text, column)
+        else:
+            for line in text:
+                value = line.strip()
+                if value:
+                    yield value
+    except UnicodeDecodeError as e:
+        raise BulkFormatError(f"Upload is not valid UTF-8: {e}")
+    finally:
+        text.detach()
+
+
+def _read_csv(text, column):
+    index = 0
+    for number, row in enumerate(csv.reader(text), 1):
+        if number == 1:
+            header = [cell.strip().lower() for cell in row]
+            name = next((name for name in (column, "value") if name in header), None)
+            if name is not None:
+                index = header.index(name)
+                continue
+        value = row[index].strip() if index < len(row) else ""
+        if value:
+            yield value
+
+
+def _read_jsonl(text, column):
+    for number, line in enumerate(text, 1):
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            item = json.loads(line)
+        except json.JSONDecodeError as e:
+            raise BulkFormatError(f"Line {number} is not valid JSON: {e.msg}")
+        if isinstance(item, dict):
+            item = item.get(column, item.get("value"))
+        if not isinstance(item, str):
+            raise BulkFormatError(f"Line {number} has no '{column}' string value.")
+        value = item.strip()
+        if value:
+            yield value
+
+
+def write_values(values, fmt, chunk_rows=1000):
+    """Yield export chunks of ``values`` in a format that read_values accepts back into any table.
+
+    The csv header and the jsonl key are ``value``.
+    """
+    if fmt == "csv":
+        buffer = io.StringIO()
+        writer = csv.writer(buffer, lineterminator="\n")
+
+        def format_row(value):
+            buffer.seek(0)
+            buffer.truncate()
+            writer.writerow([value])
+            return buffer.getvalue()
+        yield format_row("value")
+    elif fmt == "jsonl":
+        def format_row(value):
+            return json.dumps({"value": value}, ensure_ascii=False) + "\n"
+    else:
+        def format_row(value):
+            return value + "\n"
+
+    rows = []
+    for value in values:
+        rows.append(format_row(value))
+        if len(rows) >= chunk_rows:
+            yield "".join(rows)
+            rows = []
+    if rows:
+        yield "".join(rows)
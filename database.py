@@ -1,33 +1,208 @@
 from sqlalchemy.orm import sessionmaker, Session
-from sqlalchemy import create_engine, Column, Integer, String
+from sqlalchemy import create_engine, event, func, inspect, or_, select, Column, Index, Integer, String, Text
+from sqlalchemy.schema import CreateIndex
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.engine import make_url
 from sqlalchemy.ext.declarative import declarative_base
+import hashlib
+import os
+import re
+import threading
+import time
 
 
-DATABASE_URL = "sqlite:///db.sql"
-engine = create_engine(DATABASE_URL, connect_args={"check_same_thread": False})
+DATABASE_URL = os.getenv("DATABASE_URL", "sqlite:///db.sql")
+DB_BUSY_TIMEOUT = float(os.getenv("DB_BUSY_TIMEOUT", "15"))  # seconds a connection waits for a lock
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "20"))
+# Seconds a process keeps its blacklist snapshot before checking the shared version for other processes' writes
+BLACKLIST_CHECK_INTERVAL = float(os.getenv("BLACKLIST_CHECK_INTERVAL", "2"))
+
+# Sessions are opened per request or per store call and closed straight after, so each is only ever
+# used by one thread. The pool is sized for the monitor's workers plus the API's thread pool.
+# SQLite serves workers on one host; workers on several hosts share a PostgreSQL database.
+engine = create_engine(
+    DATABASE_URL,
+    connect_args={"check_same_thread": False, "timeout": DB_BUSY_TIMEOUT}
+    if make_url(DATABASE_URL).get_backend_name() == "sqlite" else {},
+    pool_size=DB_POOL_SIZE,
+    max_overflow=DB_POOL_SIZE,
+)
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 Base = declarative_base()
 
 
+@event.listens_for(engine, "connect")
+def _configure_sqlite(dbapi_connection, connection_record):
+    """Set up each SQLite connection for concurrent use by the monitor threads and the API."""
+    if engine.dialect.name != "sqlite":
+        return
+    # WAL: readers never wait for the writer and the writer never waits for readers
+    dbapi_connection.execute("PRAGMA journal_mode=WAL")
+    # Safe under WAL (only the last commits can be lost on power failure) and avoids an fsync per commit
+    dbapi_connection.execute("PRAGMA synchronous=NORMAL")
+    dbapi_connection.execute(f"PRAGMA busy_timeout={int(DB_BUSY_TIMEOUT * 1000)}")
+    dbapi_connection.execute("PRAGMA cache_size=-16000")  # 16 MiB page cache per connection
+    dbapi_connection.execute("PRAGMA temp_store=MEMORY")
+    # Let SQLAlchemy emit BEGIN itself (see _begin) instead of the driver's implicit transactions
+    dbapi_connection.isolation_level = None
+
+
+@event.listens_for(engine, "begin")
+def _begin(connection):
+    """Start transactions as BEGIN, or BEGIN IMMEDIATE for sessions from write_session()."""
+    if engine.dialect.name == "sqlite":
+        connection.exec_driver_sql(f"BEGIN {connection.get_execution_options().get('sqlite_begin', '')}")
+
+
+_DIALECT_INSERTS = {"sqlite": sqlite.insert, "postgresql": postgresql.insert}
+
+
+def upsert(model):
+    """INSERT for the database in use, with the ON CONFLICT clauses SQLite and PostgreSQL share."""
+    insert = _DIALECT_INSERTS.get(engine.dialect.name)
+    if insert is None:
+        raise RuntimeError(f"Unsupported database '{engine.dialect.name}', expected SQLite or PostgreSQL.")
+    return insert(model)
+
+
+def write_session() -> Session:
+    """Session whose transaction takes the write lock up front.
+
+    Use it for transactions that read before they write. Under WAL, a plain BEGIN that later
+    writes fails at once with "database is locked" if another connection committed in between.
+    BEGIN IMMEDIATE waits out the busy timeout instead.
+    """
+    db = SessionLocal()
+    if engine.dialect.name == "sqlite":
+        db.connection(execution_options={"sqlite_begin": "IMMEDIATE"})
+    return db
+
+
+# Blacklist tables also index lower(value), for the case-insensitive searches of the admin API
 class BlacklistDescription(Base):
     __tablename__ = "blacklist_description"
     id = Column(Integer, primary_key=True, index=True)
     description = Column(String, unique=True, index=True)
+    __table_args__ = (Index("ix_blacklist_description_lower", func.lower(description)),)
 
 class BlacklistTitle(Base):
     __tablename__ = "blacklist_title"
     id = Column(Integer, primary_key=True, index=True)
     title = Column(String, unique=True, index=True)
+    __table_args__ = (Index("ix_blacklist_title_lower", func.lower(title)),)
 
 class BlacklistLinks(Base):
     __tablename__ = "blacklist_links"
     id = Column(Integer, primary_key=True, index=True)
     link = Column(String, unique=True, index=True)
+    __table_args__ = (Index("ix_blacklist_links_lower", func.lower(link)),)
+
+class BlacklistVersion(Base):
+    __tablename__ = "blacklist_version"
+    id = Column(Integer, primary_key=True)  # a single row, id 1
+    version = Column(Integer, nullable=False, default=0)
+    rewritten = Column(Integer)  # version of the last write that changed existing values rather than adding some
+
+class SeenThread(Base):
+    __tablename__ = "seen_thread"
+    thread_key = Column(String, primary_key=True)
+    verdict = Column(String, nullable=False)
+    blacklist_fingerprint = Column(String, nullable=False)
+    rules_fingerprint = Column(String, nullable=False)
+    checked_at = Column(Integer, nullable=False, index=True)
+
+class PendingBan(Base):
+    __tablename__ = "pending_ban"
+    userid = Column(String, primary_key=True)
+    reason = Column(String, nullable=False)
+    links = Column(Text, nullable=False)  # newline-separated thread URLs settled by this ban
+    blacklist_fingerprint = Column(String, nullable=False)
+    rules_fingerprint = Column(String, nullable=False)
+    attempts = Column(Integer, nullable=False, default=0)
+    status = Column(String, nullable=False, default="pending", index=True)
+    last_error = Column(String)
+    created_at = Column(Integer, nullable=False)
+    owner = Column(String, index=True)  # worker_id of the monitor worker sending this ban
+    rule = Column(String)  # rule, field and keyword of the violation that queued this ban
+    field = Column(String)
+    keyword = Column(String)
+
+class BannedUser(Base):
+    __tablename__ = "banned_user"
+    userid = Column(String, primary_key=True)
+    banned_at = Column(Integer, nullable=False)
+
+class BanAudit(Base):
+    __tablename__ = "ban_audit"
+    id = Column(Integer, primary_key=True)
+    userid = Column(String, nullable=False, index=True)
+    thread_url = Column(String)  # thread whose violation queued the ban
+    rule = Column(String, index=True)
+    field = Column(String)
+    keyword = Column(String)
+    banned_at = Column(Integer, nullable=False, index=True)
+
+class MonitorWorker(Base):
+    __tablename__ = "monitor_worker"
+    worker_id = Column(String, primary_key=True)
+    host = Column(String)
+    started_at = Column(Integer, nullable=False)
+    heartbeat_at = Column(Integer, nullable=False, index=True)
+
+class SectionLease(Base):
+    __tablename__ = "section_lease"
+    section = Column(String, primary_key=True)
+    worker_id = Column(String, index=True)
+    expires_at = Column(Integer, nullable=False, default=0)
 
 
 Base.metadata.create_all(bind=engine)
 
 
+def _add_missing_columns():
+    """create_all never alters existing tables, so add columns introduced after a table was created."""
+    inspector = inspect(engine)
+    with engine.begin() as connection:
+        for table in Base.metadata.sorted_tables:
+            existing = {column["name"] for column in inspector.get_columns(table.name)}
+            for column in table.columns:
+                if column.name not in existing and column.nullable:
+                    column_type = column.type.compile(dialect=engine.dialect)
+                    connection.exec_driver_sql(f'ALTER TABLE {table.name} ADD COLUMN "{column.name}" {column_type}')
+
+
+_add_missing_columns()
+
+
+def _add_missing_indexes():
+    """create_all skips indexes of tables that already exist, so create indexes introduced later."""
+    # Expression indexes cannot be reflected, so every index is created if it does not exist yet
+    with engine.begin() as connection:
+        for table in Base.metadata.sorted_tables:
+            for index in table.indexes:
+                connection.execute(CreateIndex(index, if_not_exists=True))
+
+
+_add_missing_indexes()
+
+
+def _ensure_blacklist_version():
+    """Create the single blacklist version row if the database does not have it yet."""
+    db = SessionLocal()
+    try:
+        if db.get(BlacklistVersion, 1) is None:
+            db.add(BlacklistVersion(id=1, version=0))
+            db.commit()
+    except IntegrityError:
+        db.rollback()  # Another process created it first
+    finally:
+        db.close()
+
+
+_ensure_blacklist_version()
+
+
 def get_db():
     db = SessionLocal()
     try:
@@ -36,10 +211,475 @@ def get_db():
         db.close()
 
 
+# Blacklist table of each field
+BLACKLIST_TABLES = {
+    "descriptions": BlacklistDescription,
+    "titles": BlacklistTitle,
+    "links": BlacklistLinks,
+}
+
+
+def _blacklist_rows(db: Session, model, after: int = 0) -> list:
+    """(id, value) rows of a blacklist table with an ID above ``after``, in ID order."""
+    value_column = getattr(model, model.__table__.columns.keys()[1])
+    statement = select(model.id, value_column).where(model.id > after).order_by(model.id)  # type: ignore
+    return db.connection().execute(statement).all()
+
+
 def get_all_blacklist_data(db: Session) -> dict:
-    """Retrieve all blacklist data as a dictionary."""
-    return {
-        "descriptions": [desc.description for desc in db.query(BlacklistDescription).all()],
-        "titles": [title.title for title in db.query(BlacklistTitle).all()],
-        "links": [link.link for link in db.query(BlacklistLinks).all()],
-    }
+    """Retrieve all blacklist data as a dictionary, each field's values in the order they were added."""
+    return {field: [value for _, value in _blacklist_rows(db, model)] for field, model in BLACKLIST_TABLES.items()}
+
+
+def insert_blacklist_values(model, values: list, batch_size: int = 1000) -> int:
+    """Insert values into a blacklist table in one transaction with the version bump, skipping ones it already has; returns rows inserted."""
+    column = model.__table__.columns.keys()[1]
+    statement = upsert(model).on_conflict_do_nothing(index_elements=[column])
+    inserted = 0
+    db = SessionLocal()
+    try:
+        # Bump first: it locks the version row, so the new IDs are committed in order (see _load_blacklist)
+        bump_blacklist_version(db)
+        for start in range(0, len(values), batch_size):
+            result = db.connection().execute(statement, [{column: value} for value in values[start:start + batch_size]])
+            inserted += result.rowcount
+        if inserted:
+            db.commit()
+        else:
+            db.rollback()
+        return inserted
+    except Exception:
+        db.rollback()
+        raise
+    finally:
+        db.close()
+
+
+def iter_blacklist_values(model, batch_size: int = 1000):
+    """Yield a blacklist table's values in ID order, one short read per batch."""
+    value_column = getattr(model, model.__table__.columns.keys()[1])
+    last_id = 0
+    while True:
+        db = SessionLocal()
+        try:
+            rows = db.query(model.id, value_column).filter(model.id > last_id).order_by(model.id).limit(batch_size).all()
+        finally:
+            db.close()
+        for _, value in rows:
+            yield value
+        if len(rows) < batch_size:
+            return
+        last_id = rows[-1][0]
+
+
+def query_ban_audit(db: Session, userid: str = None, rule: str = None, since: int = None, until: int = None,
+                    before: int = None, limit: int = 100) -> list:
+    """Return up to ``limit`` ban audit rows, newest first, below ID ``before`` and within [since, until)."""
+    query = db.query(BanAudit)
+    if userid is not None:
+        query = query.filter(BanAudit.userid == userid)  # type: ignore
+    if rule is not None:
+        query = query.filter(BanAudit.rule == rule)  # type: ignore
+    if since is not None:
+        query = query.filter(BanAudit.banned_at >= since)  # type: ignore
+    if until is not None:
+        query = query.filter(BanAudit.banned_at < until)  # type: ignore
+    if before is not None:
+        query = query.filter(BanAudit.id < before)  # type: ignore
+    return query.order_by(BanAudit.id.desc()).limit(limit).all()
+
+
+class BlacklistSnapshot:
+    """Immutable, versioned copy of all blacklist data shared by every monitor thread.
+
+    ``last_ids`` holds the highest row ID loaded per field, so the next version can load only the rows added since.
+    """
+    __slots__ = ("version", "data", "last_ids", "fingerprint")
+
+    def __init__(self, version: int, data: dict, last_ids: dict = None):
+        self.version = version
+        self.data = data
+        self.last_ids = last_ids or {}
+        # Content hash: the same keywords give the same fingerprint whatever the version or database
+        digest = hashlib.sha1()
+        for field in sorted(data):
+            digest.update(field.encode("utf-8") + b"\0")
+            for value in sorted(data[field]):
+                digest.update(value.encode("utf-8") + b"\0")
+        self.fingerprint = digest.hexdigest()
+
+
+_blacklist_snapshot = None
+_blacklist_checked = (float("-inf"), 0)  # (monotonic time, _local_blacklist_writes) of the last version check
+_local_blacklist_writes = 0               # blacklist writes committed by this process
+_blacklist_lock = threading.Lock()
+
+
+def bump_blacklist_version(db: Session, rewrite: bool = False):
+    """Mark every process's blacklist snapshot stale; call it inside the transaction of the blacklist write.
+
+    Pass ``rewrite`` when the write changed or removed existing values: readers then reload the
+    whole blacklist instead of only the rows added since their snapshot.
+    """
+    values = {BlacklistVersion.version: BlacklistVersion.version + 1}
+    if rewrite:
+        values[BlacklistVersion.rewritten] = BlacklistVersion.version + 1
+    db.query(BlacklistVersion).filter(BlacklistVersion.id == 1).update(values, synchronize_session=False)  # type: ignore
+    db.info["blacklist_changed"] = True
+
+
+@event.listens_for(SessionLocal, "after_commit")
+def _blacklist_committed(session):
+    """Have this process re-read the version on its next snapshot, without waiting out the check interval."""
+    global _local_blacklist_writes
+    if session.info.pop("blacklist_changed", False):
+        _local_blacklist_writes += 1
+
+
+@event.listens_for(SessionLocal, "after_rollback")
+def _blacklist_rolled_back(session):
+    session.info.pop("blacklist_changed", None)
+
+
+def _load_blacklist(db: Session, snapshot, version: int, rewritten: int) -> BlacklistSnapshot:
+    """The blacklist at ``version``: the rows added since ``snapshot`` on top of it, or every row after a rewrite.
+
+    Adding rows only needs the new ones, as every writer bumps the version (locking its row) before
+    it inserts, so row IDs are committed in ascending order.
+    """
+    incremental = snapshot is not None and (rewritten or 0) <= snapshot.version
+    data, last_ids = {}, {}
+    for field, model in BLACKLIST_TABLES.items():
+        after = snapshot.last_ids.get(field, 0) if incremental else 0
+        rows = _blacklist_rows(db, model, after)
+        data[field] = (snapshot.data[field] if incremental else []) + [value for _, value in rows]
+        last_ids[field] = rows[-1][0] if rows else after
+    return BlacklistSnapshot(version, data, last_ids)
+
+
+def get_blacklist_snapshot() -> BlacklistSnapshot:
+    """Return the current blacklist snapshot, reloading it after a blacklist write by any process.
+
+    The shared version row is read at most every BLACKLIST_CHECK_INTERVAL seconds, and right away
+    after a write committed by this process; the blacklist itself only when the version changed.
+    While one thread reloads it, the others keep getting the previous snapshot instead of waiting.
+    """
+    global _blacklist_snapshot, _blacklist_checked
+    snapshot = _blacklist_snapshot
+    checked_at, writes = _blacklist_checked
+    if (snapshot is not None and writes == _local_blacklist_writes
+            and time.monotonic() - checked_at < BLACKLIST_CHECK_INTERVAL):
+        return snapshot
+
+    if not _blacklist_lock.acquire(blocking=snapshot is None):
+        return snapshot
+    try:
+        snapshot = _blacklist_snapshot
+        checked_at, writes = _blacklist_checked
+        now = time.monotonic()
+        if (snapshot is not None and writes == _local_blacklist_writes
+                and now - checked_at < BLACKLIST_CHECK_INTERVAL):
+            return snapshot
+        writes = _local_blacklist_writes  # Taken before the read, so a write committed meanwhile is checked again
+        db = SessionLocal()
+        try:
+            # One read transaction for the version and the data, so the data is at least that version
+            version, rewritten = db.query(BlacklistVersion.version, BlacklistVersion.rewritten).filter(
+                BlacklistVersion.id == 1  # type: ignore
+            ).one()
+            if snapshot is None or snapshot.version != version:
+                snapshot = _load_blacklist(db, snapshot, version, rewritten)
+        finally:
+            db.close()
+        _blacklist_snapshot = snapshot
+        _blacklist_checked = (now, writes)
+    finally:
+        _blacklist_lock.release()
+    return snapshot
+
+
+_topic_id_re = re.compile(r"/topic/(\d+)")
+
+
+def topic_id(url: str):
+    """Numeric topic ID of a thread URL, or None if the URL has none."""
+    match = _topic_id_re.search(url)
+    return int(match.group(1)) if match else None
+
+
+def thread_key(url: str) -> str:
+    """Stable key for a thread: its topic ID when the URL has one, otherwise the URL itself."""
+    match = _topic_id_re.search(url)
+    return match.group(1) if match else url
+
+
+class SeenThreadStore:
+    """Persistent record of evaluated threads so unchanged verdicts are never re-fetched."""
+
+    def __init__(self, ttl: int = 7 * 24 * 3600, max_entries: int = 200_000):
+        self.ttl = ttl
+        self.max_entries = max_entries
+
+    def filter_unseen(self, urls: list, blacklist_fingerprint: str, rules_fingerprint: str) -> list:
+        """Return the URLs that still need evaluation under the current blacklist and rules."""
+        if not urls:
+            return []
+        keys = {url: thread_key(url) for url in urls}
+        cutoff = int(time.time()) - self.ttl
+        db = SessionLocal()
+        try:
+            rows = db.query(SeenThread).filter(
+                SeenThread.thread_key.in_(set(keys.values())),  # type: ignore
+                SeenThread.checked_at >= cutoff,
+            ).all()
+        finally:
+            db.close()
+
+        settled = {
+            row.thread_key for row in rows
+            if row.verdict == "banned"
+            or (row.blacklist_fingerprint == blacklist_fingerprint and row.rules_fingerprint == rules_fingerprint)
+        }
+        return [url for url in urls if keys[url] not in settled]
+
+    def record(self, url: str, verdict: str, blacklist_fingerprint: str, rules_fingerprint: str):
+        """Insert or refresh the verdict for a thread."""
+        values = {
+            "thread_key": thread_key(url),
+            "verdict": verdict,
+            "blacklist_fingerprint": blacklist_fingerprint,
+            "rules_fingerprint": rules_fingerprint,
+            "checked_at": int(time.time()),
+        }
+        statement = upsert(SeenThread).values(**values)
+        statement = statement.on_conflict_do_update(index_elements=["thread_key"], set_=values)
+        db = SessionLocal()
+        try:
+            db.execute(statement)
+            db.commit()
+        finally:
+            db.close()
+
+    def prune(self) -> int:
+        """Drop expired entries and the oldest ones beyond max_entries; returns rows removed."""
+        db = SessionLocal()
+        try:
+            removed = db.query(SeenThread).filter(
+                SeenThread.checked_at < int(time.time()) - self.ttl  # type: ignore
+            ).delete(synchronize_session=False)
+            overflow = db.query(SeenThread).count() - self.max_entries
+            if overflow > 0:
+                oldest = db.query(SeenThread.thread_key).order_by(SeenThread.checked_at).limit(overflow).subquery()
+                removed += db.query(SeenThread).filter(
+                    SeenThread.thread_key.in_(oldest.select())  # type: ignore
+                ).delete(synchronize_session=False)
+            db.commit()
+            return removed
+        finally:
+            db.close()
+
+
+class PendingBanStore:
+    """Durable queue of moderator bans shared by every monitor worker.
+
+    Each pending ban belongs to one worker (``owner``), which is the only one sending it. Other
+    workers that find the same user attach their thread links to it instead of queueing a second
+    ban. Users banned recently are kept in ``banned_user`` so no worker bans them again.
+    """
+
+    def claim(self, userid: str, reason: str, link: str, blacklist_fingerprint: str, rules_fingerprint: str,
+              owner: str, banned_since: int, rule: str = None, field: str = None, keyword: str = None) -> str:
+        """Queue a ban owned by ``owner``; returns "queued", "attached" to an existing ban, or "banned"."""
+        now = int(time.time())
+        values = {
+            "reason": reason,
+            "links": link,
+            "blacklist_fingerprint": blacklist_fingerprint,
+            "rules_fingerprint": rules_fingerprint,
+            "attempts": 0,
+            "status": "pending",
+            "last_error": None,
+            "owner": owner,
+            "rule": rule,
+            "field": field,
+            "keyword": keyword,
+        }
+        db = write_session()
+        try:
+            banned = db.query(BannedUser).filter(
+                BannedUser.userid == userid, BannedUser.banned_at >= banned_since  # type: ignore
+            ).first()
+            if banned is not None:
+                return "banned"
+            # A ban that was given up on is taken over and retried from scratch
+            statement = upsert(PendingBan).values(userid=userid, created_at=now, **values)
+            statement = statement.on_conflict_do_update(
+                index_elements=["userid"], set_=values, where=PendingBan.status == "failed"
+            )
+            if db.execute(statement).rowcount:
+                db.commit()
+                return "queued"
+            self._attach(db, userid, link)
+            db.commit()
+            return "attached"
+        finally:
+            db.close()
+
+    def attach(self, userid: str, link: str):
+        """Add a thread link to a pending ban, so it is settled when the ban goes through."""
+        db = SessionLocal()
+        try:
+            self._attach(db, userid, link)
+            db.commit()
+        finally:
+            db.close()
+
+    @staticmethod
+    def _attach(db, userid, link):
+        db.query(PendingBan).filter(
+            PendingBan.userid == userid, ~PendingBan.links.contains(link, autoescape=True)  # type: ignore
+        ).update({PendingBan.links: PendingBan.links + "\n" + link}, synchronize_session=False)
+
+    def record_attempt(self, userid: str, attempts: int, status: str, last_error: str = None):
+        """Store the outcome of a failed attempt: still "pending" for a retry, or "failed"."""
+        db = SessionLocal()
+        try:
+            db.query(PendingBan).filter(PendingBan.userid == userid).update(
+                {PendingBan.attempts: attempts, PendingBan.status: status, PendingBan.last_error: last_error},
+                synchronize_session=False,
+            )
+            db.commit()
+        finally:
+            db.close()
+
+    def complete(self, userid: str, thread_url: str = None, rule: str = None, field: str = None,
+                 keyword: str = None) -> list:
+        """Drop a sent ban, remember the user as banned and log it in the ban audit; returns the links it settled."""
+        now = int(time.time())
+        db = write_session()
+        try:
+            row = db.get(PendingBan, userid)
+            links = row.links.split("\n") if row is not None and row.links else []
+            if row is not None:
+                db.delete(row)
+            statement = upsert(BannedUser).values(userid=userid, banned_at=now)
+            db.execute(statement.on_conflict_do_update(index_elements=["userid"],
+                                                       set_={"banned_at": statement.excluded.banned_at}))
+            db.add(BanAudit(userid=userid, thread_url=thread_url or (links[0] if links else None), rule=rule,
+                            field=field, keyword=keyword, banned_at=now))
+            db.commit()
+            return links
+        finally:
+            db.close()
+
+    def adopt(self, owner: str, stale_before: int) -> list:
+        """Take over pending bans of workers without a recent heartbeat; returns this worker's bans, oldest first."""
+        db = SessionLocal()
+        try:
+            live = db.query(MonitorWorker.worker_id).filter(MonitorWorker.heartbeat_at >= stale_before)  # type: ignore
+            db.query(PendingBan).filter(
+                PendingBan.status == "pending",
+                or_(PendingBan.owner.is_(None), PendingBan.owner.not_in(live.scalar_subquery())),  # type: ignore
+            ).update({PendingBan.owner: owner}, synchronize_session=False)
+            db.commit()
+            rows = db.query(PendingBan).filter(
+                PendingBan.status == "pending", PendingBan.owner == owner  # type: ignore
+            ).order_by(PendingBan.created_at).all()
+            db.expunge_all()
+            return rows
+        finally:
+            db.close()
+
+
+class SectionLeaseStore:
+    """Worker heartbeats and time-limited section leases in the shared database."""
+
+    def heartbeat(self, worker_id: str, host: str = None):
+        now = int(time.time())
+        statement = upsert(MonitorWorker).values(worker_id=worker_id, host=host, started_at=now, heartbeat_at=now)
+        statement = statement.on_conflict_do_update(index_elements=["worker_id"], set_={"heartbeat_at": now})
+        db = SessionLocal()
+        try:
+            db.execute(statement)
+            db.commit()
+        finally:
+            db.close()
+
+    def live_workers(self, stale_before: int) -> list:
+        """IDs of workers with a heartbeat since ``stale_before``; rows of older ones are removed."""
+        db = SessionLocal()
+        try:
+            db.query(MonitorWorker).filter(
+                MonitorWorker.heartbeat_at < stale_before  # type: ignore
+            ).delete(synchronize_session=False)
+            db.commit()
+            return sorted(worker_id for (worker_id,) in db.query(MonitorWorker.worker_id).all())
+        finally:
+            db.close()
+
+    def remove_worker(self, worker_id: str):
+        """Unregister a stopping worker and free its sections right away."""
+        db = SessionLocal()
+        try:
+            db.query(SectionLease).filter(SectionLease.worker_id == worker_id).update(
+                {SectionLease.worker_id: None, SectionLease.expires_at: 0}, synchronize_session=False
+            )
+            db.query(MonitorWorker).filter(MonitorWorker.worker_id == worker_id).delete(synchronize_session=False)
+            db.commit()
+        finally:
+            db.close()
+
+    def ensure_sections(self, sections: list):
+        if not sections:
+            return
+        statement = upsert(SectionLease).values([{"section": section, "expires_at": 0} for section in sections])
+        db = SessionLocal()
+        try:
+            db.execute(statement.on_conflict_do_nothing(index_elements=["section"]))
+            db.commit()
+        finally:
+            db.close()
+
+    def owned(self, worker_id: str, now: int) -> list:
+        db = SessionLocal()
+        try:
+            rows = db.query(SectionLease.section).filter(
+                SectionLease.worker_id == worker_id, SectionLease.expires_at >= now  # type: ignore
+            ).all()
+            return [section for (section,) in rows]
+        finally:
+            db.close()
+
+    def renew(self, worker_id: str, sections: list, expires_at: int):
+        db = SessionLocal()
+        try:
+            db.query(SectionLease).filter(
+                SectionLease.worker_id == worker_id, SectionLease.section.in_(sections)  # type: ignore
+            ).update({SectionLease.expires_at: expires_at}, synchronize_session=False)
+            db.commit()
+        finally:
+            db.close()
+
+    def claim(self, worker_id: str, section: str, expires_at: int, now: int) -> bool:
+        """Take a section that is free, expired or already ours; False if another worker holds it."""
+        db = SessionLocal()
+        try:
+            claimed = db.query(SectionLease).filter(
+                SectionLease.section == section,
+                or_(SectionLease.worker_id.is_(None), SectionLease.expires_at < now,  # type: ignore
+                    SectionLease.worker_id == worker_id),
+            ).update({SectionLease.worker_id: worker_id, SectionLease.expires_at: expires_at}, synchronize_session=False)
+            db.commit()
+            return bool(claimed)
+        finally:
+            db.close()
+
+    def release(self, worker_id: str, sections: list):
+        db = SessionLocal()
+        try:
+            db.query(SectionLease).filter(
+                SectionLease.worker_id == worker_id, SectionLease.section.in_(sections)  # type: ignore
+            ).update({SectionLease.worker_id: None, SectionLease.expires_at: 0}, synchronize_session=False)
+            db.commit()
+        finally:
+            db.close()
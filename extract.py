@@ -0,0 +1,641 @@
+import codecs
+from collections import namedtuple
+from html.parser import HTMLParser
+
+from bs4 import BeautifulSoup, SoupStrainer
+
+try:
+    import lxml.html
+except ImportError:  # Optional dependency, only needed for the "lxml" and "bs4-lxml" backends
+    lxml = None
+
+# "fast" is a single-pass stdlib parser, "lxml" a C tree parser with targeted XPath lookups;
+# the BeautifulSoup backends reproduce the original code and are kept for comparison
+BACKENDS = ("fast", "lxml", "bs4-lxml", "bs4")
+DEFAULT_BACKEND = "lxml" if lxml is not None else "fast"
+
+# A thread row of a forum listing: thread URL and the hovercard-id of its author
+ListingEntry = namedtuple("ListingEntry", ["url", "userid"])
+
+THREAD_FIELDS = (
+    "op_thread_url", "op_userid", "op_user_posts", "op_user_threads", "op_thread_title",
+    "op_thread_descriptions", "op_thread_descriptions_full", "op_thread_links", "op_thread_keywords",
+    "op_user_signature", "op_user_reputation", "op_user_likes", "op_user_group",
+)
+
+_SKIPPED_TEXT_TAGS = {"script", "style", "template"}
+_VOID_TAGS = {
+    "area", "base", "br", "col", "embed", "hr", "img", "input",
+    "link", "meta", "param", "source", "track", "wbr",
+}
+
+
+def _classes(attrs):
+    return (attrs.get("class") or "").split()
+
+
+def _strip_join(chunks):
+    """Equivalent of BeautifulSoup's get_text(strip=True)."""
+    return "".join(chunk.strip() for chunk in chunks if chunk.strip())
+
+
+class ThreadRecord:
+    """Parsed thread page, with the fields of the thread info dict as slots.
+
+    It reads like that dict (``record["op_userid"]``, ``record.get(...)``), so rules, matchers and
+    the profile cache take it unchanged.
+    """
+    __slots__ = THREAD_FIELDS
+
+    def __init__(self, **fields):
+        for name in THREAD_FIELDS:
+            setattr(self, name, fields[name])
+
+    def __getitem__(self, key):
+        if key not in THREAD_FIELDS:
+            raise KeyError(key)
+        return getattr(self, key)
+
+    def get(self, key, default=None):
+        return getattr(self, key) if key in THREAD_FIELDS else default
+
+    def as_dict(self):
+        return {name: getattr(self, name) for name in THREAD_FIELDS}
+
+    def __eq__(self, other):
+        if isinstance(other, ThreadRecord):
+            other = other.as_dict()
+        return self.as_dict() == other if isinstance(other, dict) else NotImplemented
+
+    __hash__ = None
+
+    def __repr__(self):
+        fields = self.as_dict()
+        description = fields["op_thread_descriptions_full"]
+        if description and len(description) > 100:
+            fields["op_thread_descriptions_full"] = f"{description[:100]}... ({len(description)} chars)"
+        return f"ThreadRecord({fields})"
+
+
+def _build_thread_info(url, fields, text_limit=None):
+    """Assemble the thread record with the values get_internal_thread_info always returned.
+
+    The full description is cut to ``text_limit`` characters, when given.
+    """
+    description = fields["op_thread_descriptions_full"]
+    if text_limit is not None and description is not None and len(description) > text_limit:
+        description = description[:text_limit]
+    return ThreadRecord(
+        op_thread_url=url,
+        op_userid=fields["op_userid"],
+        op_user_posts=int(fields["op_user_posts"]),
+        op_user_threads=int(fields["op_user_threads"]),
+        op_thread_title=fields["op_thread_title"],
+        op_thread_descriptions=fields["op_thread_descriptions"],
+        op_thread_descriptions_full=description,
+        op_thread_links=fields["op_thread_links"],
+        op_thread_keywords=fields["op_thread_keywords"],
+        op_user_signature=fields["op_user_signature"],
+        op_user_reputation=int(fields["op_user_reputation"]),
+        op_user_likes=int(fields["op_user_likes"]),
+        op_user_group=fields["op_user_group"],
+    )
+
+
+class _Chunks(list):
+    """Text chunks of one element, keeping at most ``remaining`` more characters (None: no limit)."""
+    __slots__ = ("remaining",)
+
+    def __init__(self, remaining=None):
+        super().__init__()
+        self.remaining = remaining
+
+
+class _StackParser(HTMLParser):
+    """Single-pass HTMLParser that tracks open elements the way BeautifulSoup's tree builder does.
+
+    Subclasses return a list of roles from ``open_element`` and get them back in ``close_element``
+    once the element (or an ancestor) is closed. Text is appended to every list in ``collectors``;
+    adjacent text chunks are merged and script/style text is skipped, as in get_text().
+    With ``text_limit`` each collector keeps only that many characters.
+    """
+
+    def __init__(self, text_limit=None):
+        super().__init__(convert_charrefs=True)
+        self.text_limit = text_limit
+        self.collectors = []
+        self._pending = []
+        self._stack = []
+        self._open = {}
+        self._skip_depth = 0
+
+    def handle_data(self, data):
+        if not self._skip_depth:
+            self._pending.append(data)
+
+    def _flush(self):
+        if self._pending:
+            text = "".join(self._pending)
+            self._pending = []
+            for chunks in self.collectors:
+                if chunks.remaining is None:
+                    chunks.append(text)
+                elif chunks.remaining > 0:
+                    chunks.append(text[:chunks.remaining])
+                    chunks.remaining -= len(chunks[-1])
+
+    def handle_starttag(self, tag, attrs):
+        self._flush()
+        roles = self.open_element(tag, dict(attrs))
+        if tag in _VOID_TAGS:
+            if roles:
+                self.close_element(tag, roles)
+            return
+        if tag in _SKIPPED_TEXT_TAGS:
+            self._skip_depth += 1
+        self._stack.append((tag, roles))
+        self._open[tag] = self._open.get(tag, 0) + 1
+
+    def handle_startendtag(self, tag, attrs):
+        self._flush()
+        roles = self.open_element(tag, dict(attrs))
+        if roles:
+            self.close_element(tag, roles)
+
+    def handle_endtag(self, tag):
+        self._flush()
+        if not self._open.get(tag):
+            return  # Stray end tag, ignored like BeautifulSoup does
+        while self._stack:
+            name, roles = self._stack.pop()
+            self._pop(name, roles)
+            if name == tag:
+                break
+
+    def _pop(self, name, roles):
+        self._open[name] -= 1
+        if name in _SKIPPED_TEXT_TAGS:
+            self._skip_depth -= 1
+        if roles:
+            self.close_element(name, roles)
+
+    def close(self):
+        super().close()
+        self._flush()
+        while self._stack:
+            self._pop(*self._stack.pop())
+
+    def collect(self):
+        """Start a new text collector and return it."""
+        chunks = _Chunks(self.text_limit)
+        self.collectors.append(chunks)
+        return chunks
+
+    def release(self, chunks):
+        for index, active in enumerate(self.collectors):
+            if active is chunks:
+                del self.collectors[index]
+                return
+
+    def open_element(self, tag, attrs):
+        return None
+
+    def close_element(self, tag, roles):
+        pass
+
+
+class ThreadPageParser(_StackParser):
+    """Collect every field of a thread page in a single pass over the markup.
+
+    The page can be fed as it downloads; ``complete`` turns True once the opening post has been
+    read along with every field that precedes or accompanies it. Replies repeat the per-post
+    markup, so a reader that stops there takes a signature, counter or group icon the opening
+    post lacks as missing instead of finding one in a reply.
+    """
+
+    def __init__(self, text_limit=None):
+        super().__init__(text_limit)
+        self.userid = None
+        self.pu_contents = []       # text chunks of the first two div.pu-content
+        self.title = None           # text chunks of <title>, or False once it held a child tag
+        self.description = None
+        self.keywords = None
+        self.post = None
+        self.post_closed = False
+        self.hidden_links = []      # one slot per div.hiddencontent, filled by its first a[href]
+        self.signature = None
+        self.last_strong = None     # text chunks of the last <strong> opened
+        self.counter_strong = {}    # "Rep"/"Likes" -> text chunks of the <strong> preceding that span
+        self.group_icon = None      # None: no li yet; False: li without img; str: img src
+        self.group_icon_src = True  # False if the group icon img had no src
+        self.opening_post = None    # None: no div.post_wrap yet; True: inside the first one; False: it closed
+        self._title_open = False
+        self._open_hidden = []
+        self._group_icon_open = False
+
+    def open_element(self, tag, attrs):
+        if self._title_open:
+            self.title = False
+        roles = []
+        if tag == "a":
+            if self.userid is None and "hovercard-id" in attrs:
+                self.userid = attrs["hovercard-id"] or ""
+            if attrs.get("href") is not None:
+                for slot in self._open_hidden:
+                    if self.hidden_links[slot] is None:
+                        self.hidden_links[slot] = attrs["href"]
+        elif tag == "div":
+            classes = _classes(attrs)
+            if "post_wrap" in classes and self.opening_post is None:
+                self.opening_post = True
+                roles.append(("opening_post",))
+            if "hiddencontent" in classes:
+                slot = len(self.hidden_links)
+                self.hidden_links.append(None)
+                self._open_hidden.append(slot)
+                roles.append(("hidden", slot))
+            if "pu-content" in classes and len(self.pu_contents) < 2:
+                chunks = self.collect()
+                self.pu_contents.append(chunks)
+                roles.append(("text", chunks))
+            if "signature" in classes and self.signature is None:
+                self.signature = self.collect()
+                roles.append(("text", self.signature))
+        elif tag == "title" and self.title is None:
+            self.title = self.collect()
+            self._title_open = True
+            roles.append(("title", self.title))
+        elif tag == "meta":
+            name = attrs.get("name")
+            if name == "description" and self.description is None:
+                self.description = attrs.get("content", "")
+            elif name == "keywords" and self.keywords is None:
+                self.keywords = attrs.get("content", "")
+        elif tag == "section" and self.post is None and attrs.get("id") == "nulledPost":
+            self.post = self.collect()
+            roles.append(("post", self.post))
+        elif tag == "strong":
+            self.last_strong = self.collect()
+            roles.append(("text", self.last_strong))
+        elif tag == "span" and "x-smalltext" in _classes(attrs):
+            roles.append(("counter", self.last_strong, self.collect()))
+        elif tag == "li" and self.group_icon is None and "group_icon" in _classes(attrs):
+            self.group_icon = False
+            self._group_icon_open = True
+            roles.append(("group_icon",))
+        elif tag == "img" and self._group_icon_open and self.group_icon is False:
+            self.group_icon = attrs.get("src", "")
+            self.group_icon_src = "src" in attrs
+        return roles
+
+    def close_element(self, tag, roles):
+        for role in roles:
+            kind = role[0]
+            if kind == "text":
+                self.release(role[1])
+            elif kind == "post":
+                self.release(role[1])
+                self.post_closed = True
+            elif kind == "title":
+                self.release(role[1])
+                self._title_open = False
+            elif kind == "hidden":
+                self._open_hidden.remove(role[1])
+            elif kind == "counter":
+                _, strong, chunks = role
+                self.release(chunks)
+                text = "".join(chunks)
+                if text in ("Rep", "Likes") and text not in self.counter_strong:
+                    self.counter_strong[text] = strong
+            elif kind == "group_icon":
+                self._group_icon_open = False
+            elif kind == "opening_post":
+                self.opening_post = False
+
+    @property
+    def complete(self):
+        """True once the opening post's div.post_wrap has closed with every required field read.
+
+        Only replies follow, so the rest of the page is not needed (div.hiddencontent in replies aside).
+        """
+        return (self.opening_post is False and self.post_closed and not self.collectors and not self._open_hidden
+                and self.userid is not None and len(self.pu_contents) == 2
+                and self.title is not None and not self._title_open
+                and self.description is not None and self.keywords is not None)
+
+    def _counter(self, label):
+        if label not in self.counter_strong:
+            return None
+        strong = self.counter_strong[label]
+        if strong is None:
+            raise AttributeError(f"No <strong> before the {label} counter.")
+        return _strip_join(strong)
+
+    def fields(self):
+        if self.userid is None:
+            raise TypeError("Thread page has no hovercard-id anchor.")
+        if len(self.pu_contents) < 2:
+            raise IndexError("Thread page lacks the Posts/Threads counters.")
+        if self.title is None:
+            raise AttributeError("Thread page has no <title>.")
+        if self.description is None or self.keywords is None:
+            raise AttributeError("Thread page lacks description or keywords meta tags.")
+        likes = self._counter("Likes")
+        if not self.group_icon_src:
+            raise KeyError("src")
+        return {
+            "op_userid": self.userid,
+            "op_user_posts": _strip_join(self.pu_contents[0]).replace("Posts:", "").strip(),
+            "op_user_threads": _strip_join(self.pu_contents[1]).replace("Threads:", "").strip(),
+            "op_thread_title": "".join(self.title) if self.title else None,
+            "op_thread_descriptions": self.description,
+            "op_thread_descriptions_full": "".join(self.post).strip() if self.post is not None else None,
+            "op_thread_links": ", ".join(link for link in self.hidden_links if link is not None),
+            "op_thread_keywords": self.keywords,
+            "op_user_signature": _strip_join(self.signature) if self.signature is not None else "",
+            "op_user_reputation": self._counter("Rep"),
+            "op_user_likes": likes if likes is not None else 0,
+            "op_user_group": self.group_icon.split('/')[-1].replace('.png', '') if self.group_icon else None,
+        }
+
+
+class ListingPageParser(_StackParser):
+    """Collect (thread link, author ID) pairs from the td.col_f_content cells of a listing in one pass."""
+
+    def __init__(self):
+        super().__init__()
+        self.entries = []
+        self._cell = None
+
+    def open_element(self, tag, attrs):
+        if tag == "td" and self._cell is None and "col_f_content" in _classes(attrs):
+            self._cell = {"struck": False, "member": False, "userid": None, "link": None}
+            return [("cell",)]
+        cell = self._cell
+        if cell is None:
+            return None
+        if tag == "s":
+            cell["struck"] = True
+        elif tag == "a":
+            if attrs.get("hovercard-ref") == "member" and not cell["member"]:
+                cell["member"] = True
+                cell["userid"] = attrs.get("hovercard-id")
+            if cell["link"] is None and " ".join(_classes(attrs)) == "topic_title highlight_unread":
+                cell["link"] = attrs.get("href")
+        return None
+
+    def close_element(self, tag, roles):
+        cell = self._cell
+        self._cell = None
+        if not cell["struck"] and cell["member"] and cell["link"] is not None:
+            self.entries.append(ListingEntry(cell["link"], cell["userid"]))
+
+
+def _fast_thread_fields(html):
+    parser = ThreadPageParser()
+    parser.feed(html)
+    parser.close()
+    return parser.fields()
+
+
+def _fast_listing_entries(html):
+    parser = ListingPageParser()
+    parser.feed(html)
+    parser.close()
+    return parser.entries
+
+
+def _soup_thread_fields(soup):
+    """The original full-tree BeautifulSoup lookups, with each element located only once."""
+    pu_contents = soup.find_all('div', class_='pu-content')
+    post = soup.find('section', id='nulledPost')
+    signature = soup.find("div", class_="signature")
+    rep = soup.find('span', class_='x-smalltext', string='Rep')
+    likes = soup.find('span', class_='x-smalltext', string='Likes')
+    group_icon = soup.find('li', class_='group_icon')
+    group_img = group_icon.find('img') if group_icon else None
+    return {
+        "op_userid": soup.find('a', {'hovercard-id': True})['hovercard-id'],
+        "op_user_posts": pu_contents[0].get_text(strip=True).replace("Posts:", "").strip(),
+        "op_user_threads": pu_contents[1].get_text(strip=True).replace("Threads:", "").strip(),
+        "op_thread_title": soup.title.string,
+        "op_thread_descriptions": soup.find('meta', {'name': 'description'}).get('content', ''),
+        "op_thread_descriptions_full": post.text.strip() if post else None,
+        "op_thread_links": ', '.join(
+            div.find('a', href=True)['href'] for div in soup.find_all('div', class_='hiddencontent')
+            if div.find('a', href=True)
+        ),
+        "op_thread_keywords": soup.find('meta', {'name': 'keywords'}).get('content', ''),
+        "op_user_signature": signature.get_text(strip=True) if signature else "",
+        "op_user_reputation": rep.find_previous('strong').get_text(strip=True) if rep else None,
+        "op_user_likes": likes.find_previous('strong').get_text(strip=True) if likes else 0,
+        "op_user_group": group_img['src'].split('/')[-1].replace('.png', '') if group_img else None,
+    }
+
+
+# Only td.col_f_content subtrees are built; the class attribute is still a raw string at strain time
+_LISTING_STRAINER = SoupStrainer("td", class_=lambda value: bool(value) and "col_f_content" in value.split())
+
+
+def _soup_listing_entries(soup):
+    entries = []
+    for thread in soup.find_all("td", class_="col_f_content"):
+        if thread.find('s'):
+            continue
+        username_element = thread.find("a", {"hovercard-ref": "member"})
+        if not username_element:
+            continue
+        thread_link_element = thread.find("a", class_="topic_title highlight_unread")
+        if thread_link_element:
+            entries.append(ListingEntry(thread_link_element["href"], username_element.get("hovercard-id")))
+    return entries
+
+
+def _lxml_text(element):
+    """Descendant text of an lxml element, skipping script/style/template and comments."""
+    chunks = []
+
+    def walk(node):
+        if node.text:
+            chunks.append(node.text)
+        for child in node:
+            if isinstance(child.tag, str) and child.tag not in _SKIPPED_TEXT_TAGS:
+                walk(child)
+            if child.tail:
+                chunks.append(child.tail)
+
+    walk(element)
+    return chunks
+
+
+def _lxml_first(nodes):
+    return nodes[0] if nodes else None
+
+
+def _lxml_thread_fields(html):
+    root = lxml.html.fromstring(html)
+    has_class = "contains(concat(' ', normalize-space(@class), ' '), ' {} ')"
+    userid = _lxml_first(root.xpath("//a[@hovercard-id]/@hovercard-id"))
+    if userid is None:
+        raise TypeError("Thread page has no hovercard-id anchor.")
+    pu_contents = root.xpath(f"//div[{has_class.format('pu-content')}]")
+    title = _lxml_first(root.xpath("//title"))
+    description = _lxml_first(root.xpath("//meta[@name='description']"))
+    keywords = _lxml_first(root.xpath("//meta[@name='keywords']"))
+    if description is None or keywords is None:
+        raise AttributeError("Thread page lacks description or keywords meta tags.")
+    post = _lxml_first(root.xpath("//section[@id='nulledPost']"))
+    hidden_links = [
+        _lxml_first(div.xpath(".//a[@href]/@href"))
+        for div in root.xpath(f"//div[{has_class.format('hiddencontent')}]")
+    ]
+    signature = _lxml_first(root.xpath(f"//div[{has_class.format('signature')}]"))
+    counters = {}
+    for label in ("Rep", "Likes"):
+        span = _lxml_first(root.xpath(f"//span[{has_class.format('x-smalltext')} and not(*) and text()='{label}']"))
+        if span is not None:
+            strong = _lxml_first(span.xpath("preceding::strong[1] | ancestor::strong[1]"))
+            if strong is None:
+                raise AttributeError(f"No <strong> before the {label} counter.")
+            counters[label] = _strip_join(_lxml_text(strong))
+    group_icon = _lxml_first(root.xpath(f"//li[{has_class.format('group_icon')}]"))
+    group_img = _lxml_first(group_icon.xpath(".//img")) if group_icon is not None else None
+    if group_img is not None and group_img.get("src") is None:
+        raise KeyError("src")
+    return {
+        "op_userid": userid,
+        "op_user_posts": _strip_join(_lxml_text(pu_contents[0])).replace("Posts:", "").strip(),
+        "op_user_threads": _strip_join(_lxml_text(pu_contents[1])).replace("Threads:", "").strip(),
+        "op_thread_title": (title.text if len(title) == 0 else None) if title is not None else None,
+        "op_thread_descriptions": description.get("content", ""),
+        "op_thread_descriptions_full": "".join(_lxml_text(post)).strip() if post is not None else None,
+        "op_thread_links": ", ".join(link for link in hidden_links if link is not None),
+        "op_thread_keywords": keywords.get("content", ""),
+        "op_user_signature": _strip_join(_lxml_text(signature)) if signature is not None else "",
+        "op_user_reputation": counters.get("Rep"),
+        "op_user_likes": counters.get("Likes", 0),
+        "op_user_group": group_img.get("src").split('/')[-1].replace('.png', '') if group_img is not None else None,
+    }
+
+
+def _lxml_listing_entries(html):
+    root = lxml.html.fromstring(html)
+    entries = []
+    for cell in root.xpath("//td[contains(concat(' ', normalize-space(@class), ' '), ' col_f_content ')]"):
+        member = _lxml_first(cell.xpath(".//a[@hovercard-ref='member']"))
+        if member is None or cell.xpath(".//s"):
+            continue
+        href = _lxml_first(cell.xpath(".//a[@class='topic_title highlight_unread']/@href"))
+        if href is not None:
+            entries.append(ListingEntry(href, member.get("hovercard-id")))
+    return entries
+
+
+def _require_lxml(backend):
+    if lxml is None:
+        raise RuntimeError(f"The '{backend}' parser backend requires lxml (pip install lxml).")
+
+
+def extract_thread_info(html, url, backend=DEFAULT_BACKEND, text_limit=None):
+    """Parse a thread page into a ThreadRecord; raises if required markup is missing.
+
+    With ``text_limit`` the full description is cut to that many characters.
+    """
+    if backend == "fast":
+        fields = _fast_thread_fields(html)
+    elif backend == "lxml":
+        _require_lxml(backend)
+        fields = _lxml_thread_fields(html)
+    elif backend == "bs4-lxml":
+        _require_lxml(backend)
+        fields = _soup_thread_fields(BeautifulSoup(html, "lxml"))
+    elif backend == "bs4":
+        fields = _soup_thread_fields(BeautifulSoup(html, "html.parser"))
+    else:
+        raise ValueError(f"Unknown parser backend '{backend}', expected one of {BACKENDS}.")
+    return _build_thread_info(url, fields, text_limit)
+
+
+class ThreadPageReader:
+    """Takes a thread page's body chunk by chunk as it downloads, keeping at most ``max_bytes`` of it.
+
+    With ``stream`` the chunks go straight into the single-pass parser, and ``add`` asks to stop
+    once the opening post has been read (see ThreadPageParser.complete). Up to ``drain_bytes`` more
+    are still read and dropped, so a page that ends soon after leaves its connection reusable.
+    Without ``stream`` the text is kept for ``extract_thread_info``. Either way at most
+    ``text_limit`` characters of the description are kept.
+    """
+
+    def __init__(self, encoding=None, max_bytes=2 * 1024 * 1024, stream=True, text_limit=None, drain_bytes=64 * 1024):
+        try:
+            self._decoder = codecs.getincrementaldecoder(encoding or "utf-8")(errors="replace")
+        except LookupError:
+            self._decoder = codecs.getincrementaldecoder("utf-8")(errors="replace")
+        self.max_bytes = max_bytes
+        self.text_limit = text_limit
+        self.parser = ThreadPageParser(text_limit) if stream else None
+        self.size = 0               # bytes received, drained ones included
+        self.capped = False         # stopped at max_bytes before the page ended
+        self.complete = False       # the parser has every field it needs
+        self._parts = []
+        self._drain_bytes = drain_bytes
+        self._stop_at = None
+
+    def add(self, chunk):
+        """Take the next body chunk; returns True once nothing more needs to be read."""
+        self.size += len(chunk)
+        if self.complete:
+            return self.size >= self._stop_at
+        if self.size > self.max_bytes:
+            chunk = chunk[:len(chunk) - (self.size - self.max_bytes)]
+            self.capped = True
+        text = self._decoder.decode(chunk, final=self.capped)
+        if self.parser is None:
+            self._parts.append(text)
+            return self.capped
+        self.parser.feed(text)
+        if self.parser.complete:
+            self.complete = True
+            self._stop_at = min(self.size + self._drain_bytes, self.max_bytes)
+            return self.size >= self._stop_at
+        return self.capped
+
+    @property
+    def outcome(self):
+        """"early" if parsing finished before the page did, "capped" if cut at max_bytes, else "complete"."""
+        if self.complete:
+            return "early"
+        return "capped" if self.capped else "complete"
+
+    def text(self):
+        """The page text read so far (without ``stream``)."""
+        return "".join(self._parts) + self._decoder.decode(b"", final=True)
+
+    def record(self, url, backend=DEFAULT_BACKEND):
+        """Parse what was read into a ThreadRecord; raises if required markup is missing."""
+        if self.parser is None:
+            return extract_thread_info(self.text(), url, backend, self.text_limit)
+        if not self.complete:
+            self.parser.feed(self._decoder.decode(b"", final=True))
+        self.parser.close()
+        return _build_thread_info(url, self.parser.fields(), self.text_limit)
+
+
+def extract_listing_entries(html, backend=DEFAULT_BACKEND):
+    """Return a ListingEntry for every listed thread that is not struck through and has a member author."""
+    if backend == "fast":
+        return _fast_listing_entries(html)
+    if backend == "lxml":
+        _require_lxml(backend)
+        return _lxml_listing_entries(html)
+    if backend == "bs4-lxml":
+        _require_lxml(backend)
+        return _soup_listing_entries(BeautifulSoup(html, "lxml", parse_only=_LISTING_STRAINER))
+    if backend == "bs4":
+        return _soup_listing_entries(BeautifulSoup(html, "html.parser"))
+    raise ValueError(f"Unknown parser backend '{backend}', expected one of {BACKENDS}.")
+
+
+def extract_thread_links(html, backend=DEFAULT_BACKEND):
+    """Return only the thread links of extract_listing_entries."""
+    return [entry.url for entry in extract_listing_entries(html, backend)]
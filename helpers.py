@@ -1,44 +1,69 @@
+import atexit
 import logging
 import os
-from logging.handlers import TimedRotatingFileHandler
+import queue
+from logging.handlers import TimedRotatingFileHandler, QueueHandler, QueueListener
+
+# Background thread writing every log record; set up by init_all_loggers
+_listener = None
 
 
 def init_all_loggers(log_level):
+    """Send all logging through one queue, written to the log files and the console by a background thread.
+
+    Callers only enqueue the record, so crawl workers never wait on file or console I/O. The error
+    and ban loggers propagate to the root logger like any other, and their file handlers pick out
+    their records by logger name.
+    """
+    global _listener
+    logging.getLogger().setLevel(log_level)
+    init_error_logger(log_level)
+    init_ban_logger(log_level)
+    if _listener is not None:
+        return
+
     os.makedirs("log", exist_ok=True)
 
     formatter = logging.Formatter(u'%(asctime)s %(levelname)s %(message)s', datefmt="%Y-%m-%d %H:%M:%S")
 
-    cmd_logger = logging.getLogger()
     hdlr = TimedRotatingFileHandler("log/logmain.log", when="W0", interval=1, backupCount=4, encoding="utf-8")
     hdlr.setFormatter(formatter)
-    cmd_logger.setLevel(log_level)
-    cmd_logger.addHandler(hdlr)
 
     hdlr2 = logging.StreamHandler()
     hdlr2.setFormatter(formatter)
-    cmd_logger.addHandler(hdlr2)
 
-    init_error_logger(log_level)
-    init_ban_logger(log_level)
+    hdlr_3 = TimedRotatingFileHandler("log/logerror.log", when="W0", interval=1, backupCount=4, encoding="utf-8")
+    hdlr_3.setFormatter(formatter)
+    hdlr_3.addFilter(logging.Filter("AppErrorLogger"))
+
+    hdlr_4 = TimedRotatingFileHandler("log/logban.log", when="W0", interval=1, backupCount=4, encoding="utf-8")
+    hdlr_4.setFormatter(formatter)
+    hdlr_4.addFilter(logging.Filter("AppBanLogger"))
+
+    log_queue = queue.SimpleQueue()
+    _listener = QueueListener(log_queue, hdlr, hdlr2, hdlr_3, hdlr_4, respect_handler_level=True)
+    _listener.start()
+    atexit.register(stop_loggers)
+    logging.getLogger().addHandler(QueueHandler(log_queue))
+
+
+def stop_loggers():
+    """Write out the records still queued and stop the background writer."""
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
 
 
 def init_error_logger(log_level):
-    formatter = logging.Formatter(u'%(asctime)s %(levelname)s %(message)s', datefmt="%Y-%m-%d %H:%M:%S")
     cmd_logger = logging.getLogger("AppErrorLogger")
-    hdlr_3 = TimedRotatingFileHandler("log/logerror.log", when="W0", interval=1, backupCount=4, encoding="utf-8")
-    hdlr_3.setFormatter(formatter)
     cmd_logger.setLevel(log_level)
-    cmd_logger.addHandler(hdlr_3)
     return cmd_logger
 
 
 def init_ban_logger(log_level):
-    formatter = logging.Formatter(u'%(asctime)s %(levelname)s %(message)s', datefmt="%Y-%m-%d %H:%M:%S")
     cmd_logger = logging.getLogger("AppBanLogger")
-    hdlr_3 = TimedRotatingFileHandler("log/logban.log", when="W0", interval=1, backupCount=4, encoding="utf-8")
-    hdlr_3.setFormatter(formatter)
     cmd_logger.setLevel(log_level)
-    cmd_logger.addHandler(hdlr_3)
     return cmd_logger
 
 
@@ -1,6 +1,130 @@
 $(document).ready(function () {
+    const PAGE_SIZE = 100;
+    const SEARCH_DELAY = 250; // ms to wait after the last keystroke before searching
+    const LOAD_MARGIN = 135; // Load the next page when within ~3 rows of the bottom
+    const RETRY_DELAY = 1000; // ms before retrying a failed page load, doubling per failure
+    const MAX_RETRY_DELAY = 60000;
+
+    // Listing state per table: search, cursor of the next page, rows shown so far and pending timers
+    const tables = {};
+
+    $(".editable-table").each(function () {
+        const tableName = $(this).data("table");
+        tables[tableName] = {
+            query: "", match: "prefix", cursor: null, done: false, loading: false, count: 0, generation: 0,
+            failures: 0, retryTimer: null, searchTimer: null,
+        };
+        loadPage(tableName);
+    });
+
+    // Fetch the next page of a table and append its rows
+    function loadPage(tableName) {
+        const state = tables[tableName];
+        if (state.loading || state.done || state.retryTimer !== null) {
+            return; // A failed load is retried by its own timer, not by scrolling or refilling
+        }
+        const params = { limit: PAGE_SIZE };
+        if (state.cursor !== null) {
+            params.after = state.cursor;
+        }
+        if (state.query) {
+            params.q = state.query;
+            params.match = state.match;
+        }
+
+        const generation = state.generation;
+        state.loading = true;
+        $.getJSON(`/entries/${tableName}`, params)
+            .done(function (page) {
+                if (generation !== state.generation) {
+                    return; // A newer search replaced this listing
+                }
+                appendRows(tableName, page.items);
+                state.cursor = page.next_cursor;
+                state.done = page.next_cursor === null;
+                state.failures = 0;
+            })
+            .fail(function (xhr, status, error) {
+                if (generation !== state.generation) {
+                    return;
+                }
+                state.failures += 1;
+                const delay = Math.min(MAX_RETRY_DELAY, RETRY_DELAY * 2 ** (state.failures - 1));
+                console.error(`Failed to load entries, retrying in ${delay / 1000}s:`, error);
+                state.retryTimer = setTimeout(function () {
+                    state.retryTimer = null;
+                    loadPage(tableName);
+                }, delay);
+            })
+            .always(function () {
+                if (generation !== state.generation) {
+                    return;
+                }
+                state.loading = false;
+                if (state.retryTimer !== null) {
+                    return;
+                }
+                // Keep loading until the rows overflow the box, so it can scroll for more
+                const container = $(`.scrollable-content[data-table='${tableName}']`)[0];
+                if (!state.done && container.scrollHeight <= container.clientHeight) {
+                    loadPage(tableName);
+                }
+            });
+    }
+
+    function appendRows(tableName, items) {
+        const state = tables[tableName];
+        const rows = items.map(function (item) {
+            state.count += 1;
+            return $("<tr>").append(
+                $("<td>", { class: "row-number", text: state.count }),
+                $("<td>", { contenteditable: "true", "data-id": item.id, "data-table": tableName, text: item.value })
+            );
+        });
+        $(`.editable-table[data-table='${tableName}'] tbody`).append(rows);
+    }
+
+    // Drop the loaded rows and list the table again from the first page
+    function resetTable(tableName) {
+        const state = tables[tableName];
+        state.generation += 1;
+        clearTimeout(state.retryTimer);
+        state.retryTimer = null;
+        state.failures = 0;
+        state.cursor = null;
+        state.done = false;
+        state.loading = false;
+        state.count = 0;
+        $(`.editable-table[data-table='${tableName}'] tbody tr`).not(".new-row").remove();
+        $(`.scrollable-content[data-table='${tableName}']`).scrollTop(0);
+        loadPage(tableName);
+    }
+
+    $(".scrollable-content").on("scroll", function () {
+        if (this.scrollTop + this.clientHeight >= this.scrollHeight - LOAD_MARGIN) {
+            loadPage($(this).data("table"));
+        }
+    });
+
+    // Search as the user types, once they pause; each table waits on its own timer
+    $(".table-search, .table-search-mode").on("input change", function () {
+        const tableName = $(this).data("table");
+        const state = tables[tableName];
+        clearTimeout(state.searchTimer);
+        state.searchTimer = setTimeout(function () {
+            state.searchTimer = null;
+            const query = $(`.table-search[data-table='${tableName}']`).val().trim();
+            const match = $(`.table-search-mode[data-table='${tableName}']`).val();
+            if (query !== state.query || match !== state.match) {
+                state.query = query;
+                state.match = match;
+                resetTable(tableName);
+            }
+        }, SEARCH_DELAY);
+    });
+
     // Store the original value on focus
-    $(".editable-table td[contenteditable='true']").on("focus", function () {
+    $(".editable-table").on("focus", "td[contenteditable='true']", function () {
         $(this).data("original-value", $(this).text().trim());
 
         if ($(this).hasClass("placeholder")) {
@@ -10,21 +134,25 @@ $(document).ready(function () {
     });
 
     // Compare and save only if value has changed
-    $(".editable-table td[contenteditable='true']").on("blur", function () {
+    $(".editable-table").on("blur", "td[contenteditable='true']", function () {
         const id = $(this).data("id");
         const tableName = $(this).data("table");
         const newValue = $(this).text().trim();
         const originalValue = $(this).data("original-value");
 
         if (!newValue && id === "new") {
-            $(this).addClass("placeholder");
-            $(this).text(`Add new ${tableName}`); // Restore placeholder text
+            restorePlaceholder($(this), tableName);
         } else if (id && tableName && newValue !== originalValue) {
-            saveChange(id, newValue, tableName);
+            saveChange($(this), id, newValue, tableName);
         }
     });
 
-    function saveChange(id, value, tableName) {
+    function restorePlaceholder(cell, tableName) {
+        cell.addClass("placeholder");
+        cell.text(`Add new ${tableName}`); // Restore placeholder text
+    }
+
+    function saveChange(cell, id, value, tableName) {
         $.ajax({
             url: `/edit/${tableName}/${id}`,
             type: "POST",
@@ -34,7 +162,9 @@ $(document).ready(function () {
             success: function (response) {
                 console.log("Change saved successfully.");
                 if (id === "new") {
-                    location.reload(); // Reload to get the new row with ID
+                    // List the table again so the new row shows up with its ID
+                    restorePlaceholder(cell, tableName);
+                    resetTable(tableName);
                 }
             },
             error: function (xhr, status, error) {
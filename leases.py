@@ -0,0 +1,119 @@
+import hashlib
+import math
+import socket
+import threading
+import time
+
+from database import SectionLeaseStore
+from helpers import get_error_logger, get_main_logger
+
+main_logger = get_main_logger()
+error_logger = get_error_logger()
+
+
+class LocalSections:
+    """Every section, for a monitor running on its own."""
+
+    def __init__(self, sections):
+        self.sections = list(sections)
+
+    def start(self):
+        pass
+
+    def current(self):
+        return self.sections
+
+    def seconds_until_refresh(self):
+        return math.inf
+
+    def release(self):
+        pass
+
+
+class SectionLeases:
+    """This worker's share of the sections, held as leases in the shared database.
+
+    Every ``ttl / 3`` seconds a background thread heartbeats, renews the leases and rebalances, so
+    leases stay held however long a poll cycle takes. The worker's fair share is ceil(sections /
+    live workers). It releases sections above that share and claims free or expired ones below it. When a worker dies, its leases expire after ``ttl`` seconds and the
+    remaining workers pick its sections up.
+    """
+
+    def __init__(self, worker_id, sections, ttl=60, store=None):
+        self.worker_id = worker_id
+        self.sections = list(sections)
+        self.ttl = ttl
+        self.store = store or SectionLeaseStore()
+        self.host = socket.gethostname()
+        self.owned = []
+        self.next_refresh = 0.0
+        self._stopped = threading.Event()
+        self._thread = None
+        # Each worker tries free sections in its own order, so simultaneous claims rarely collide
+        self.claim_order = sorted(
+            self.sections, key=lambda section: hashlib.sha1(f"{worker_id}:{section}".encode("utf-8")).digest()
+        )
+        self.store.ensure_sections(self.sections)
+
+    def start(self):
+        """Take this worker's first share of sections and keep the leases refreshed in the background."""
+        self._stopped.clear()
+        self._refresh_logged()
+        self._thread = threading.Thread(target=self._run, name="section-leases", daemon=True)
+        self._thread.start()
+
+    def current(self):
+        """Sections this worker holds right now."""
+        return self.owned
+
+    def seconds_until_refresh(self):
+        return max(0.0, self.next_refresh - time.monotonic())
+
+    def refresh(self):
+        now = int(time.time())
+        self.store.heartbeat(self.worker_id, self.host)
+        workers = self.store.live_workers(now - self.ttl) or [self.worker_id]
+        share = math.ceil(len(self.sections) / len(workers))
+
+        held = set(self.store.owned(self.worker_id, now))
+        owned = [section for section in self.claim_order if section in held]
+        if len(owned) > share:
+            self.store.release(self.worker_id, owned[share:])
+            owned = owned[:share]
+        self.store.renew(self.worker_id, owned, now + self.ttl)
+        for section in self.claim_order:
+            if len(owned) >= share:
+                break
+            if section not in owned and self.store.claim(self.worker_id, section, now + self.ttl, now):
+                owned.append(section)
+
+        if set(owned) != set(self.owned):
+            main_logger.info(f"Worker {self.worker_id} holds {len(owned)}/{len(self.sections)} sections "
+                             f"({len(workers)} live workers).")
+        self.owned = owned
+        self.next_refresh = time.monotonic() + self.ttl / 3
+        return owned
+
+    def release(self):
+        """Give up every lease and unregister, so other workers take over without waiting for expiry."""
+        self._stopped.set()
+        if self._thread:
+            self._thread.join(5)
+            self._thread = None
+        try:
+            self.store.remove_worker(self.worker_id)
+        except Exception as e:
+            error_logger.error(f"Error releasing section leases for worker {self.worker_id}: {e}")
+        self.owned = []
+
+    def _run(self):
+        while not self._stopped.wait(self.seconds_until_refresh()):
+            self._refresh_logged()
+
+    def _refresh_logged(self):
+        try:
+            self.refresh()
+        except Exception as e:
+            # Keep polling what we hold; unrenewed leases expire and are rebalanced elsewhere
+            error_logger.error(f"Error refreshing section leases for worker {self.worker_id}: {e}")
+            self.next_refresh = time.monotonic() + self.ttl / 10
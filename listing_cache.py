@@ -0,0 +1,115 @@
+import hashlib
+import threading
+from collections import OrderedDict
+
+from metrics import LISTING_PAGES
+
+_CELL_MARKER = "col_f_content"
+
+
+def listing_fingerprint(html):
+    """Hash of the td.col_f_content cells of a listing page, or None if the page has none.
+
+    Only the thread cells are hashed, so counters, timestamps and tokens elsewhere on the page do
+    not make an otherwise identical listing look changed. Plain substring scans keep this far
+    cheaper than parsing the page.
+    """
+    digest = hashlib.sha1()
+    found = False
+    position = html.find(_CELL_MARKER)
+    while position >= 0:
+        end = html.find("</td>", position)
+        if end < 0:
+            end = len(html)
+        digest.update(html[position:end].encode("utf-8"))
+        found = True
+        position = html.find(_CELL_MARKER, end)
+    return digest.hexdigest() if found else None
+
+
+class CachedListing:
+    """Validators, fingerprint and extracted entries of the last fetch of a listing URL."""
+    __slots__ = ("etag", "last_modified", "fingerprint", "entries")
+
+    def __init__(self, etag, last_modified, fingerprint, entries):
+        self.etag = etag
+        self.last_modified = last_modified
+        self.fingerprint = fingerprint
+        self.entries = entries
+
+
+class ListingCache:
+    """Per-URL memory of listing pages so unchanged pages are neither re-downloaded nor re-parsed.
+
+    Requests carry If-None-Match / If-Modified-Since when the forum sent validators. A 304, or a
+    200 whose thread cells hash to the previous fingerprint, reuses the previous entries.
+    """
+
+    def __init__(self, max_entries=1_000):
+        self.max_entries = max_entries
+        self._listings = OrderedDict()
+        self._lock = threading.Lock()
+        self.stats = {"not_modified": 0, "unchanged": 0, "parsed": 0}
+
+    def __len__(self):
+        return len(self._listings)
+
+    def clear(self):
+        with self._lock:
+            self._listings.clear()
+
+    def request_headers(self, url):
+        """Conditional request headers for a URL, empty if nothing is cached for it."""
+        with self._lock:
+            cached = self._listings.get(url)
+        headers = {}
+        if cached is not None:
+            if cached.etag:
+                headers["If-None-Match"] = cached.etag
+            if cached.last_modified:
+                headers["If-Modified-Since"] = cached.last_modified
+        return headers
+
+    def entries_for(self, url, status, headers, body, parse):
+        """Entries of a fetched listing page, calling ``parse(body)`` only if the page changed."""
+        with self._lock:
+            cached = self._listings.get(url)
+            if cached is not None:
+                self._listings.move_to_end(url)
+
+        if status == 304:
+            if cached is not None:
+                self._count("not_modified")
+                return cached.entries
+            return ()  # A 304 for a page we no longer hold; the next poll fetches it in full
+
+        fingerprint = listing_fingerprint(body)
+        etag, last_modified = headers.get("ETag"), headers.get("Last-Modified")
+        if cached is not None and fingerprint is not None and fingerprint == cached.fingerprint:
+            entries = cached.entries
+            self._count("unchanged")
+        else:
+            entries = tuple(parse(body))
+            self._count("parsed")
+        self._store(url, CachedListing(etag, last_modified, fingerprint, entries))
+        return entries
+
+    def take_stats(self):
+        """Return and reset the page counters accumulated since the last call."""
+        with self._lock:
+            stats = dict(self.stats)
+            for key in self.stats:
+                self.stats[key] = 0
+        return stats
+
+    def _count(self, key):
+        LISTING_PAGES.inc(key)
+        with self._lock:
+            self.stats[key] += 1
+
+    def _store(self, url, listing):
+        with self._lock:
+            self._listings[url] = listing
+            self._listings.move_to_end(url)
+            while len(self._listings) > self.max_entries:
+                self._listings.popitem(last=False)
@@ -1,16 +1,21 @@
-from fastapi import FastAPI, Form, HTTPException, Depends, Request
-from fastapi.responses import HTMLResponse
+from fastapi import FastAPI, Form, File, UploadFile, Query, HTTPException, Depends, Request
+from fastapi.responses import HTMLResponse, PlainTextResponse, StreamingResponse
 from fastapi.templating import Jinja2Templates
 from fastapi.staticfiles import StaticFiles
+from sqlalchemy import and_, func, or_
 from sqlalchemy.orm import Session
 from sqlalchemy.exc import IntegrityError
-from database import get_db, BlacklistDescription, BlacklistTitle, BlacklistLinks
-from nulled import monitor_forum
+from database import (get_db, bump_blacklist_version, insert_blacklist_values, iter_blacklist_values, query_ban_audit,
+                      BlacklistDescription, BlacklistTitle, BlacklistLinks)
+from bulk import BULK_FORMATS, MEDIA_TYPES, EXTENSIONS, BulkFormatError, detect_format, read_values, write_values
+from nulled import monitor_forum, MONITOR_ENGINES, thread_archive_dir
+from backtest import run_backtest
+from metrics import REGISTRY, monitor_stats
 import threading
 import uvicorn
-from typing import Union
+from typing import Dict, List, Optional, Union
 from datetime import datetime, timezone
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
 from contextlib import asynccontextmanager
 
 
@@ -25,14 +30,10 @@ class TableManager:
         "title": BlacklistTitle,
         "links": BlacklistLinks,
     }
+    SEARCH_MODES = ("prefix", "substring")
 
-    def __init__(self, db: Session):
-        self.db = db
-
-    def get_all(self, table_name: str):
-        """Retrieve all entries for a specified table."""
-        table_model = self._get_table_model(table_name)
-        return self.db.query(table_model).all()
+    def __init__(self, db: Session = None):
+        self.db = db  # Bulk import and export open their own short sessions and need none
 
     def add_entry(self, table_name: str, value: str):
         """Add a new entry to a specified table and return its ID."""
@@ -40,6 +41,7 @@ class TableManager:
         new_entry = table_model(**{table_model.__table__.columns.keys()[1]: value})
         try:
             self.db.add(new_entry)
+            bump_blacklist_version(self.db)
             self.db.commit()
             self.db.refresh(new_entry)
             return new_entry.id
@@ -55,14 +57,89 @@ class TableManager:
             self.add_entry(table_name, value)
             return {"status": "success", "message": "New entry added."}
 
-        entry = self.db.query(table_model).filter(table_model.id == id).first()  # type: ignore
-        if not entry:
+        # A single UPDATE rather than read-then-write, so the transaction never has to upgrade its lock
+        column = table_model.__table__.columns.keys()[1]
+        try:
+            updated = self.db.query(table_model).filter(table_model.id == id).update(  # type: ignore
+                {column: value}, synchronize_session=False
+            )
+            if updated:
+                bump_blacklist_version(self.db, rewrite=True)
+            self.db.commit()
+        except IntegrityError:
+            self.db.rollback()
+            raise HTTPException(status_code=400, detail=f"{table_name.capitalize()} already exists.")
+        if not updated:
             raise HTTPException(status_code=404, detail="Entry not found.")
-
-        setattr(entry, table_model.__table__.columns.keys()[1], value)
-        self.db.commit()
         return {"status": "success", "message": "Entry updated."}
 
+    def list_entries(self, table_name: str, after: Optional[str] = None, limit: int = 100, q: str = "",
+                     match: str = "prefix"):
+        """Return one keyset-paginated page of a table, optionally filtered by a search term.
+
+        Both searches ignore case: values and the term are lowercased by the database. Unfiltered and
+        substring listings come in ID order, and the cursor is the last ID. A prefix search walks the
+        index on lower(value), so its rows come in that order and the cursor is the last "id:value".
+        Either way a page costs the same however deep it is.
+        """
+        table_model = self._get_table_model(table_name)
+        if match not in self.SEARCH_MODES:
+            raise HTTPException(status_code=400, detail=f"Invalid match, expected one of {self.SEARCH_MODES}.")
+        column = getattr(table_model, table_model.__table__.columns.keys()[1])
+        lowered = func.lower(column)
+        query = self.db.query(table_model.id, column)
+        by_value = bool(q) and match == "prefix"
+        if by_value:
+            term = func.lower(q)
+            query = query.filter(lowered >= term, lowered < term + "\U0010ffff")  # type: ignore
+            if after is not None:
+                # Lowercased values can repeat ("Spam", "spam"), so the ID breaks ties
+                after_id, _, after_value = after.partition(":")
+                if not after_id.isdigit():
+                    raise HTTPException(status_code=400, detail="Invalid cursor.")
+                after_value = func.lower(after_value)
+                query = query.filter(or_(lowered > after_value,
+                                         and_(lowered == after_value, table_model.id > int(after_id))))
+            query = query.order_by(lowered, table_model.id)
+        else:
+            if q:
+                pattern = "%" + q.replace("/", "//").replace("%", "/%").replace("_", "/_") + "%"
+                query = query.filter(lowered.like(func.lower(pattern), escape="/"))
+            if after:
+                if not after.isdigit():
+                    raise HTTPException(status_code=400, detail="Invalid cursor.")
+                query = query.filter(table_model.id > int(after))  # type: ignore
+            query = query.order_by(table_model.id)
+
+        rows = query.limit(limit + 1).all()
+        next_cursor = None
+        if len(rows) > limit:
+            rows = rows[:limit]
+            next_cursor = f"{rows[-1][0]}:{rows[-1][1]}" if by_value else str(rows[-1][0])
+        return {"items": [{"id": id, "value": value} for id, value in rows], "next_cursor": next_cursor}
+
+    def import_entries(self, table_name: str, stream, fmt: str):
+        """Insert every value of an upload in one batched transaction, skipping duplicates."""
+        table_model = self._get_table_model(table_name)
+        column = table_model.__table__.columns.keys()[1]
+        received, unique = 0, {}
+        try:
+            for value in read_values(stream, fmt, column):
+                received += 1
+                unique[value] = None
+        except BulkFormatError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        # Parse the whole upload first so the write transaction only spends time on inserts
+        inserted = insert_blacklist_values(table_model, list(unique)) if unique else 0
+        return {"received": received, "inserted": inserted, "skipped": received - inserted}
+
+    def export_entries(self, table_name: str, fmt: str):
+        """Stream every value of a table in the given format."""
+        table_model = self._get_table_model(table_name)
+        if fmt not in BULK_FORMATS:
+            raise HTTPException(status_code=400, detail=f"Invalid format, expected one of {BULK_FORMATS}.")
+        return write_values(iter_blacklist_values(table_model), fmt)
+
     def _get_table_model(self, table_name: str):
         """Validate and retrieve the table model."""
         if table_name not in self.TABLE_MAP:
@@ -78,8 +155,12 @@ class MonitorManager:
         self.thread_lock = threading.Lock()
         self.jobs = {}
 
-    def start(self, max_threads=5, page_range=3, cycle_delay=120):
+    def start(self, max_threads=5, page_range=3, cycle_delay=120, engine="threaded", concurrency=50,
+              min_interval=30, max_interval=600, sharded=False):
         """Start the monitoring thread."""
+        if engine not in MONITOR_ENGINES:
+            raise HTTPException(status_code=400, detail=f"Invalid engine, expected one of {', '.join(MONITOR_ENGINES)}.")
+
         with self.thread_lock:
             if self.thread_running:
                 raise HTTPException(status_code=400, detail="Monitor is already running.")
@@ -91,12 +172,17 @@ class MonitorManager:
                 "max_threads": max_threads,
                 "page_range": page_range,
                 "cycle_delay": cycle_delay,
+                "engine": engine,
+                "concurrency": concurrency,
+                "min_interval": min_interval,
+                "max_interval": max_interval,
+                "sharded": sharded,
             }
 
             self.thread_running = True
             self.monitor_thread = threading.Thread(
                 target=self._run_monitor,
-                args=(max_threads, page_range, cycle_delay, job_id),
+                args=(max_threads, page_range, cycle_delay, engine, concurrency, min_interval, max_interval, sharded, job_id),
                 daemon=True,
             )
             self.monitor_thread.start()
@@ -115,15 +201,22 @@ class MonitorManager:
             self.jobs[job_id]["status"] = "stopped"
 
     def check_jobs(self):
-        """Retrieve all jobs and their statuses."""
-        return self.jobs
-
-    def _run_monitor(self, max_threads, page_range, cycle_delay, job_id):
+        """Retrieve all jobs and their statuses, with live cycle stats for the running one."""
+        jobs = {job_id: dict(job) for job_id, job in self.jobs.items()}
+        for job in jobs.values():
+            if job["status"] == "running":
+                job["live"] = monitor_stats()
+        return jobs
+
+    def _run_monitor(self, max_threads, page_range, cycle_delay, engine, concurrency, min_interval, max_interval, sharded,
+                     job_id):
         """Wrapper for monitor_forum to include a stop signal."""
         def stop_signal():
             return self.thread_running
 
-        monitor_forum(max_threads=max_threads, page_range=page_range, cycle_delay=cycle_delay, stop_signal=stop_signal)
+        monitor_forum(max_threads=max_threads, page_range=page_range, cycle_delay=cycle_delay, stop_signal=stop_signal,
+                      engine=engine, concurrency=concurrency, min_interval=min_interval, max_interval=max_interval,
+                      sharded=sharded)
         self.jobs[job_id]["status"] = "completed"
 
 
@@ -139,7 +232,8 @@ async def lifespan(app: FastAPI):
     if AUTO_START_MONITOR:
         monitor_manager.start()
     yield
-    monitor_manager.stop()
+    if monitor_manager.thread_running:
+        monitor_manager.stop()
 
 
 app = FastAPI(lifespan=lifespan)
@@ -152,20 +246,25 @@ class HealthStatus(BaseModel):
     duration: int
 
 
+class BacktestRequest(BaseModel):
+    rules: Optional[str] = None                 # candidate rules.yaml text; the current rules when omitted
+    add: Dict[str, List[str]] = {}              # blacklist field -> keywords to add
+    remove: Dict[str, List[str]] = {}           # blacklist field -> keywords to remove
+    since: Optional[datetime] = None
+    until: Optional[datetime] = None
+    examples: int = Field(10, ge=0, le=100)
+
+
+# Endpoints that use the database are plain `def`, so FastAPI runs them in its thread pool; only the
+# ones that never block (no database, no I/O) are `async def` and run on the event loop.
 @app.get("/", response_class=HTMLResponse, tags=["Default"])
-async def root(request: Request, db: Session = Depends(get_db)):
-    """Render the management page."""
-    table_manager = TableManager(db)
-    data = {
-        "descriptions": table_manager.get_all("description"),
-        "titles": table_manager.get_all("title"),
-        "links": table_manager.get_all("links"),
-    }
-    return templates.TemplateResponse("index.html", {"request": request, **data})
+async def root(request: Request):
+    """Render the management page; its tables load their rows from /entries as they scroll."""
+    return templates.TemplateResponse("index.html", {"request": request})
 
 
 @app.get("/health", response_model=HealthStatus, tags=["Default"])
-def health_check():
+async def health_check():
     """Perform a health check."""
     uptime_duration = datetime.now(timezone.utc) - start_time
     return {"status": "healthy", "duration": int(uptime_duration.total_seconds())}
@@ -173,9 +272,13 @@ def health_check():
 
 # Monitoring endpoints
 @app.post("/start-monitor", tags=["Monitoring"])
-def start_monitor_endpoint(max_threads: int = 5, page_range: int = 3, cycle_delay: int = 120):
+def start_monitor_endpoint(max_threads: int = 5, page_range: int = 3, cycle_delay: int = 120,
+                           engine: str = "threaded", concurrency: int = 50,
+                           min_interval: int = 30, max_interval: int = 600, sharded: bool = False):
     """Start the monitor with customizable parameters."""
-    monitor_manager.start(max_threads=max_threads, page_range=page_range, cycle_delay=cycle_delay)
+    monitor_manager.start(max_threads=max_threads, page_range=page_range, cycle_delay=cycle_delay,
+                          engine=engine, concurrency=concurrency, min_interval=min_interval,
+                          max_interval=max_interval, sharded=sharded)
     return {"status": "success", "message": "Monitor started."}
 
 
@@ -186,15 +289,70 @@ def stop_monitor_endpoint():
     return {"status": "success", "message": "Monitor stopped."}
 
 
+@app.get("/metrics", response_class=PlainTextResponse, tags=["Monitoring"])
+async def metrics_endpoint():
+    """Monitor metrics in the Prometheus text format."""
+    return PlainTextResponse(REGISTRY.render(), media_type="text/plain; version=0.0.4")
+
+
 @app.get("/check-jobs", tags=["Monitoring"])
-def check_jobs_endpoint():
+async def check_jobs_endpoint():
     """Retrieve the status of all jobs."""
     return monitor_manager.check_jobs()
 
 
+def _timestamp(value: Optional[datetime]) -> Optional[int]:
+    """Unix time of a query datetime, reading naive datetimes as UTC."""
+    if value is None:
+        return None
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)
+    return int(value.timestamp())
+
+
+@app.get("/bans", tags=["Monitoring"])
+def list_bans(userid: Optional[str] = None, rule: Optional[str] = None, since: Optional[datetime] = None,
+              until: Optional[datetime] = None, after: Optional[int] = None, limit: int = Query(100, ge=1, le=500),
+              db: Session = Depends(get_db)):
+    """Page through the ban audit, newest first, filtered by user, rule and a [since, until) time range.
+
+    ``since`` and ``until`` take ISO 8601 datetimes or Unix timestamps. Pass ``next_cursor`` back
+    as ``after`` for the next page.
+    """
+    rows = query_ban_audit(db, userid=userid, rule=rule, since=_timestamp(since), until=_timestamp(until),
+                           before=after, limit=limit + 1)
+    next_cursor = rows[limit - 1].id if len(rows) > limit else None
+    items = [{
+        "id": row.id,
+        "userid": row.userid,
+        "thread_url": row.thread_url,
+        "rule": row.rule,
+        "field": row.field,
+        "keyword": row.keyword,
+        "banned_at": datetime.fromtimestamp(row.banned_at, timezone.utc).isoformat(),
+    } for row in rows[:limit]]
+    return {"items": items, "next_cursor": next_cursor}
+
+
+@app.post("/backtest", tags=["Monitoring"])
+def backtest_endpoint(request: BacktestRequest):
+    """Replay candidate rules and blacklist changes against the thread archive and diff them with the current ones.
+
+    Reports the threads and users each would have banned, per rule, with example threads of the
+    users the candidate bans and of those it no longer bans.
+    """
+    try:
+        return run_backtest(request.rules, request.add, request.remove, _timestamp(request.since),
+                            _timestamp(request.until), request.examples, thread_archive_dir or None)
+    except ValueError as e:  # Includes RuleError
+        raise HTTPException(status_code=400, detail=str(e))
+    except RuntimeError as e:
+        raise HTTPException(status_code=503, detail=str(e))
+
+
 # Table management endpoints
 @app.post("/edit/{table_name}/{id}", tags=["Table Management"])
-async def edit_entry(table_name: str, id: Union[int, str], value: str = Form(...), db: Session = Depends(get_db)):
+def edit_entry(table_name: str, id: Union[int, str], value: str = Form(...), db: Session = Depends(get_db)):
     """Edit or add table entry."""
     manager = TableManager(db)
     manager.edit_entry(table_name, id, value)
@@ -202,13 +360,40 @@ async def edit_entry(table_name: str, id: Union[int, str], value: str = Form(...
 
 
 @app.post("/add/{table_name}", tags=["Table Management"])
-async def add_entry(table_name: str, value: str = Form(...), db: Session = Depends(get_db)):
+def add_entry(table_name: str, value: str = Form(...), db: Session = Depends(get_db)):
     """Add a new table entry and return its ID."""
     manager = TableManager(db)
     new_id = manager.add_entry(table_name, value)
     return {"status": "success", "id": new_id, "value": value}
 
 
+@app.get("/entries/{table_name}", tags=["Table Management"])
+def list_entries(table_name: str, after: Optional[str] = None, limit: int = Query(100, ge=1, le=500),
+                 q: str = "", match: str = "prefix", db: Session = Depends(get_db)):
+    """Page through a table's entries, optionally searching by prefix or substring."""
+    manager = TableManager(db)
+    return manager.list_entries(table_name, after=after, limit=limit, q=q.strip(), match=match)
+
+
+@app.post("/import/{table_name}", tags=["Table Management"])
+def import_entries(table_name: str, file: UploadFile = File(...),
+                   fmt: Optional[str] = Query(None, alias="format")):
+    """Bulk-add values from a newline, CSV or JSONL upload; returns inserted and skipped counts."""
+    manager = TableManager()
+    counts = manager.import_entries(table_name, file.file, fmt or detect_format(file.filename))
+    return {"status": "success", "table": table_name, **counts}
+
+
+@app.get("/export/{table_name}", tags=["Table Management"])
+def export_entries(table_name: str, fmt: str = Query("newline", alias="format")):
+    """Stream every value of a table as newline, CSV or JSONL."""
+    manager = TableManager()
+    chunks = manager.export_entries(table_name, fmt)
+    filename = f"{table_name}.{EXTENSIONS[fmt]}"
+    return StreamingResponse(chunks, media_type=MEDIA_TYPES[fmt],
+                             headers={"Content-Disposition": f'attachment; filename="{filename}"'})
+
+
 
 if __name__ == "__main__":
     uvicorn.run("main:app", host="0.0.0.0", port=8000, reload=False)
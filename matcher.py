@@ -0,0 +1,342 @@
+from bisect import bisect_right
+from collections import deque
+import re
+import threading
+
+# Keyword lists up to this long are searched with str.find, one C-speed scan per keyword, instead of
+# walking the automaton; find_all_many also joins the batch into one string for it
+BATCH_SEARCH_KEYWORDS = 128
+
+
+class KeywordMatcher:
+    """Aho-Corasick automaton matching many blacklist keywords in one pass over the text."""
+
+    def __init__(self, keywords):
+        # Keywords keep their blacklist order so the reported hit matches the old per-keyword loop
+        self.keywords = list(keywords)
+        self._patterns = [keyword.lower() for keyword in self.keywords]
+        self._goto = [{}]
+        self._fail = [0]
+        self._out = [()]
+        self._build()
+
+    def _build(self):
+        goto, out = self._goto, self._out
+        pending = {}
+        for index, pattern in enumerate(self._patterns):
+            if not pattern:
+                continue
+            state = 0
+            for char in pattern:
+                next_state = goto[state].get(char)
+                if next_state is None:
+                    next_state = len(goto)
+                    goto[state][char] = next_state
+                    goto.append({})
+                    out.append(())
+                state = next_state
+            pending.setdefault(state, []).append(index)
+
+        for state, indexes in pending.items():
+            out[state] = tuple(indexes)
+
+        fail = self._fail = [0] * len(goto)
+        queue = deque(goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for char, next_state in goto[state].items():
+                queue.append(next_state)
+                fallback = fail[state]
+                while fallback and char not in goto[fallback]:
+                    fallback = fail[fallback]
+                fail[next_state] = goto[fallback].get(char, 0)
+                if out[fail[next_state]]:
+                    out[next_state] = out[next_state] + out[fail[next_state]]
+
+    def __len__(self):
+        return len(self.keywords)
+
+    def extended(self, keywords):
+        """A new matcher with ``keywords`` appended; the automaton is rebuilt."""
+        return KeywordMatcher(self.keywords + list(keywords))
+
+    def find_all(self, text):
+        """Return the indexes of every keyword found in the text, in blacklist order."""
+        if not text or not self.keywords:
+            return []
+        if len(self.keywords) <= BATCH_SEARCH_KEYWORDS:
+            lowered = text.lower()
+            return [index for index, pattern in enumerate(self._patterns) if pattern and pattern in lowered]
+        goto, fail, out = self._goto, self._fail, self._out
+        found = set()
+        state = 0
+        for char in text.lower():
+            while state and char not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(char, 0)
+            if out[state]:
+                found.update(out[state])
+        return sorted(found)
+
+    def find_all_many(self, texts):
+        """find_all for each of a batch of texts.
+
+        Up to BATCH_SEARCH_KEYWORDS keywords are searched with str.find over the whole batch joined
+        into one string, a C-speed pass per keyword; longer lists run the automaton text by text.
+        """
+        if len(self.keywords) > BATCH_SEARCH_KEYWORDS:
+            return [self.find_all(text) for text in texts]
+        lowered = [(text or "").lower() for text in texts]
+        found = [[] for _ in lowered]
+        starts, position = [], 0
+        for text in lowered:
+            starts.append(position)
+            position += len(text) + 1
+        blob = "\x00".join(lowered)
+        for index, pattern in enumerate(self._patterns):
+            if not pattern:
+                continue
+            if "\x00" in pattern:  # Could span two texts of the batch
+                for row, text in enumerate(lowered):
+                    if pattern in text:
+                        found[row].append(index)
+                continue
+            position = blob.find(pattern)
+            while position != -1:
+                row = bisect_right(starts, position) - 1
+                found[row].append(index)
+                if row + 1 == len(starts):
+                    break
+                position = blob.find(pattern, starts[row + 1])
+        return found
+
+    def first_match(self, text):
+        """Return the first blacklisted keyword (in blacklist order) found in the text, or None."""
+        hits = self.find_all(text)
+        return self.keywords[hits[0]] if hits else None
+
+
+_HOST_RE = re.compile(r"[a-z0-9_-]+(\.[a-z0-9_-]+)+")
+
+
+def split_link(link):
+    """Split a URL or a bare ``host/path`` into a normalized (host, path), or (None, None) without a valid host.
+
+    The host is lowercased, IDNA-encoded and stripped of scheme, credentials, port and a trailing
+    dot. The path keeps the query string but drops the fragment.
+    """
+    link = link.strip().lower()
+    scheme = link.find("://")
+    if scheme != -1:
+        link = link[scheme + 3:]
+    elif link.startswith("//"):
+        link = link[2:]
+    link = link.split("#", 1)[0]
+    end = len(link)
+    for separator in "/?":
+        position = link.find(separator)
+        if position != -1:
+            end = min(end, position)
+    host, path = link[:end], link[end:]
+    host = host.rsplit("@", 1)[-1]
+    if ":" in host:
+        host, _, port = host.partition(":")
+        if port and not port.isdigit():
+            return None, None
+    host = host.rstrip(".")
+    if not host.isascii():
+        try:
+            host = host.encode("idna").decode("ascii")
+        except UnicodeError:
+            return None, None
+    if not _HOST_RE.fullmatch(host):
+        return None, None
+    return host, path
+
+
+class LinkMatcher:
+    """Blacklist of domains, optionally with a path prefix, matched against the links of a thread.
+
+    An entry such as ``mega.nz`` bans that host and every subdomain of it. ``mega.nz/folder/``
+    bans only URLs on those hosts whose path starts with ``/folder/``. Entries are indexed by host,
+    so a link costs one dict lookup per label of its host however long the blacklist is. A leading
+    ``*.``, ``.`` or ``www.`` on an entry is ignored. Entries that are not a domain stay substring
+    keywords matched by a KeywordMatcher, as before.
+    """
+
+    def __init__(self, keywords):
+        self.keywords = []
+        self._hosts = {}            # host -> ((path prefix, keyword index), ...)
+        self._keyword_indexes = []
+        self._keywords = None
+        self._index(keywords)
+
+    def _index(self, keywords):
+        """Append entries to the host index; the substring KeywordMatcher is rebuilt only if non-domain entries came."""
+        keywords = list(keywords)
+        hosts, keyword_indexes = self._hosts, self._keyword_indexes
+        substrings = len(keyword_indexes)
+        for index, keyword in enumerate(keywords, len(self.keywords)):
+            entry = keyword.strip().lower()
+            for prefix in ("*.", ".", "www."):
+                if entry.startswith(prefix):
+                    entry = entry[len(prefix):]
+            host, path = split_link(entry) if entry else (None, None)
+            if host is None:
+                keyword_indexes.append(index)
+            else:
+                # A new tuple rather than appending, so a matcher this index was copied from is untouched
+                hosts[host] = hosts.get(host, ()) + ((path, index),)
+        self.keywords.extend(keywords)
+        if self._keywords is None or len(keyword_indexes) != substrings:
+            self._keywords = KeywordMatcher([self.keywords[index] for index in keyword_indexes])
+
+    def __len__(self):
+        return len(self.keywords)
+
+    def extended(self, keywords):
+        """A new matcher with ``keywords`` appended, indexing only those on top of a copy of this one's index."""
+        matcher = LinkMatcher.__new__(LinkMatcher)
+        matcher.keywords = list(self.keywords)
+        matcher._hosts = dict(self._hosts)
+        matcher._keyword_indexes = list(self._keyword_indexes)
+        matcher._keywords = self._keywords
+        matcher._index(keywords)
+        return matcher
+
+    def find_all(self, text):
+        """Return the indexes of every entry matching a link of the comma-separated text, in blacklist order."""
+        if not text or not self.keywords:
+            return []
+        return self._find(text, self._keywords.find_all(text))
+
+    def find_all_many(self, texts):
+        """find_all for each of a batch of texts."""
+        if not self.keywords:
+            return [[] for _ in texts]
+        keyword_hits = self._keywords.find_all_many(texts)
+        return [self._find(text, hits) if text else [] for text, hits in zip(texts, keyword_hits)]
+
+    def _find(self, text, keyword_hits):
+        found = {self._keyword_indexes[hit] for hit in keyword_hits}
+        if self._hosts:
+            hosts = self._hosts
+            for link in text.split(","):
+                host, path = split_link(link)
+                while host:
+                    for prefix, index in hosts.get(host, ()):
+                        if path.startswith(prefix):
+                            found.add(index)
+                    dot = host.find(".")
+                    host = host[dot + 1:] if dot != -1 else None
+        return sorted(found)
+
+    def first_match(self, text):
+        """Return the first blacklisted entry (in blacklist order) matching a link in the text, or None."""
+        hits = self.find_all(text)
+        return self.keywords[hits[0]] if hits else None
+
+
+# Thread fields searched for each blacklist category
+FIELD_SOURCES = {
+    "descriptions": "op_thread_descriptions_full",
+    "links": "op_thread_links",
+    "titles": "op_thread_title",
+}
+
+# Matcher class per blacklist field; fields not listed use KeywordMatcher
+FIELD_MATCHERS = {
+    "links": LinkMatcher,
+}
+
+_compiled_fields = {}
+_compiled_version = (None, {})
+_compiled_lock = threading.Lock()
+
+
+def compile_blacklist(blacklist_data, version=None):
+    """Build (or reuse) one matcher per blacklist field: a LinkMatcher for links, else a KeywordMatcher.
+
+    With a snapshot version the whole set is cached until the version changes; a field whose
+    keyword list is unchanged keeps its existing matcher, and one that only gained keywords at the
+    end extends it.
+    """
+    global _compiled_version
+    cached_version, cached = _compiled_version
+    if version is not None and version == cached_version:
+        return cached
+
+    matchers = {}
+    with _compiled_lock:
+        for field, keywords in blacklist_data.items():
+            keywords = list(keywords)
+            matcher = _compiled_fields.get(field)
+            if matcher is None or matcher.keywords != keywords:
+                known = len(matcher.keywords) if matcher is not None else 0
+                if known and len(keywords) > known and keywords[:known] == matcher.keywords:
+                    matcher = matcher.extended(keywords[known:])
+                else:
+                    matcher = FIELD_MATCHERS.get(field, KeywordMatcher)(keywords)
+                _compiled_fields[field] = matcher
+            matchers[field] = matcher
+        if version is not None:
+            _compiled_version = (version, matchers)
+    return matchers
+
+
+class BlacklistCompiler:
+    """Matchers for the newest blacklist snapshot, compiled off the crawl path.
+
+    ``get`` returns the newest snapshot whose matchers are ready, with those matchers, so the
+    blacklist fingerprint recorded with a verdict is always the one it was matched against. Only
+    the first snapshot is compiled in the calling thread. A newer one goes to a background thread
+    while the previous matchers keep serving; snapshots arriving meanwhile are coalesced, so only
+    the latest is compiled.
+    """
+
+    def __init__(self):
+        self._ready = None      # (snapshot, matchers)
+        self._wanted = None     # newest snapshot waiting for the builder thread
+        self._building = False
+        self._lock = threading.Lock()
+
+    def get(self, snapshot):
+        """(snapshot, matchers) for ``snapshot`` if compiled, else for the newest one that is."""
+        ready = self._ready
+        if ready is not None and ready[0].version == snapshot.version:
+            return ready
+        with self._lock:
+            ready = self._ready
+            if ready is None:
+                ready = self._ready = (snapshot, compile_blacklist(snapshot.data, snapshot.version))
+            elif snapshot.version > ready[0].version:
+                self._wanted = snapshot
+                if not self._building:
+                    self._building = True
+                    threading.Thread(target=self._build, name="blacklist-compiler", daemon=True).start()
+        return ready
+
+    def _build(self):
+        while True:
+            with self._lock:
+                snapshot, self._wanted = self._wanted, None
+                if snapshot is None:
+                    self._building = False
+                    return
+            try:
+                matchers = compile_blacklist(snapshot.data, snapshot.version)
+            except Exception:
+                with self._lock:
+                    self._building = False
+                raise
+            with self._lock:
+                if snapshot.version > self._ready[0].version:
+                    self._ready = (snapshot, matchers)
+
+
+def match_field(field, matcher, thread_info):
+    """Return the first keyword of the given field's matcher found in the thread, or None."""
+    source = FIELD_SOURCES.get(field)
+    if source is None:
+        return None
+    return matcher.first_match(thread_info.get(source) or "")
@@ -0,0 +1,226 @@
+import bisect
+import threading
+import time
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+CYCLE_BUCKETS = (1.0, 5.0, 10.0, 30.0, 60.0, 120.0, 300.0, 600.0, 1800.0)
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _label_text(names, values, extra=""):
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+class Counter:
+    """Monotonic counter with optional labels, exported as a Prometheus counter."""
+    kind = "counter"
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, *labelvalues, amount=1):
+        with self._lock:
+            self._values[labelvalues] = self._values.get(labelvalues, 0) + amount
+
+    def values(self):
+        with self._lock:
+            return dict(self._values)
+
+    def samples(self):
+        for labelvalues, value in sorted(self.values().items()):
+            yield f"{self.name}{_label_text(self.labelnames, labelvalues)} {value}"
+
+
+class Gauge(Counter):
+    """Value that can go up and down, exported as a Prometheus gauge."""
+    kind = "gauge"
+
+    def set(self, value, *labelvalues):
+        with self._lock:
+            self._values[labelvalues] = value
+
+
+class _Timer:
+    __slots__ = ("histogram", "labelvalues", "started")
+
+    def __init__(self, histogram, labelvalues):
+        self.histogram = histogram
+        self.labelvalues = labelvalues
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.histogram.observe(time.perf_counter() - self.started, *self.labelvalues)
+
+
+class Histogram:
+    """Bucketed distribution of observed values (seconds), exported as a Prometheus histogram."""
+    kind = "histogram"
+
+    def __init__(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(sorted(buckets))
+        self._series = {}  # labelvalues -> [bucket counts..., +Inf count, sum]
+        self._lock = threading.Lock()
+
+    def observe(self, value, *labelvalues):
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(labelvalues)
+            if series is None:
+                series = self._series[labelvalues] = [0] * (len(self.buckets) + 2)
+            series[index] += 1
+            series[-1] += value
+
+    def time(self, *labelvalues):
+        """Context manager that observes the duration of its block."""
+        return _Timer(self, labelvalues)
+
+    def summary(self):
+        """Count, total and mean per label set, for JSON status output."""
+        with self._lock:
+            series = {labelvalues: list(values) for labelvalues, values in self._series.items()}
+        result = {}
+        for labelvalues, values in series.items():
+            count = sum(values[:-1])
+            result[labelvalues] = {
+                "count": count,
+                "seconds": round(values[-1], 3),
+                "avg_ms": round(values[-1] / count * 1000, 2) if count else 0.0,
+            }
+        return result
+
+    def samples(self):
+        with self._lock:
+            series = {labelvalues: list(values) for labelvalues, values in self._series.items()}
+        for labelvalues, values in sorted(series.items()):
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), values[:-1]):
+                cumulative += count
+                le = 'le="+Inf"' if bound == float("inf") else f'le="{bound!r}"'
+                yield f"{self.name}_bucket{_label_text(self.labelnames, labelvalues, le)} {cumulative}"
+            labels = _label_text(self.labelnames, labelvalues)
+            yield f"{self.name}_sum{labels} {values[-1]}"
+            yield f"{self.name}_count{labels} {cumulative}"
+
+
+class Registry:
+    def __init__(self):
+        self.metrics = []
+
+    def register(self, metric):
+        self.metrics.append(metric)
+        return metric
+
+    def render(self):
+        """All metrics in the Prometheus text exposition format."""
+        lines = []
+        for metric in self.metrics:
+            lines.append(f"# HELP {metric.name} {metric.documentation}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            lines.extend(metric.samples())
+        return "\n".join(lines) + "\n"
+
+
+class CycleTracker:
+    """Progress of the running monitor cycle and totals of the last finished one."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.cycles = 0
+        self.current = None
+        self.last = None
+
+    def begin(self, engine, sections):
+        with self._lock:
+            self.current = {"engine": engine, "sections": len(sections), "started": time.monotonic()}
+
+    def end(self, **stats):
+        with self._lock:
+            if self.current is None:
+                return
+            duration = time.monotonic() - self.current["started"]
+            self.last = dict(stats, engine=self.current["engine"], sections=self.current["sections"],
+                             seconds=round(duration, 3), finished_at=time.time())
+            self.current = None
+            self.cycles += 1
+        CYCLE_SECONDS.observe(duration)
+
+    def snapshot(self):
+        with self._lock:
+            current = self.current and {
+                "engine": self.current["engine"],
+                "sections": self.current["sections"],
+                "elapsed": round(time.monotonic() - self.current["started"], 3),
+            }
+            return {"cycles_completed": self.cycles, "current_cycle": current, "last_cycle": self.last}
+
+
+REGISTRY = Registry()
+
+STAGE_SECONDS = REGISTRY.register(Histogram(
+    "forum_monitor_stage_seconds", "Time spent per item in each monitor stage.", ["stage"]))
+CYCLE_SECONDS = REGISTRY.register(Histogram(
+    "forum_monitor_cycle_seconds", "Duration of a monitor cycle over the due sections.", buckets=CYCLE_BUCKETS))
+HTTP_RESPONSES = REGISTRY.register(Counter(
+    "forum_monitor_http_responses_total", "Forum HTTP responses by request kind and status code.", ["kind", "status"]))
+HTTP_BYTES = REGISTRY.register(Counter(
+    "forum_monitor_http_bytes_total", "Response body bytes downloaded from the forum.", ["kind"]))
+LISTING_PAGES = REGISTRY.register(Counter(
+    "forum_monitor_listing_pages_total", "Listing pages by outcome: parsed, unchanged or not_modified.", ["result"]))
+THREAD_PAGES = REGISTRY.register(Counter(
+    "forum_monitor_thread_pages_total",
+    "Thread page downloads by outcome: early (stopped after the opening post), complete or capped.", ["result"]))
+ARCHIVED_THREADS = REGISTRY.register(Counter(
+    "forum_monitor_archived_threads_total", "Thread records written to the thread archive, or lost to write errors.",
+    ["result"]))
+THREADS = REGISTRY.register(Counter(
+    "forum_monitor_threads_total", "Evaluated threads by verdict.", ["verdict"]))
+RULE_MATCHES = REGISTRY.register(Counter(
+    "forum_monitor_rule_matches_total", "Blacklist matches by rule and field.", ["rule", "field"]))
+BANS = REGISTRY.register(Counter(
+    "forum_monitor_bans_total", "Ban dispatcher outcomes: submitted, deduplicated, banned, retried, failed.",
+    ["result"]))
+BANS_QUEUED = REGISTRY.register(Gauge(
+    "forum_monitor_bans_queued", "Bans queued or in flight in the ban dispatcher."))
+CONCURRENCY_LIMIT = REGISTRY.register(Gauge(
+    "forum_monitor_concurrency_limit", "Adaptive limit on in-flight forum requests per cookie role.", ["role"]))
+THROTTLE_SIGNALS = REGISTRY.register(Counter(
+    "forum_monitor_throttle_signals_total",
+    "Slow-down signals per cookie role (429, 503, error, slow) and throttled requests retried (retried).",
+    ["role", "signal"]))
+
+cycle_tracker = CycleTracker()
+
+
+def monitor_stats():
+    """Live JSON view of the monitor: cycle progress, per-stage timings and HTTP status counts."""
+    stats = cycle_tracker.snapshot()
+    stats["stages"] = {labels[0]: summary for labels, summary in STAGE_SECONDS.summary().items()}
+    http = {}
+    for (kind, status), count in HTTP_RESPONSES.values().items():
+        http.setdefault(kind, {})[status] = count
+    stats["http"] = http
+    stats["bytes"] = {labels[0]: value for labels, value in HTTP_BYTES.values().items()}
+    stats["rule_matches"] = {f"{rule}/{field}": count for (rule, field), count in RULE_MATCHES.values().items()}
+    stats["bans"] = {labels[0]: value for labels, value in BANS.values().items()}
+    stats["concurrency_limit"] = {labels[0]: value for labels, value in CONCURRENCY_LIMIT.values().items()}
+    throttle = {}
+    for (role, signal), count in THROTTLE_SIGNALS.values().items():
+        throttle.setdefault(role, {})[signal] = count
+    stats["throttle"] = throttle
+    return stats
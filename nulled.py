@@ -1,22 +1,82 @@
 import requests
-from bs4 import BeautifulSoup
+from requests.adapters import HTTPAdapter
 from helpers import init_all_loggers, get_main_logger, get_error_logger, get_ban_logger
-from concurrent.futures import ThreadPoolExecutor, as_completed
-from database import get_all_blacklist_data, SessionLocal
+from database import get_blacklist_snapshot, SeenThreadStore
+from matcher import BlacklistCompiler, match_field
+from rules import get_rule_loader, RuleError
+from pipeline import Pipeline, Stage
+from extract import ThreadPageReader, extract_listing_entries, DEFAULT_BACKEND
+from profiles import UserProfileCache
+from schedule import CrawlScheduler
+from leases import LocalSections, SectionLeases
+from bans import BanDispatcher
+from listing_cache import ListingCache
+from archive import ThreadArchive, DEFAULT_ARCHIVE_DIR, DEFAULT_MAX_AGE, DEFAULT_MAX_BYTES
+from throttle import AdaptiveLimiter, THROTTLE_STATUSES, overloaded
+from metrics import (STAGE_SECONDS, HTTP_RESPONSES, HTTP_BYTES, THREAD_PAGES, THREADS, RULE_MATCHES, THROTTLE_SIGNALS,
+                     cycle_tracker)
+from contextlib import contextmanager
 from dotenv import load_dotenv
-import yaml
 import os
+import socket
+import threading
 import time
 import sys
 
-# Initialize database and environment variables
-db = SessionLocal()
+# Initialize environment variables
 load_dotenv(dotenv_path=os.path.join('config', '.env'))
 base_url = os.getenv("BASE_URL")
 
 user_cookie_str = os.getenv("USER_COOKIE_STR")
 mod_cookie_str = os.getenv("MOD_COOKIE_STR")
 header = {"User-Agent": os.getenv("USER_AGENT")}
+parser_backend = os.getenv("PARSER_BACKEND", DEFAULT_BACKEND)
+ban_rate = float(os.getenv("BAN_RATE", "1"))  # moderator bans per second
+
+# Forum requests of each cookie role ("user": listing pages, "mod": thread pages and bans) go through
+# an adaptive limiter: the requests in flight back off on 429/503, errors and slow responses and grow
+# back while the forum keeps up. USER_RATE and MOD_RATE cap each role's requests per second (0: no cap).
+user_rate = float(os.getenv("USER_RATE", "0"))
+mod_rate = float(os.getenv("MOD_RATE", "0"))
+THROTTLE_RETRIES = 2  # times a 429/503 is retried, once the pause it asks for has passed
+REQUEST_TIMEOUT = 30  # seconds
+
+# Thread pages: "stream" parses them as they download and stops after the opening post, "full" reads
+# the whole page for PARSER_BACKEND. Either way at most THREAD_MAX_BYTES are read per page and
+# descriptions are cut to THREAD_TEXT_MAX_CHARS characters for matching.
+THREAD_FETCH_MODES = ("stream", "full")
+thread_fetch_mode = os.getenv("THREAD_FETCH_MODE", "stream")
+if thread_fetch_mode not in THREAD_FETCH_MODES:
+    raise ValueError(f"Unknown THREAD_FETCH_MODE '{thread_fetch_mode}', expected one of {THREAD_FETCH_MODES}.")
+thread_max_bytes = int(os.getenv("THREAD_MAX_BYTES", str(2 * 1024 * 1024)))
+thread_text_max_chars = int(os.getenv("THREAD_TEXT_MAX_CHARS", "65536"))
+FETCH_CHUNK_BYTES = 16 * 1024
+
+# Forum sections crawled by default; FORUM_SECTIONS in config/.env overrides them (comma-separated)
+DEFAULT_FORUM_SECTIONS = [
+    "/forum/70-monetizing-techniques/",
+    "/forum/9-tutorials-guides-ebooks-etc/",
+    "/forum/43-accounts/",
+    "/forum/74-combolists/",
+    "/forum/15-other-leaks/",
+    "/forum/7-cracked-programs/",
+    "/forum/90-cracking-tools/",
+    "/forum/195-service-requests/"
+]
+FORUM_SECTIONS = [section.strip() for section in os.getenv("FORUM_SECTIONS", "").split(",") if section.strip()] \
+    or DEFAULT_FORUM_SECTIONS
+
+# Identifies this process in section leases and pending bans shared with other monitor workers
+worker_id = os.getenv("WORKER_ID") or f"{socket.gethostname()}-{os.getpid()}"
+
+MONITOR_ENGINES = ("threaded", "async")
+
+# Every parsed thread record is kept in this columnar archive for backtests (backtest.py);
+# an empty THREAD_ARCHIVE_DIR turns archiving off. Segments older than THREAD_ARCHIVE_MAX_AGE seconds,
+# and the oldest ones beyond THREAD_ARCHIVE_MAX_BYTES, are deleted (0 keeps them)
+thread_archive_dir = os.getenv("THREAD_ARCHIVE_DIR", DEFAULT_ARCHIVE_DIR)
+thread_archive_max_age = float(os.getenv("THREAD_ARCHIVE_MAX_AGE", str(DEFAULT_MAX_AGE)))
+thread_archive_max_bytes = int(os.getenv("THREAD_ARCHIVE_MAX_BYTES", str(DEFAULT_MAX_BYTES)))
 
 # Initialize loggers
 init_all_loggers("INFO")
@@ -24,14 +84,16 @@ main_logger = get_main_logger()
 error_logger = get_error_logger()
 ban_logger = get_ban_logger()
 
-# Load YAML rules
-def load_rules_from_yaml(filepath="config/rules.yaml"):
-    try:
-        with open(filepath, 'r', encoding='utf-8') as file:
-            return yaml.safe_load(file)
-    except Exception as e:
-        error_logger.error(f"Error reading YAML rules from {filepath}: {e}")
-        return {}
+# Threads already judged under the current blacklist and rules
+seen_threads = SeenThreadStore()
+
+# Last known stats and ban state of thread authors
+user_profiles = UserProfileCache()
+listing_cache = ListingCache()
+# Matchers of the newest blacklist snapshot, rebuilt in the background after blacklist changes
+blacklist_compiler = BlacklistCompiler()
+thread_archive = ThreadArchive(thread_archive_dir, owner=worker_id, max_age=thread_archive_max_age,
+                               max_bytes=thread_archive_max_bytes) if thread_archive_dir else None
 
 # Parse cookies from a string
 def parse_cookies(cookie_str):
@@ -44,188 +106,374 @@ def get_cookies():
 def get_mod_cookies():
     return parse_cookies(mod_cookie_str)
 
+# Pooled keep-alive sessions, one per cookie role ("user" or "mod")
+_sessions = {}
+_sessions_lock = threading.Lock()
+
+def get_session(role="user"):
+    session = _sessions.get(role)
+    if session is None:
+        with _sessions_lock:
+            session = _sessions.get(role)
+            if session is None:
+                session = requests.Session()
+                adapter = HTTPAdapter(pool_connections=4, pool_maxsize=32)
+                session.mount("http://", adapter)
+                session.mount("https://", adapter)
+                session.headers.update(header)
+                session.cookies.update(get_mod_cookies() if role == "mod" else get_cookies())
+                _sessions[role] = session
+    return session
+
+limiters = {
+    "user": AdaptiveLimiter("user", rate=user_rate),
+    "mod": AdaptiveLimiter("mod", rate=mod_rate),
+}
+
+# GET a forum page with a role's session once its limiter lets the request out, retrying throttled
+# responses; the limiter slot is held until the with-block is done with the response
+@contextmanager
+def forum_request(role, url, kind, **kwargs):
+    limiter = limiters[role]
+    attempt = 0
+    while True:
+        limiter.acquire()
+        try:
+            response = get_session(role).get(url, timeout=REQUEST_TIMEOUT, **kwargs)
+        except requests.RequestException:
+            limiter.release(failed=True)
+            raise
+        status, retry_after = response.status_code, response.headers.get("Retry-After")
+        if status in THROTTLE_STATUSES and attempt < THROTTLE_RETRIES and limiter.retryable(retry_after):
+            limiter.release(status, response.elapsed.total_seconds(), retry_after, failed=True)
+            response.close()
+            record_response(kind, status)
+            THROTTLE_SIGNALS.inc(role, "retried")
+            attempt += 1
+            continue
+        try:
+            with response:
+                yield response
+        finally:
+            limiter.release(status, response.elapsed.total_seconds(), retry_after, failed=overloaded(status))
+        return
+
+# GET a whole forum page through forum_request
+def forum_get(role, url, kind, **kwargs):
+    with forum_request(role, url, kind, **kwargs) as response:
+        return response
+
 # Build forum page URL
 def build_url(base_url, page, sorted_page=False):
     return f"{base_url}page-{page}?sort_key=start_date" if sorted_page else f"{base_url}page-{page}"
 
 # Fetch thread links from a forum page
 def get_threads_section_info(url):
-    main_logger.debug(f"Fetching threads from URL: {url}")
-    try:
-        response = requests.get(url, cookies=get_cookies(), headers=header)
-        response.raise_for_status()
-    except requests.RequestException as e:
-        error_logger.error(f"Error fetching threads from URL {url}: {e}")
-        return []
-
-    soup = BeautifulSoup(response.text, "html.parser")
-    threads = soup.find_all("td", class_="col_f_content")
-    thread_links = []
+    return [entry.url for entry in get_threads_section_entries(url) or ()]
 
-    for thread in threads:
-        if thread.find('s'):
-            main_logger.debug("Strikethrough user found, skipping this thread.")
-            continue
-
-        username_element = thread.find("a", {"hovercard-ref": "member"})
-        if not username_element:
-            main_logger.debug("Username element missing in thread; skipping.")
-            continue
+# Count a forum response by request kind and status code, with its body size
+def record_response(kind, status, size=0):
+    HTTP_RESPONSES.inc(kind, str(status))
+    if size:
+        HTTP_BYTES.inc(kind, amount=size)
 
-        thread_link_element = thread.find("a", class_="topic_title highlight_unread")
-        if thread_link_element:
-            thread_links.append(thread_link_element["href"])
-            main_logger.debug(f"Thread link found: {thread_link_element['href']}")
+# Fetch thread links and their authors' IDs from a forum page, reusing them if the page is unchanged; None if the fetch failed
+def get_threads_section_entries(url):
+    main_logger.debug("Fetching threads from URL: %s", url)
+    try:
+        with STAGE_SECONDS.time("listing_fetch"):
+            response = forum_get("user", url, "listing", headers=listing_cache.request_headers(url))
+        record_response("listing", response.status_code, len(response.content))
+        if response.status_code != 304:
+            response.raise_for_status()
+    except requests.RequestException as e:
+        if e.response is None:
+            record_response("listing", "error")
+        error_logger.error("Error fetching threads from URL %s: %s", url, e)
+        return None
 
-    return thread_links
+    return listing_cache.entries_for(url, response.status_code, response.headers, response.text, parse_threads_section)
+
+# Extract thread links and author IDs from a forum page's HTML
+def parse_threads_section(html):
+    with STAGE_SECONDS.time("listing_parse"):
+        entries = extract_listing_entries(html, parser_backend)
+    main_logger.debug("Thread entries found: %s", entries)
+    return entries
+
+# Drop listed threads that need no fetch: known authors the rules cannot hit, and seen threads
+def select_threads_to_fetch(entries, rule_set, blacklist):
+    links = []
+    for entry in entries:
+        reason = user_profiles.skip_reason(entry.userid, rule_set)
+        if reason:
+            main_logger.debug("Skipping %s: %s.", entry.url, reason)
+        else:
+            links.append(entry.url)
+    return seen_threads.filter_unseen(links, blacklist.fingerprint, rule_set.fingerprint)
 
 # Fetch thread details
 def get_internal_thread_info(url):
-    main_logger.debug(f"Fetching internal thread info from URL: {url}")
+    page = fetch_thread_page(url)
+    return parse_internal_thread_info(page, url) if page is not None else None
+
+# New reader for a thread page body, set up by the fetch mode and size limits
+def new_thread_page_reader(encoding):
+    return ThreadPageReader(encoding, max_bytes=thread_max_bytes, stream=thread_fetch_mode == "stream",
+                            text_limit=thread_text_max_chars)
+
+# Download a thread page with the moderator session, reading only as much of it as needed
+def fetch_thread_page(url):
+    main_logger.debug("Fetching internal thread info from URL: %s", url)
     try:
-        response = requests.get(url, cookies=get_mod_cookies(), headers=header)
+        with STAGE_SECONDS.time("thread_fetch"):
+            with forum_request("mod", url, "thread", stream=True) as response:
+                page = new_thread_page_reader(response.encoding)
+                if response.ok:
+                    for chunk in response.iter_content(FETCH_CHUNK_BYTES):
+                        if page.add(chunk):
+                            break
+        record_response("thread", response.status_code, page.size)
         response.raise_for_status()
     except requests.RequestException as e:
-        error_logger.error(f"Error fetching internal thread info from URL {url}: {e}")
+        if e.response is None:
+            record_response("thread", "error")
+        error_logger.error("Error fetching internal thread info from URL %s: %s", url, e)
         return None
+    THREAD_PAGES.inc(page.outcome)
+    return page
 
-    soup = BeautifulSoup(response.text, "html.parser")
+# Extract thread details from a downloaded thread page and archive them
+def parse_internal_thread_info(page, url):
     try:
-        op_userid = soup.find('a', {'hovercard-id': True})['hovercard-id']
-        op_user_posts = soup.find_all('div', class_='pu-content')[0].get_text(strip=True).replace("Posts:", "").strip()
-        op_user_threads = soup.find_all('div', class_='pu-content')[1].get_text(strip=True).replace("Threads:", "").strip()
-        op_thread_title = soup.title.string
-        op_thread_descriptions = soup.find('meta', {'name': 'description'}).get('content', '')
-        op_thread_descriptions_full = soup.find('section', id='nulledPost').text.strip() if soup.find('section', id='nulledPost') else None
-        op_thread_links = ', '.join(div.find('a', href=True)['href'] for div in soup.find_all('div', class_='hiddencontent') if div.find('a', href=True)) if soup.find_all('div', class_='hiddencontent') else ""
-        op_thread_keywords = soup.find('meta', {'name': 'keywords'}).get('content', '')
-        op_user_signature = soup.find("div", class_="signature").get_text(strip=True) if soup.find("div", class_="signature") else ""
-        op_user_reputation = soup.find('span', class_='x-smalltext', string='Rep').find_previous('strong').get_text(strip=True) if soup.find('span', class_='x-smalltext', string='Rep') else None
-        op_user_likes = soup.find('span', class_='x-smalltext', string='Likes').find_previous('strong').get_text(strip=True) if soup.find('span', class_='x-smalltext', string='Likes') else 0
-        op_user_group = soup.find('li', class_='group_icon').find('img')['src'].split('/')[-1].replace('.png', '') if soup.find('li', class_='group_icon') and soup.find('li', class_='group_icon').find('img') else None
-        ret = {
-            "op_thread_url": url,
-            "op_userid": op_userid,
-            "op_user_posts": int(op_user_posts),
-            "op_user_threads": int(op_user_threads),
-            "op_thread_title": op_thread_title,
-            "op_thread_descriptions": op_thread_descriptions,
-            "op_thread_descriptions_full": op_thread_descriptions_full,
-            "op_thread_links": op_thread_links,
-            "op_thread_keywords": op_thread_keywords,
-            "op_user_signature": op_user_signature,
-            "op_user_reputation": int(op_user_reputation),
-            "op_user_likes": int(op_user_likes),
-            "op_user_group": op_user_group
-        }
-        main_logger.debug(f"Parsed information: {ret}")
+        with STAGE_SECONDS.time("thread_parse"):
+            ret = page.record(url, parser_backend)
+        main_logger.debug("Parsed information: %s", ret)
+        if thread_archive is not None:
+            thread_archive.append(ret)
         return ret
     except Exception as e:
-        error_logger.error(f"Error parsing thread info from URL {url}: {e}")
+        error_logger.error("Error parsing thread info from URL %s: %s", url, e)
         return None
 
-# Evaluate rule conditions
-def evaluate_conditions(thread_info, conditions):
-    for field, condition in conditions.items():
-        operator, value = condition.split()
-        if not eval(f"{thread_info[field]} {operator} {value}"):
-            return False
-    return True
-
-# Match blacklist fields
-def field_match(field, keyword, thread_info):
-    if field == "descriptions":
-        return keyword.lower() in thread_info.get("op_thread_descriptions_full", "").lower()
-    elif field == "links":
-        return keyword.lower() in thread_info.get("op_thread_links", "").lower()
-    elif field == "titles":
-        return keyword.lower() in thread_info.get("op_thread_title", "").lower()
-    return False
-
 # Ban a user by user ID
 def ban_user_by_uid(user_uid, reason):
     ban_url = f'{base_url}/misc.php?action=banMemberAndDeleteAllPosts&id={user_uid}'
-    main_logger.debug(f"Attempting to ban user with ID: {user_uid}")
+    main_logger.debug("Attempting to ban user with ID: %s", user_uid)
     try:
-        response = requests.get(ban_url, cookies=get_mod_cookies(), headers=header)
+        with STAGE_SECONDS.time("ban"):
+            response = forum_get("mod", ban_url, "ban")
+        record_response("ban", response.status_code, len(response.content))
         if response.ok:
-            ban_logger.info(f"User banned successfully: {user_uid}, reason: {reason}")
+            ban_logger.info("User banned successfully: %s, reason: %s", user_uid, reason)
             return True
         else:
-            error_logger.error(f"Failed to ban user {user_uid}: {response.status_code}")
+            error_logger.error("Failed to ban user %s: %s", user_uid, response.status_code)
             return False
     except Exception as e:
-        error_logger.error(f"Exception occurred during banning user {user_uid}: {e}")
+        record_response("ban", "error")
+        error_logger.error("Exception occurred during banning user %s: %s", user_uid, e)
         return False
 
-# Monitor a single forum page
-def monitor_forum_page(page_url, page, rules_config_path="config/rules.yaml"):
-    rules = load_rules_from_yaml(rules_config_path).get("rules", [])
-    url = build_url(page_url, page, sorted_page=True)
-    links = get_threads_section_info(url)
-
-    blacklist_data = get_all_blacklist_data(db)
-
+# Record the threads settled by a completed ban
+def settle_banned_threads(userid, links, blacklist_fingerprint, rules_fingerprint):
+    user_profiles.mark_banned(userid)
     for link in links:
-        main_logger.info(f"Processing thread link: {link}")
-        thread_info = get_internal_thread_info(link)
-
+        seen_threads.record(link, "banned", blacklist_fingerprint, rules_fingerprint)
+
+ban_dispatcher = BanDispatcher(ban_user_by_uid, on_banned=settle_banned_threads, owner=worker_id, rate=ban_rate)
+
+# Queue a ban for a thread's author; the dispatcher sends it, so crawl workers never wait on it
+def submit_ban(thread_info, link, violation, rule_set, blacklist):
+    rule, field, keyword = violation
+    reason = f"Keyword '{keyword}' found in {field} - {link}."
+    return ban_dispatcher.submit(thread_info["op_userid"], reason, link, blacklist.fingerprint, rule_set.fingerprint,
+                                 rule.name, field, keyword)
+
+# Find the first rule and blacklist keyword a thread violates
+def find_violation(thread_info, rule_set, matchers):
+    with STAGE_SECONDS.time("match"):
+        violation = _find_violation(thread_info, rule_set, matchers)
+    if violation:
+        rule, field, _ = violation
+        RULE_MATCHES.inc(rule.name, field)
+        THREADS.inc("violation")
+    else:
+        THREADS.inc("clean")
+    return violation
+
+def _find_violation(thread_info, rule_set, matchers):
+    for rule in rule_set.for_group(thread_info['op_user_group']):
+        if rule.matches(thread_info):
+            for field in rule.blacklist_fields:
+                matcher = matchers.get(field)
+                keyword = match_field(field, matcher, thread_info) if matcher else None
+                if keyword is not None:
+                    return rule, field, keyword
+    return None
+
+# Rules, blacklist and matchers shared by every thread of a cycle step
+def load_match_context(rules_config_path="config/rules.yaml"):
+    rule_set = get_rule_loader(rules_config_path).get()
+    blacklist, matchers = blacklist_compiler.get(get_blacklist_snapshot())
+    return rule_set, blacklist, matchers
+
+# Run one crawl cycle as a pipeline: listing fetch -> thread fetch -> parse -> rule match -> ban
+def run_threaded_cycle(max_threads=5, page_range=3, rules_config_path="config/rules.yaml",
+                       parse_workers=2, queue_size=None, sections=None, scheduler=None):
+    sections = FORUM_SECTIONS if sections is None else sections
+    queue_size = queue_size or max_threads * 4
+    stats = {"listings": 0, "threads": 0, "bans": 0}
+    stats_lock = threading.Lock()
+
+    def count(key):
+        with stats_lock:
+            stats[key] += 1
+
+    # Pages of a section are walked in order so paging can stop at the section's crawl cursor
+    def listing_stage(section, emit):
+        poll = scheduler.begin_poll(section) if scheduler else None
+        for page in range(1, page_range + 1):
+            entries = get_threads_section_entries(build_url(base_url + section, page, sorted_page=True))
+            count("listings")
+            if entries is None:
+                if poll:
+                    poll.fail()
+                break
+            context = load_match_context(rules_config_path)
+            rule_set, blacklist, _ = context
+            for link in select_threads_to_fetch(entries, rule_set, blacklist):
+                emit((link, context))
+            if poll and not poll.add_page(entries):
+                break
+        if poll:
+            scheduler.record_poll(section, poll.finish(), failed=poll.failed)
+
+    def thread_fetch_stage(item, emit):
+        link, context = item
+        main_logger.info("Processing thread link: %s", link)
+        page = fetch_thread_page(link)
+        if page is not None:
+            emit((link, page, context))
+
+    def parse_stage(item, emit):
+        link, page, context = item
+        thread_info = parse_internal_thread_info(page, link)
         if not thread_info:
-            error_logger.warning(f"Thread info not available for link: {link}")
-            continue
+            error_logger.warning("Thread info not available for link: %s", link)
+            return
+        emit((link, thread_info, context))
+
+    def match_stage(item, emit):
+        link, thread_info, context = item
+        rule_set, blacklist, matchers = context
+        count("threads")
+        user_profiles.update_from_thread(thread_info)
+        violation = find_violation(thread_info, rule_set, matchers)
+        if violation:
+            if submit_ban(thread_info, link, violation, rule_set, blacklist):
+                count("bans")
+        else:
+            seen_threads.record(link, "clean", blacklist.fingerprint, rule_set.fingerprint)
 
-        for rule in rules:
-            if thread_info['op_user_group'] == rule["op_user_group"]:
-                if evaluate_conditions(thread_info, rule["conditions"]):
-                    banned = False  # Flag to ensure user is banned only once per rule
-                    for field in rule["blacklist_fields"]:
-                        if banned:
-                            break
-                        keywords = blacklist_data.get(field, [])
-                        for keyword in keywords:
-                            if field_match(field, keyword, thread_info):
-                                reason = f"Keyword '{keyword}' found in {field} - {link}."
-                                ban_user_by_uid(thread_info["op_userid"], reason)
-                                banned = True
-                                break
-                    if banned:
-                        break
-
-
-# Monitor forum pages in cycles
-def monitor_forum(max_threads=5, page_range=3, cycle_delay=120, stop_signal=None, rules_config_path="config/rules.yaml"):
-    rules = load_rules_from_yaml(rules_config_path)
-    if not rules:
+    Pipeline([
+        Stage("listing", listing_stage, workers=min(max_threads, len(sections)), queue_size=len(sections)),
+        Stage("thread-fetch", thread_fetch_stage, workers=max_threads, queue_size=queue_size),
+        Stage("parse", parse_stage, workers=parse_workers, queue_size=queue_size),
+        Stage("match", match_stage, workers=1, queue_size=queue_size),
+    ]).run(sections)
+    return stats
+
+
+# Sleep until the next poll is due, waking up early if the monitor is stopped
+def wait_for_next_poll(seconds, stop_signal=None):
+    deadline = time.monotonic() + seconds
+    while stop_signal is None or stop_signal():
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            return
+        time.sleep(min(remaining, 1.0))
+
+# Monitor forum sections, polling each one on its own adaptive schedule
+def monitor_forum(max_threads=5, page_range=3, cycle_delay=120, stop_signal=None, rules_config_path="config/rules.yaml",
+                  engine="threaded", concurrency=50, min_interval=30, max_interval=600, sharded=False, lease_ttl=60):
+    try:
+        get_rule_loader(rules_config_path).get()
+    except RuleError as e:
+        error_logger.error(str(e))
         sys.exit("Terminating program due to missing or invalid rules.yaml file.")
 
-    pages_url = [
-        "/forum/70-monetizing-techniques/",
-        "/forum/9-tutorials-guides-ebooks-etc/",
-        "/forum/43-accounts/",
-        "/forum/74-combolists/",
-        "/forum/15-other-leaks/",
-        "/forum/7-cracked-programs/",
-        "/forum/90-cracking-tools/",
-        "/forum/195-service-requests/"
-    ]
+    scheduler = CrawlScheduler(
+        FORUM_SECTIONS,
+        base_interval=cycle_delay,
+        min_interval=min(min_interval, cycle_delay),
+        max_interval=max(max_interval, cycle_delay),
+    )
 
+    if engine not in MONITOR_ENGINES:
+        raise ValueError(f"Unknown monitor engine '{engine}', expected one of {MONITOR_ENGINES}.")
+
+    # The run's max_threads or concurrency is the most requests of each role ever in flight
+    for limiter in limiters.values():
+        limiter.reset(concurrency if engine == "async" else max_threads)
+
+    # Sharded workers only poll the sections they hold a lease on
+    assignment = SectionLeases(worker_id, FORUM_SECTIONS, ttl=lease_ttl) if sharded else LocalSections(FORUM_SECTIONS)
+    ban_dispatcher.start()
+    assignment.start()
+    try:
+        if engine == "async":
+            from async_engine import monitor_forum_async
+            return monitor_forum_async(
+                concurrency=concurrency,
+                page_range=page_range,
+                scheduler=scheduler,
+                stop_signal=stop_signal,
+                rules_config_path=rules_config_path,
+                assignment=assignment
+            )
+        monitor_forum_threaded(max_threads, page_range, scheduler, stop_signal, rules_config_path, assignment)
+    finally:
+        ban_dispatcher.stop()
+        assignment.release()
+        if thread_archive is not None:
+            thread_archive.flush()
+
+# Poll due sections with the threaded pipeline until stopped
+def monitor_forum_threaded(max_threads, page_range, scheduler, stop_signal=None, rules_config_path="config/rules.yaml",
+                           assignment=None):
+    assignment = assignment or LocalSections(FORUM_SECTIONS)
     main_logger.info("Checker started.")
     while stop_signal is None or stop_signal():
-        with ThreadPoolExecutor(max_workers=max_threads) as executor:
-            futures = []
-            for page_url in pages_url:
-                for page in range(1, page_range + 1):
-                    url = base_url + page_url
-                    futures.append(executor.submit(monitor_forum_page, url, page, rules_config_path))
-
-            for future in as_completed(futures):
-                try:
-                    future.result()
-                except Exception as e:
-                    error_logger.error(f"Error in thread execution: {e}")
-
-        main_logger.info("Checker cycle completed. Delaying before next cycle.")
-        time.sleep(cycle_delay)
+        owned = assignment.current()
+        sections = scheduler.due_sections(sections=owned)
+        if sections:
+            started = time.monotonic()
+            cycle_tracker.begin("threaded", sections)
+            stats = run_threaded_cycle(max_threads, page_range, rules_config_path, sections=sections, scheduler=scheduler)
+            profile_stats = user_profiles.take_stats()
+            ban_stats = ban_dispatcher.take_stats()
+            listing_stats = listing_cache.take_stats()
+            cycle_tracker.end(**stats, listings_reused=listing_stats["not_modified"] + listing_stats["unchanged"],
+                              profile_hit_rate=round(profile_stats["hit_rate"], 3), bans_sent=ban_stats["banned"],
+                              bans_queued=ban_stats["queued"])
+            main_logger.info(f"Polled {len(sections)} sections: {stats['listings']} listing pages "
+                             f"({listing_stats['not_modified']} not modified, {listing_stats['unchanged']} unchanged), "
+                             f"{stats['threads']} threads and "
+                             f"{stats['bans']} bans queued in {time.monotonic() - started:.1f}s; profile cache hit rate "
+                             f"{profile_stats['hit_rate']:.0%} ({profile_stats['hits']}/{profile_stats['hits'] + profile_stats['misses']}); "
+                             f"bans sent {ban_stats['banned']}, retried {ban_stats['retried']}, "
+                             f"deduplicated {ban_stats['deduplicated']}, still queued {ban_stats['queued']}.")
+
+            try:
+                seen_threads.prune()
+            except Exception as e:
+                error_logger.error(f"Error pruning seen threads: {e}")
+
+        wait = min(scheduler.seconds_until_due(sections=owned), assignment.seconds_until_refresh())
+        main_logger.debug(f"Next section due in {wait:.0f}s.")
+        wait_for_next_poll(wait, stop_signal)
+
 
 if __name__ == "__main__":
     max_threads = 5
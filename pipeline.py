@@ -0,0 +1,75 @@
+import queue
+import threading
+
+from helpers import get_error_logger
+
+error_logger = get_error_logger()
+
+_DONE = object()
+
+
+class Stage:
+    """A named pipeline step run by its own worker threads.
+
+    ``handler(item, emit)`` processes one item and calls ``emit(next_item)`` for every item it
+    passes downstream (zero or more).
+    """
+
+    def __init__(self, name, handler, workers=1, queue_size=100):
+        self.name = name
+        self.handler = handler
+        self.workers = max(1, workers)
+        self.queue = queue.Queue(maxsize=queue_size)
+
+
+class Pipeline:
+    """Stages connected by bounded queues; a full queue blocks the stage feeding it."""
+
+    def __init__(self, stages):
+        self.stages = list(stages)
+
+    def run(self, items):
+        """Feed items into the first stage and block until every stage has drained."""
+        threads = []
+        for position, stage in enumerate(self.stages):
+            downstream = self.stages[position + 1] if position + 1 < len(self.stages) else None
+            remaining = [stage.workers]
+            lock = threading.Lock()
+            for number in range(stage.workers):
+                thread = threading.Thread(
+                    target=self._work,
+                    args=(stage, downstream, remaining, lock),
+                    name=f"{stage.name}-{number + 1}",
+                    daemon=True,
+                )
+                thread.start()
+                threads.append(thread)
+
+        first = self.stages[0]
+        for item in items:
+            first.queue.put(item)
+        for _ in range(first.workers):
+            first.queue.put(_DONE)
+
+        for thread in threads:
+            thread.join()
+
+    @staticmethod
+    def _work(stage, downstream, remaining, lock):
+        emit = downstream.queue.put if downstream else (lambda item: None)
+        while True:
+            item = stage.queue.get()
+            if item is _DONE:
+                break
+            try:
+                stage.handler(item, emit)
+            except Exception as e:
+                error_logger.error(f"Error in {stage.name} stage: {e}")
+
+        # The last worker of a stage to finish closes the next stage
+        with lock:
+            remaining[0] -= 1
+            last = remaining[0] == 0
+        if last and downstream:
+            for _ in range(downstream.workers):
+                downstream.queue.put(_DONE)
@@ -0,0 +1,128 @@
+import threading
+import time
+from collections import OrderedDict
+
+
+class UserProfile:
+    """Last known stats of a thread author, readable with the same keys as a thread info dict."""
+    __slots__ = ("userid", "posts", "threads", "reputation", "likes", "group", "banned", "updated_at")
+
+    FIELDS = {
+        "op_userid": "userid",
+        "op_user_posts": "posts",
+        "op_user_threads": "threads",
+        "op_user_reputation": "reputation",
+        "op_user_likes": "likes",
+        "op_user_group": "group",
+    }
+
+    def __init__(self, userid, posts=None, threads=None, reputation=None, likes=None, group=None, banned=False):
+        self.userid = userid
+        self.posts = posts
+        self.threads = threads
+        self.reputation = reputation
+        self.likes = likes
+        self.group = group
+        self.banned = banned
+        self.updated_at = time.monotonic()
+
+    def __getitem__(self, key):
+        return getattr(self, self.FIELDS[key])
+
+    def has_stats(self):
+        return self.posts is not None
+
+
+class UserProfileCache:
+    """TTL'd, size-bounded LRU cache of author profiles keyed by op_userid."""
+
+    def __init__(self, ttl=1800, max_entries=50_000):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._profiles = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self):
+        return len(self._profiles)
+
+    def clear(self):
+        with self._lock:
+            self._profiles.clear()
+            self.hits = self.misses = 0
+
+    def get(self, userid):
+        """Return the cached profile, or None if it is unknown or expired."""
+        with self._lock:
+            profile = self._profiles.get(userid)
+            if profile is not None and time.monotonic() - profile.updated_at > self.ttl:
+                del self._profiles[userid]
+                profile = None
+            if profile is None:
+                self.misses += 1
+                return None
+            self._profiles.move_to_end(userid)
+            self.hits += 1
+            return profile
+
+    def _store(self, profile):
+        with self._lock:
+            self._profiles[profile.userid] = profile
+            self._profiles.move_to_end(profile.userid)
+            while len(self._profiles) > self.max_entries:
+                self._profiles.popitem(last=False)
+
+    def update_from_thread(self, thread_info):
+        """Refresh a profile from a freshly parsed thread page, keeping a known ban."""
+        userid = thread_info["op_userid"]
+        previous = self._profiles.get(userid)
+        self._store(UserProfile(
+            userid,
+            posts=thread_info["op_user_posts"],
+            threads=thread_info["op_user_threads"],
+            reputation=thread_info["op_user_reputation"],
+            likes=thread_info["op_user_likes"],
+            group=thread_info["op_user_group"],
+            banned=bool(previous and previous.banned),
+        ))
+
+    def mark_banned(self, userid):
+        with self._lock:
+            profile = self._profiles.get(userid)
+        if profile is None:
+            profile = UserProfile(userid)
+        profile.banned = True
+        profile.updated_at = time.monotonic()
+        self._store(profile)
+
+    def skip_reason(self, userid, rule_set):
+        """Why a thread by this author needs no thread-page fetch, or None if it must be fetched."""
+        if userid is None:
+            return None
+        profile = self.get(userid)
+        if profile is None:
+            return None
+        if profile.banned:
+            return "author already banned"
+        if not profile.has_stats():
+            return None
+        rules = rule_set.for_group(profile.group)
+        if not rules:
+            return f"no rule for group '{profile.group}'"
+        if not any(rule.matches(profile) for rule in rules):
+            return "author stats exclude every rule"
+        return None
+
+    def take_stats(self):
+        """Return and reset the hit/miss counters accumulated since the last call."""
+        with self._lock:
+            hits, misses = self.hits, self.misses
+            self.hits = self.misses = 0
+        lookups = hits + misses
+        return {
+            "hits": hits,
+            "misses": misses,
+            "hit_rate": hits / lookups if lookups else 0.0,
+            "size": len(self._profiles),
+        }
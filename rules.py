@@ -0,0 +1,199 @@
+import hashlib
+import operator
+import os
+import threading
+import yaml
+
+from helpers import get_error_logger
+from matcher import FIELD_SOURCES
+
+error_logger = get_error_logger()
+
+
+class RuleError(ValueError):
+    """Raised when rules.yaml contains a malformed rule or condition."""
+
+
+OPERATORS = {
+    "<": operator.lt,
+    "<=": operator.le,
+    ">": operator.gt,
+    ">=": operator.ge,
+    "==": operator.eq,
+    "!=": operator.ne,
+}
+
+# Thread fields that conditions may compare against
+CONDITION_FIELDS = {
+    "op_userid",
+    "op_user_posts",
+    "op_user_threads",
+    "op_user_reputation",
+    "op_user_likes",
+}
+
+
+class Condition:
+    """A single typed comparison such as ``op_user_posts < 20``."""
+    __slots__ = ("field", "op_symbol", "compare", "value")
+
+    def __init__(self, field, op_symbol, value):
+        self.field = field
+        self.op_symbol = op_symbol
+        self.compare = OPERATORS[op_symbol]
+        self.value = value
+
+    @classmethod
+    def parse(cls, field, expression):
+        """Compile a ``"<operator> <number>"`` expression, rejecting anything else."""
+        if field not in CONDITION_FIELDS:
+            raise RuleError(f"Unknown condition field '{field}'.")
+        parts = str(expression).split()
+        if len(parts) != 2 or parts[0] not in OPERATORS:
+            raise RuleError(f"Invalid condition for '{field}': '{expression}'.")
+        try:
+            value = int(parts[1])
+        except ValueError:
+            try:
+                value = float(parts[1])
+            except ValueError:
+                raise RuleError(f"Non-numeric value in condition for '{field}': '{expression}'.") from None
+        return cls(field, parts[0], value)
+
+    def __call__(self, thread_info):
+        value = thread_info[self.field]
+        if value is None:
+            return False
+        if isinstance(value, str):  # op_userid is scraped as text
+            try:
+                value = int(value)
+            except ValueError:
+                return False
+        return self.compare(value, self.value)
+
+    def __repr__(self):
+        return f"Condition({self.field} {self.op_symbol} {self.value})"
+
+
+class Rule:
+    """A compiled ban rule: user group, numeric conditions and blacklist fields to search."""
+    __slots__ = ("name", "op_user_group", "conditions", "blacklist_fields")
+
+    def __init__(self, name, op_user_group, conditions, blacklist_fields):
+        self.name = name
+        self.op_user_group = op_user_group
+        self.conditions = tuple(conditions)
+        self.blacklist_fields = tuple(blacklist_fields)
+
+    @classmethod
+    def parse(cls, raw, position):
+        if not isinstance(raw, dict):
+            raise RuleError(f"Rule #{position} must be a mapping.")
+        name = raw.get("name") or f"rule-{position}"
+        group = raw.get("op_user_group")
+        if not isinstance(group, str) or not group:
+            raise RuleError(f"Rule '{name}' is missing op_user_group.")
+        conditions = raw.get("conditions") or {}
+        if not isinstance(conditions, dict):
+            raise RuleError(f"Rule '{name}' conditions must be a mapping.")
+        fields = raw.get("blacklist_fields") or []
+        if not isinstance(fields, list) or not fields:
+            raise RuleError(f"Rule '{name}' needs a non-empty blacklist_fields list.")
+        for field in fields:
+            if field not in FIELD_SOURCES:
+                raise RuleError(f"Rule '{name}' has unknown blacklist field '{field}'.")
+        try:
+            compiled = [Condition.parse(field, expression) for field, expression in conditions.items()]
+        except RuleError as e:
+            raise RuleError(f"Rule '{name}': {e}") from None
+        return cls(name, group, compiled, fields)
+
+    def matches(self, thread_info):
+        """Check every condition against the thread's numeric fields."""
+        for condition in self.conditions:
+            if not condition(thread_info):
+                return False
+        return True
+
+
+class RuleSet:
+    """All compiled rules, indexed by op_user_group."""
+
+    def __init__(self, rules, fingerprint=""):
+        self.rules = tuple(rules)
+        self.fingerprint = fingerprint
+        self.by_group = {}
+        for rule in self.rules:
+            self.by_group.setdefault(rule.op_user_group, []).append(rule)
+
+    def __len__(self):
+        return len(self.rules)
+
+    def for_group(self, group):
+        """Rules that apply to a user group, in file order."""
+        return self.by_group.get(group, ())
+
+
+def compile_rules(document, fingerprint=""):
+    """Compile a parsed rules.yaml document into a RuleSet."""
+    if not isinstance(document, dict) or not isinstance(document.get("rules"), list):
+        raise RuleError("rules.yaml must contain a top-level 'rules' list.")
+    return RuleSet([Rule.parse(raw, position) for position, raw in enumerate(document["rules"], 1)], fingerprint)
+
+
+class RuleLoader:
+    """Keep a compiled RuleSet for a file and recompile it only when the file changes."""
+
+    def __init__(self, filepath):
+        self.filepath = filepath
+        self.rule_set = None
+        self._stat_key = None
+        self._lock = threading.Lock()
+
+    def get(self):
+        """Return the current RuleSet; raises RuleError if the file has never loaded cleanly."""
+        try:
+            stat = os.stat(self.filepath)
+        except OSError as e:
+            if self.rule_set is None:
+                raise RuleError(f"Cannot read rules from {self.filepath}: {e}") from None
+            return self.rule_set
+
+        stat_key = (stat.st_mtime_ns, stat.st_size)
+        if stat_key == self._stat_key:
+            return self.rule_set
+
+        with self._lock:
+            if stat_key != self._stat_key:
+                self._reload(stat_key)
+        return self.rule_set
+
+    def _reload(self, stat_key):
+        try:
+            with open(self.filepath, "rb") as file:
+                content = file.read()
+            fingerprint = hashlib.sha1(content).hexdigest()
+            if self.rule_set is None or fingerprint != self.rule_set.fingerprint:
+                try:
+                    document = yaml.safe_load(content)
+                except yaml.YAMLError as e:
+                    raise RuleError(f"Invalid YAML in {self.filepath}: {e}") from None
+                self.rule_set = compile_rules(document, fingerprint)
+        except (OSError, RuleError) as e:
+            if self.rule_set is None:
+                raise RuleError(f"Cannot load rules from {self.filepath}: {e}") from None
+            error_logger.error(f"Keeping previous rules, reload of {self.filepath} failed: {e}")
+        self._stat_key = stat_key
+
+
+_loaders = {}
+_loaders_lock = threading.Lock()
+
+
+def get_rule_loader(filepath="config/rules.yaml"):
+    """Return the process-wide RuleLoader for a rules file."""
+    with _loaders_lock:
+        loader = _loaders.get(filepath)
+        if loader is None:
+            loader = _loaders[filepath] = RuleLoader(filepath)
+        return loader
@@ -0,0 +1,137 @@
+import math
+import threading
+import time
+
+from database import topic_id
+
+
+class SectionState:
+    """Crawl cursor and polling statistics of one forum section."""
+    __slots__ = ("section", "cursor", "interval", "next_due", "last_polled", "rate", "polls", "last_new")
+
+    def __init__(self, section, interval):
+        self.section = section
+        self.cursor = None      # newest topic ID seen in this section
+        self.interval = interval
+        self.next_due = 0.0
+        self.last_polled = None
+        self.rate = None        # smoothed new threads per second
+        self.polls = 0
+        self.last_new = 0
+
+
+class SectionPoll:
+    """One walk through a section's listing pages, compared against the cursor it started with."""
+
+    def __init__(self, state):
+        self.state = state
+        self.cursor = state.cursor
+        self.newest = state.cursor
+        self.new_threads = 0
+        self.failed = False
+
+    def add_page(self, entries):
+        """Account for a listing page; returns False once paging deeper would only find seen threads."""
+        for entry in entries:
+            tid = topic_id(entry.url)
+            if self.cursor is None or tid is None or tid > self.cursor:
+                self.new_threads += 1
+            if tid is not None and (self.newest is None or tid > self.newest):
+                self.newest = tid
+        if not entries:
+            return False
+        if self.cursor is None:
+            return True
+        # The last row is the oldest regular thread; pinned threads on top of page 1 are old too
+        oldest = topic_id(entries[-1].url)
+        return oldest is None or oldest > self.cursor
+
+    def fail(self):
+        """Mark the poll incomplete: a listing page could not be fetched."""
+        self.failed = True
+
+    def finish(self):
+        # A failed poll keeps the old cursor, so the next one pages down to the threads it missed
+        if not self.failed:
+            self.state.cursor = self.newest
+        return self.new_threads
+
+
+class CrawlScheduler:
+    """Poll busy sections more often than quiet ones, based on their observed new-thread rate.
+
+    Each section's interval aims at roughly ``target_new`` new threads per poll, bounded by
+    ``min_interval`` and ``max_interval``; a poll with nothing new backs the interval off. A poll
+    that failed says nothing about the section, so it is retried after ``min_interval`` instead.
+    """
+
+    def __init__(self, sections, base_interval=120, min_interval=30, max_interval=600,
+                 target_new=3, smoothing=0.3, backoff=1.5):
+        self.min_interval = min_interval
+        self.max_interval = max(max_interval, min_interval)
+        self.target_new = target_new
+        self.smoothing = smoothing
+        self.backoff = backoff
+        interval = self._clamp(base_interval)
+        self.states = {section: SectionState(section, interval) for section in sections}
+        self._lock = threading.Lock()
+
+    def _clamp(self, interval):
+        return min(self.max_interval, max(self.min_interval, interval))
+
+    def _states(self, sections):
+        return self.states.values() if sections is None else [self.states[section] for section in sections]
+
+    def due_sections(self, now=None, sections=None):
+        """Sections (of ``sections``, default all) whose next poll time has passed, most overdue first."""
+        now = time.monotonic() if now is None else now
+        with self._lock:
+            due = [state for state in self._states(sections) if state.next_due <= now]
+        return [state.section for state in sorted(due, key=lambda state: state.next_due)]
+
+    def seconds_until_due(self, now=None, sections=None):
+        now = time.monotonic() if now is None else now
+        with self._lock:
+            next_due = min((state.next_due for state in self._states(sections)), default=math.inf)
+        return max(0.0, next_due - now)
+
+    def begin_poll(self, section):
+        return SectionPoll(self.states[section])
+
+    def record_poll(self, section, new_threads, now=None, failed=False):
+        """Update a section's rate estimate after a poll and schedule its next one."""
+        now = time.monotonic() if now is None else now
+        with self._lock:
+            state = self.states[section]
+            if failed:
+                # Rate, interval and last poll time stay as they were; the retry counts from the last good poll
+                state.next_due = now + self.min_interval
+                return
+            first_poll = state.polls == 0
+            elapsed = now - state.last_polled if state.last_polled is not None else state.interval
+            state.polls += 1
+            state.last_new = new_threads
+            state.last_polled = now
+            if not first_poll:  # The first poll has no cursor, so everything looks new
+                observed = new_threads / max(elapsed, 1.0)
+                state.rate = observed if state.rate is None else (
+                    self.smoothing * observed + (1 - self.smoothing) * state.rate
+                )
+                if new_threads == 0:
+                    state.interval = self._clamp(state.interval * self.backoff)
+                elif state.rate:
+                    state.interval = self._clamp(self.target_new / state.rate)
+            state.next_due = now + state.interval
+
+    def snapshot(self):
+        """Per-section cursor, interval and rate, for logging and status endpoints."""
+        with self._lock:
+            return {
+                state.section: {
+                    "cursor": state.cursor,
+                    "interval": round(state.interval, 1),
+                    "threads_per_minute": round(state.rate * 60, 2) if state.rate is not None else None,
+                    "last_new": state.last_new,
+                }
+                for state in self.states.values()
+            }
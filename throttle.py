@@ -0,0 +1,233 @@
+import asyncio
+import email.utils
+import threading
+import time
+from collections import deque
+from datetime import timezone
+
+from helpers import get_main_logger
+from metrics import CONCURRENCY_LIMIT, THROTTLE_SIGNALS
+
+main_logger = get_main_logger()
+
+# Responses telling us to slow down, with a Retry-After worth waiting for
+THROTTLE_STATUSES = frozenset({429, 503})
+
+
+def overloaded(status):
+    """Whether a response status means the forum (or a proxy in front of it) is struggling: 429 or any 5xx."""
+    return status is not None and (status == 429 or status >= 500)
+
+
+def parse_retry_after(value, now=None):
+    """Seconds to wait from a Retry-After header (delay-seconds or an HTTP date), or None if absent or invalid."""
+    if not value:
+        return None
+    value = value.strip()
+    if value.isdigit():
+        return float(value)
+    try:
+        when = email.utils.parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    if when.tzinfo is None:
+        when = when.replace(tzinfo=timezone.utc)
+    return max(0.0, when.timestamp() - (time.time() if now is None else now))
+
+
+class TokenBucket:
+    """``rate`` requests per second on average, in bursts of up to ``burst``; a rate of 0 sets no limit.
+
+    Not thread-safe on its own: AdaptiveLimiter only calls it under its lock.
+    """
+
+    def __init__(self, rate=0.0, burst=None):
+        self.rate = rate
+        self.burst = burst if burst is not None else max(1.0, rate)
+        self.tokens = self.burst
+        self.updated = time.monotonic()
+        self.paused_until = 0.0
+
+    def take(self, now):
+        """Take a token and return 0, or return the seconds until one is available."""
+        if now < self.paused_until:
+            return self.paused_until - now
+        if not self.rate:
+            return 0.0
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        if self.tokens >= 1:
+            self.tokens -= 1
+            return 0.0
+        return (1 - self.tokens) / self.rate
+
+    def pause(self, until):
+        """Hand out no token before the monotonic time ``until``, and refill from empty after it."""
+        if until > self.paused_until:
+            self.paused_until = until
+            self.tokens = 0.0
+            self.updated = until
+
+
+class AdaptiveLimiter:
+    """AIMD limit on the in-flight requests of one kind of traffic, behind a token bucket.
+
+    Every healthy response adds 1/limit to the limit, about one more request in flight per round
+    trip, up to ``max_limit``. A 429 or 5xx, a connection error or a timeout multiplies it by
+    ``backoff``; responses turning slow multiply it by the gentler ``slow_backoff``. Either happens
+    at most once per ``cooldown`` seconds, so a burst of failures in flight together counts once.
+    Responses are slow when the recent average time to the response headers exceeds
+    ``slow_factor`` times the long-run average. Error responses are not latency samples: a fast 502
+    must not make the forum look healthy.
+
+    A 429 or 503 also pauses the token bucket for its Retry-After (``throttle_pause`` seconds
+    without one, at most ``max_pause``), so no request of this kind goes out before it has passed.
+
+    ``acquire`` (threads) or ``acquire_async`` (coroutines) waits for a free slot and a token;
+    every acquire is paired with a ``release`` reporting how the request went.
+    """
+
+    def __init__(self, name, rate=0.0, burst=None, max_limit=32, min_limit=1, backoff=0.5, slow_backoff=0.9,
+                 slow_factor=2.0, min_slow=0.1, cooldown=1.0, throttle_pause=1.0, max_pause=300.0,
+                 max_retry_wait=30.0):
+        self.name = name
+        self.bucket = TokenBucket(rate, burst)
+        self.max_limit = max_limit
+        self.min_limit = min_limit
+        self.backoff = backoff
+        self.slow_backoff = slow_backoff
+        self.slow_factor = slow_factor
+        self.min_slow = min_slow
+        self.cooldown = cooldown
+        self.throttle_pause = throttle_pause
+        self.max_pause = max_pause
+        self.max_retry_wait = max_retry_wait
+        self._limit = float(max_limit)
+        self._in_flight = 0
+        self._recent_latency = None     # fast-moving average time to the response headers
+        self._usual_latency = None      # slow-moving one
+        self._last_backoff = float("-inf")
+        self._cond = threading.Condition()
+        self._async_waiters = deque()   # (event loop, future) of coroutines waiting for a slot
+        CONCURRENCY_LIMIT.set(self.limit, name)
+
+    @property
+    def limit(self):
+        return int(self._limit)
+
+    def reset(self, max_limit):
+        """Start over at ``max_limit`` in flight, the most a monitor run allows (max_threads or concurrency)."""
+        with self._cond:
+            self.max_limit = max(self.min_limit, max_limit)
+            self._limit = float(self.max_limit)
+            self._recent_latency = self._usual_latency = None
+            self._wake()
+        CONCURRENCY_LIMIT.set(self.limit, self.name)
+
+    def _try_acquire(self, now):
+        """Take a slot and a token and return 0, or return the seconds to wait (None: until a release)."""
+        if self._in_flight >= self.limit:
+            return None
+        wait = self.bucket.take(now)
+        if wait:
+            return wait
+        self._in_flight += 1
+        return 0.0
+
+    def acquire(self):
+        """Block until a request may go out."""
+        with self._cond:
+            while True:
+                wait = self._try_acquire(time.monotonic())
+                if wait == 0:
+                    return
+                self._cond.wait(wait)
+
+    async def acquire_async(self):
+        """Wait, without blocking the event loop, until a request may go out."""
+        loop = asyncio.get_running_loop()
+        while True:
+            with self._cond:
+                wait = self._try_acquire(time.monotonic())
+                if wait == 0:
+                    return
+                waiter = loop.create_future()
+                self._async_waiters.append((loop, waiter))
+            # A slot wait is woken by release(); the timeout only guards against a missed wake-up
+            await asyncio.wait((waiter,), timeout=1.0 if wait is None else wait)
+            if not waiter.done():
+                waiter.cancel()
+
+    def release(self, status=None, latency=None, retry_after=None, failed=False):
+        """Free a slot and adjust the limit to how the request went.
+
+        ``status`` is the HTTP status code and ``latency`` the seconds until the response headers
+        arrived; ``failed`` marks a connection error, a timeout or an overloaded() status.
+        ``retry_after`` is the response's Retry-After header.
+        """
+        now = time.monotonic()
+        with self._cond:
+            self._in_flight -= 1
+            if failed or overloaded(status):
+                if status in THROTTLE_STATUSES:
+                    pause = parse_retry_after(retry_after)
+                    pause = min(self.max_pause, self.throttle_pause if pause is None else pause)
+                    self.bucket.pause(now + pause)
+                self._back_off(now, "error" if status is None else str(status), self.backoff)
+            elif latency is not None:
+                self._observe(now, latency)
+            self._wake()
+        CONCURRENCY_LIMIT.set(self.limit, self.name)
+
+    def retryable(self, retry_after):
+        """Whether a throttled request is worth retrying in this run: the forum asks for a short enough pause."""
+        pause = parse_retry_after(retry_after)
+        return pause is None or pause <= self.max_retry_wait
+
+    def _observe(self, now, latency):
+        if self._usual_latency is None:
+            self._recent_latency = self._usual_latency = latency
+            return
+        self._recent_latency += (latency - self._recent_latency) * 0.2
+        self._usual_latency += (latency - self._usual_latency) * 0.02
+        if self._recent_latency > max(self.min_slow, self._usual_latency * self.slow_factor):
+            self._back_off(now, "slow", self.slow_backoff)
+        elif self._in_flight + 1 >= self._limit / 2:  # Only grow a limit that is actually in use
+            self._limit = min(float(self.max_limit), self._limit + 1 / self._limit)
+
+    def _back_off(self, now, signal, factor):
+        THROTTLE_SIGNALS.inc(self.name, signal)
+        if now - self._last_backoff < self.cooldown:
+            return
+        self._last_backoff = now
+        self._limit = max(float(self.min_limit), self._limit * factor)
+        main_logger.info("Forum %s requests: %s, in-flight limit down to %d.", self.name, signal, self.limit)
+
+    def _wake(self):
+        self._cond.notify_all()
+        free = self.limit - self._in_flight
+        while free > 0 and self._async_waiters:
+            loop, waiter = self._async_waiters.popleft()
+            if waiter.done():
+                continue
+            loop.call_soon_threadsafe(_set_waiter, waiter)
+            free -= 1
+
+    def snapshot(self):
+        """Current limit, requests in flight and latency averages, for status output."""
+        with self._cond:
+            paused = self.bucket.paused_until - time.monotonic()
+            return {
+                "limit": self.limit,
+                "max_limit": self.max_limit,
+                "in_flight": self._in_flight,
+                "rate": self.bucket.rate,
+                "paused_seconds": round(paused, 1) if paused > 0 else 0,
+                "recent_latency_ms": round(self._recent_latency * 1000, 1) if self._recent_latency else None,
+                "usual_latency_ms": round(self._usual_latency * 1000, 1) if self._usual_latency else None,
+            }
+
+
+def _set_waiter(waiter):
+    if not waiter.done():
+        waiter.set_result(None)
@@ -0,0 +1,49 @@
+"""Standalone sharded monitor worker.
+
+Usage: python worker.py [--engine threaded|async] [--max-threads 5] [--concurrency 50] [--page-range 3]
+                        [--cycle-delay 120] [--min-interval 30] [--max-interval 600] [--lease-ttl 60]
+
+Start as many workers as needed against the same DATABASE_URL: a SQLite file for workers on one
+host, a PostgreSQL database for workers on several. The workers split FORUM_SECTIONS between them
+through leases in the database, and rebalance when a worker joins, stops or dies. WORKER_ID names a worker; it defaults to <hostname>-<pid>.
+"""
+import argparse
+import signal
+import threading
+
+from nulled import monitor_forum, MONITOR_ENGINES
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--engine", choices=MONITOR_ENGINES, default="threaded")
+    parser.add_argument("--max-threads", type=int, default=5)
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--page-range", type=int, default=3)
+    parser.add_argument("--cycle-delay", type=int, default=120)
+    parser.add_argument("--min-interval", type=int, default=30)
+    parser.add_argument("--max-interval", type=int, default=600)
+    parser.add_argument("--lease-ttl", type=int, default=60, help="seconds before a silent worker's sections move")
+    args = parser.parse_args()
+
+    # Stop cleanly on SIGTERM/SIGINT so the leases are released instead of waiting to expire
+    stopping = threading.Event()
+    for signum in (signal.SIGTERM, signal.SIGINT):
+        signal.signal(signum, lambda *_: stopping.set())
+
+    monitor_forum(
+        max_threads=args.max_threads,
+        page_range=args.page_range,
+        cycle_delay=args.cycle_delay,
+        stop_signal=lambda: not stopping.is_set(),
+        engine=args.engine,
+        concurrency=args.concurrency,
+        min_interval=args.min_interval,
+        max_interval=args.max_interval,
+        sharded=True,
+        lease_ttl=args.lease_ttl,
+    )
+
+
+if __name__ == "__main__":
+    main()